@@ -37,10 +37,11 @@ warnings.showwarning = warn  # noqa
 import dere.taskspec
 from dere.taskspec import TaskSpecification
 from dere.corpus_io import CorpusIO, BRATCorpusIO, CQSACorpusIO, UniversalCorpusIO
-from dere.models import Model, BaselineModel, NOPModel
+from dere.models import Model
 from dere.corpus import Corpus
 import dere.evaluation
-from dere.evaluation import Result
+from dere.evaluation import Result, DocumentPairs
+import dere.significance
 
 # restore ability to use warnings
 warnings.showwarning = old_warn
@@ -224,11 +225,14 @@ def _predict(
 @click.option("--gold", required=True)
 @click.option("--task-spec", required=True)
 @click.option("--corpus-format", default="universal")
-def evaluate(predicted: str, gold: str, task_spec: str, corpus_format: str) -> None:
-    _evaluate(predicted, gold, task_spec, corpus_format)
+@click.option("--n-jobs", default=1, help="Number of processes to evaluate documents in")
+def evaluate(predicted: str, gold: str, task_spec: str, corpus_format: str, n_jobs: int) -> None:
+    _evaluate(predicted, gold, task_spec, corpus_format, n_jobs)
 
 
-def _evaluate(predicted_path: str, gold_path: str, task_spec_path: str, corpus_format: str) -> None:
+def _evaluate(
+        predicted_path: str, gold_path: str, task_spec_path: str, corpus_format: str, n_jobs: int = 1
+) -> None:
     logger.info(
         "[main] evaluating %s against %s using task specification %s",
         predicted_path,
@@ -237,10 +241,60 @@ def _evaluate(predicted_path: str, gold_path: str, task_spec_path: str, corpus_f
     )
     task_spec = dere.taskspec.load_from_xml(task_spec_path)
     corpus_io = CORPUS_IOS[corpus_format](task_spec)
+    result = _evaluation_result(corpus_io, predicted_path, gold_path, task_spec, n_jobs)
+    logger.info("\n" + result.report())  # newline to keep the pretty-printed table
+
+
+def _evaluation_result(
+        corpus_io: CorpusIO, predicted_path: str, gold_path: str, task_spec: TaskSpecification, n_jobs: int
+) -> Result:
+    try:
+        # load one document pair at a time, if the corpus format allows it
+        doc_pairs: Optional[DocumentPairs] = DocumentPairs(corpus_io, predicted_path, gold_path)
+    except NotImplementedError:
+        doc_pairs = None
+    if doc_pairs is not None:
+        return dere.evaluation.evaluate_documents(
+            doc_pairs, task_spec, n_jobs=n_jobs, doc_ids=doc_pairs.doc_ids
+        )
     predicted = corpus_io.load(predicted_path, True)
     gold = corpus_io.load(gold_path, True)
-    result = dere.evaluation.evaluate(predicted, gold, task_spec)
-    logger.info("\n" + result.report())  # newline to keep the pretty-printed table
+    return dere.evaluation.evaluate(predicted, gold, task_spec, n_jobs=n_jobs)
+
+
+@cli.command()
+@click.option("--predicted-a", required=True)
+@click.option("--predicted-b", required=True)
+@click.option("--gold", required=True)
+@click.option("--task-spec", required=True)
+@click.option("--corpus-format", default="universal")
+@click.option("--n-resamples", default=10000, help="Number of bootstrap and randomization resamples")
+@click.option("--seed", type=int, default=None)
+@click.option("--n-jobs", default=1, help="Number of processes to evaluate documents in")
+def compare(
+        predicted_a: str, predicted_b: str, gold: str, task_spec: str, corpus_format: str,
+        n_resamples: int, seed: Optional[int], n_jobs: int
+) -> None:
+    _compare(predicted_a, predicted_b, gold, task_spec, corpus_format, n_resamples, seed, n_jobs)
+
+
+def _compare(
+        predicted_a_path: str, predicted_b_path: str, gold_path: str, task_spec_path: str,
+        corpus_format: str, n_resamples: int, seed: Optional[int], n_jobs: int = 1
+) -> None:
+    logger.info(
+        "[main] comparing %s and %s against %s using task specification %s",
+        predicted_a_path,
+        predicted_b_path,
+        gold_path,
+        task_spec_path,
+    )
+    task_spec = dere.taskspec.load_from_xml(task_spec_path)
+    corpus_io = CORPUS_IOS[corpus_format](task_spec)
+    result_a = _evaluation_result(corpus_io, predicted_a_path, gold_path, task_spec, n_jobs)
+    result_b = _evaluation_result(corpus_io, predicted_b_path, gold_path, task_spec, n_jobs)
+    report = dere.significance.comparison_report(result_a, result_b, n_resamples, seed=seed)
+    logger.info("\n" + report)  # newline to keep the pretty-printed table
 
 
 cli()
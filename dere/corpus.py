@@ -214,11 +214,16 @@ class Span:
             True if the two spans are identical, False otherwise.
         """
         return isinstance(other, Span) and (
-            (self.instance.document_id, self.span_type, self.left, self.right)
-            ==
-            (other.instance.document_id, other.span_type, other.left, other.right)
+            self.instance.document_id == other.instance.document_id and self.key == other.key
         )
 
+    @property
+    def key(self) -> Tuple[SpanType, int, int]:
+        """
+        A hashable key, such that two Spans of the same document match iff their keys are equal.
+        """
+        return self.span_type, self.left, self.right
+
 
 class Slot:
     def __init__(self, slot_type: SlotType, frame: Frame) -> None:
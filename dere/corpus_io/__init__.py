@@ -2,3 +2,5 @@ from .corpus_io import CorpusIO
 from .brat_corpus_io import BRATCorpusIO
 from .cqsa_corpus_io import CQSACorpusIO
 from .universal_corpus_io import UniversalCorpusIO, UnknownCorpusFormatException
+
+__all__ = ["CorpusIO", "BRATCorpusIO", "CQSACorpusIO", "UniversalCorpusIO", "UnknownCorpusFormatException"]
@@ -81,27 +81,39 @@ class BRATCorpusIO(CorpusIO):
                             annotation_file.write(s[:-1] + "\n")
                         offset += len(instance.text + "\n")
 
+    def document_ids(self, path: str) -> List[str]:
+        return sorted(fname[:-4] for fname in os.listdir(path) if fname.endswith(".txt"))
+
+    def load_document(self, path: str, doc_id: str, load_gold: bool = True) -> Corpus:
+        corpus = Corpus()
+        if os.path.isfile(os.path.join(path, doc_id + ".txt")):
+            self._populate_document(corpus, path, doc_id, load_gold)
+        return corpus
+
     def _populate_corpus(self, corpus: Corpus, path: str, load_gold: bool) -> None:
         doc_id_list = list(
             {fname[:-4] for fname in os.listdir(path) if fname.endswith(".txt")}
         )
         for cur_id in doc_id_list:
-            a1_filename: Optional[str] = os.path.join(path, (cur_id + ".a1"))
-            assert a1_filename is not None  # thanks mypy...
-            if not os.path.isfile(a1_filename):
-                a1_filename = None
-            a2_filename: Optional[str] = None
-            if load_gold:
-                a2_filename = os.path.join(path, (cur_id + ".a2"))
-                if not os.path.isfile(a2_filename):
-                    a2_filename = None
-            self.read_data(
-                corpus=corpus,
-                textfilename=os.path.join(path, (cur_id + ".txt")),
-                doc_id=cur_id,
-                a1_filename=a1_filename,
-                a2_filename=a2_filename,
-            )
+            self._populate_document(corpus, path, cur_id, load_gold)
+
+    def _populate_document(self, corpus: Corpus, path: str, cur_id: str, load_gold: bool) -> None:
+        a1_filename: Optional[str] = os.path.join(path, (cur_id + ".a1"))
+        assert a1_filename is not None  # thanks mypy...
+        if not os.path.isfile(a1_filename):
+            a1_filename = None
+        a2_filename: Optional[str] = None
+        if load_gold:
+            a2_filename = os.path.join(path, (cur_id + ".a2"))
+            if not os.path.isfile(a2_filename):
+                a2_filename = None
+        self.read_data(
+            corpus=corpus,
+            textfilename=os.path.join(path, (cur_id + ".txt")),
+            doc_id=cur_id,
+            a1_filename=a1_filename,
+            a2_filename=a2_filename,
+        )
 
     def read_data(
         self,
@@ -1,6 +1,6 @@
 import logging
 from pathlib import Path
-from typing import Union
+from typing import List, Union
 
 from dere.corpus import Corpus
 from dere.taskspec import TaskSpecification
@@ -16,3 +16,15 @@ class CorpusIO:
 
     def dump(self, corpus: Corpus, path: str, just_predictions: bool = True) -> None:
         raise NotImplementedError()
+
+    def document_ids(self, path: str) -> List[str]:
+        """
+        The ids of the documents stored at path, for CorpusIOs which can load documents one at a time.
+        """
+        raise NotImplementedError()
+
+    def load_document(self, path: str, doc_id: str, load_gold: bool = True) -> Corpus:
+        """
+        Load a single document into a Corpus of its own. If the document doesn't exist, the Corpus is empty.
+        """
+        raise NotImplementedError()
@@ -35,6 +35,24 @@ class UniversalCorpusIO(CorpusIO):
                 continue
         raise UnknownCorpusFormatException
 
+    def document_ids(self, path: str) -> List[str]:
+        for cio in self._corpus_ios:
+            try:
+                doc_ids = cio.document_ids(path)
+            except (NotImplementedError, OSError):
+                # the format can't load single documents, or path isn't laid out the way it expects
+                continue
+            if len(doc_ids) == 0:
+                continue
+            # as in load, default to this CorpusIO from now on (and in particular in load_document)
+            self._corpus_ios.remove(cio)
+            self._corpus_ios = [cio] + self._corpus_ios
+            return doc_ids
+        raise NotImplementedError()
+
+    def load_document(self, path: str, doc_id: str, load_gold: bool = True) -> Corpus:
+        return self._corpus_ios[0].load_document(path, doc_id, load_gold)
+
     def dump(self, corpus: Corpus, path: str, just_predictions: bool = True) -> None:
         for cio in self._corpus_ios:
             try:
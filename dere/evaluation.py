@@ -1,103 +1,232 @@
 from __future__ import annotations
 from collections import defaultdict
-from typing import Union, Collection, List, Dict, Tuple, Any
+from typing import (
+    Union, Callable, Collection, List, Dict, Tuple, Any, Optional, Sequence, Iterator, Mapping,
+    MutableMapping, cast, overload
+)
 from functools import total_ordering
+import math
+import multiprocessing
 
 import networkx as nx
+import numpy as np
 
 from dere.taskspec import TaskSpecification, SpanType, FrameType
 from dere.corpus import Corpus, Instance, Frame, Span
+from dere.corpus_io import CorpusIO
 
 _SFType = Union[SpanType, FrameType]
 
 
-def _evaluate_document(hypo: List[Instance], gold: List[Instance], task_spec: TaskSpecification) -> Result:
-    r = Result(task_spec)
-    hypo_spans: List[Span] = []
-    for instance in hypo:
-        hypo_spans += [span for span in instance.spans if span.source != 'given']
-    gold_spans: List[Span] = []
-    for instance in gold:
-        gold_spans += [span for span in instance.spans if span.source != 'given']
-    for hspan in hypo_spans:
-        for gspan in gold_spans:
-            if hspan.matches(gspan):
-                r.true_positives[hspan.span_type] += 1
-                break
-        else:
-            r.false_positives[hspan.span_type] += 1
-    for gspan in gold_spans:
+class _GoldDocument:
+    """
+    The gold annotations of a document, indexed for matching hypotheses against them: the number of gold
+    spans with each key, and the frame components with their signatures.
+    """
+    def __init__(self, instances: List[Instance], canonicalizer: _ComponentCanonicalizer) -> None:
+        self.span_keys: Dict[Tuple[SpanType, int, int], int] = defaultdict(int)
+        for instance in instances:
+            for span in instance.spans:
+                if span.source != 'given':
+                    self.span_keys[span.key] += 1
+        self.components: List[Tuple[Tuple[Any, ...], nx.DiGraph, bool]] = [
+            (canonicalizer.signature(gcc), gcc, canonicalizer.is_complete(gcc))
+            for gcc in _frame_components(instances)
+        ]
+
+    def match(
+            self, hypo: List[Instance], canonicalizer: _ComponentCanonicalizer, task_spec: TaskSpecification
+    ) -> Result:
+        """
+        Evaluate the hypothesis instances of this document. The canonicalizer has to be the one (or a copy of
+        the one) that indexed this document.
+        """
+        # counted in plain dicts, and added to the Result's count array once at the end
+        tp: Dict[_SFType, int] = defaultdict(int)
+        fp: Dict[_SFType, int] = defaultdict(int)
+        fn: Dict[_SFType, int] = defaultdict(int)
+        # spans are matched by key, so that each span is only looked up once
+        hypo_spans = [span for instance in hypo for span in instance.spans if span.source != 'given']
+        hypo_keys = {span.key for span in hypo_spans}
         for hspan in hypo_spans:
-            if hspan.matches(gspan):
-                break
-        else:
-            r.false_negatives[gspan.span_type] += 1
-
-    hgraphs = [instance.frame_graph() for instance in hypo]
-    ggraphs = [instance.frame_graph() for instance in gold]
-
-    # two frames are equivalent iff they are members of isomorphic connected components
-    # for each gold connected component, see if we can find an isomorphic one in the hypo
-    # any leftover hypo connected components contain false positive frames
-    hccs = [hgraph.subgraph(c) for hgraph in hgraphs for c in nx.connected_components(nx.Graph(hgraph))]
-    gccs = [ggraph.subgraph(c) for ggraph in ggraphs for c in nx.connected_components(nx.Graph(ggraph))]
-
-    # Two frames match if they have the same frame type, and all of their span fillers match
-    def node_match(n1: dict, n2: dict) -> bool:
-        f1 = n1['frame']
-        f2 = n2['frame']
-        if f1.frame_type != f2.frame_type:
-            return False
-        for slot_type in f1.slots:
-            if len(f1.slots[slot_type].fillers) != len(f2.slots[slot_type].fillers):
-                return False
-            for filler1 in f1.slots[slot_type].fillers:
-                if isinstance(filler1, Span):
-                    for filler2 in f2.slots[slot_type].fillers:
-                        if filler1.matches(filler2):
-                            break
-                    else:
-                        return False
-        return True
-
-    def edge_match(e1: dict, e2: dict) -> bool:
-        slot1 = e1['slot']
-        slot2 = e2['slot']
-        return bool(slot1.slot_type == slot2.slot_type)
-
-    for gcc in gccs:
-        for i, hcc in enumerate(hccs):
-            if nx.is_isomorphic(gcc, hcc, node_match=node_match, edge_match=edge_match):
-                for frame in gcc.nodes():
-                    assert isinstance(frame, Frame)
-                    if frame.source != 'given':
-                        r.true_positives[frame.frame_type] += 1
-                del hccs[i]
-                break
-        else:
+            if hspan.key in self.span_keys:
+                tp[hspan.span_type] += 1
+            else:
+                fp[hspan.span_type] += 1
+        for key, n in self.span_keys.items():
+            if key not in hypo_keys:
+                fn[key[0]] += n
+
+        # two frames are equivalent iff they are members of isomorphic connected components
+        # for each gold connected component, see if we can find an isomorphic one in the hypo
+        # any leftover hypo connected components contain false positive frames
+        hccs: Dict[Any, List[nx.DiGraph]] = defaultdict(list)
+        for hcc in _frame_components(hypo):
+            hccs[canonicalizer.signature(hcc)].append(hcc)
+
+        for signature, gcc, complete in self.components:
+            candidates = hccs.get(signature, [])
+            for i, hcc in enumerate(candidates):
+                if complete or nx.is_isomorphic(gcc, hcc, node_match=_node_match, edge_match=_edge_match):
+                    del candidates[i]
+                    counts = tp
+                    break
+            else:
+                counts = fn
             for frame in gcc.nodes():
                 assert isinstance(frame, Frame)
                 if frame.source != 'given':
-                    r.false_negatives[frame.frame_type] += 1
+                    counts[frame.frame_type] += 1
+
+        # everything left over in hccs is a false positive
+        for candidates in hccs.values():
+            for hcc in candidates:
+                for frame in hcc.nodes():
+                    assert isinstance(frame, Frame)
+                    if frame.source != 'given':
+                        fp[frame.frame_type] += 1
+
+        r = Result(task_spec)
+        r.add_type_counts([tp, fp, fn])
+        return r
+
+
+def _evaluate_document(hypo: List[Instance], gold: List[Instance], task_spec: TaskSpecification) -> Result:
+    canonicalizer = _ComponentCanonicalizer()
+    return _GoldDocument(gold, canonicalizer).match(hypo, canonicalizer, task_spec)
+
+
+def _frame_components(instances: List[Instance]) -> List[nx.DiGraph]:
+    """
+    The weakly connected components of the frame graphs of the given instances.
+    """
+    components: List[nx.DiGraph] = []
+    for instance in instances:
+        graph = instance.frame_graph()
+        components.extend(graph.subgraph(c) for c in nx.weakly_connected_components(graph))
+    return components
+
+
+def _frame_label(frame: Frame) -> Tuple[Any, ...]:
+    """
+    Everything about a frame itself that two matching frames must agree on: the frame type, the number of
+    fillers of each slot, and the span fillers of each slot.
+
+    Span fillers are compared as multisets of span keys, i.e. two slots match iff their span fillers are
+    the same up to order, counting duplicates. This is stricter than the check that was used before, which
+    only required each span filler of the gold frame to match some span filler of the hypothesis frame
+    (with the same number of fillers in each slot). The two differ when a slot has several fillers with
+    the same key: a gold slot with fillers A, A used to match a hypothesis slot with A, B, and doesn't
+    any more (while A, B never matched A, A).
+    """
+    return (frame.frame_type.name,) + tuple(
+        (
+            slot_type.name,
+            len(slot.fillers),
+            tuple(sorted(
+                (filler.span_type.name, filler.left, filler.right)
+                for filler in slot.fillers if isinstance(filler, Span)
+            )),
+        )
+        for slot_type, slot in frame.slots.items()
+    )
+
+
+# Two frames match if they have the same label (see _frame_label)
+def _node_match(n1: Dict[str, Any], n2: Dict[str, Any]) -> bool:
+    return _frame_label(n1['frame']) == _frame_label(n2['frame'])
 
-    # everything left over in hcc is a false positive
-    for hcc in hccs:
-        for frame in hcc.nodes():
-            assert isinstance(frame, Frame)
-            if frame.source != 'given':
-                r.false_positives[frame.frame_type] += 1
 
-    return r
+def _edge_match(e1: Dict[str, Any], e2: Dict[str, Any]) -> bool:
+    return bool(e1['slot'].slot_type == e2['slot'].slot_type)
 
 
-def evaluate(hypo: Corpus, gold: Corpus, task_spec: TaskSpecification) -> Result:
+class _ComponentCanonicalizer:
+    """
+    Computes hashable signatures of frame components, such that isomorphic components (in the sense of
+    _node_match and _edge_match) get the same signature.
+
+    A signature is the multiset of the colors that Weisfeiler-Lehman color refinement gives the frames of a
+    component: every frame starts out colored by its _frame_label, and is then repeatedly recolored by its
+    own color and the colors of its neighbours, along with the slot types and directions of the edges to
+    them, until the number of colors stops growing. Colors are numbered in the order they are first seen, so
+    signatures are only comparable between components seen by the same canonicalizer.
+
+    Equal signatures don't imply isomorphism in general, but they do for components that are trees (color
+    refinement tells all trees apart), which covers single frames and most nested events. Only other
+    components need a full isomorphism test to confirm a match.
+    """
+    def __init__(self) -> None:
+        self.colors: Dict[Any, int] = {}
+
+    def copy(self) -> _ComponentCanonicalizer:
+        """
+        A canonicalizer whose signatures are comparable to the ones this one gave so far, but whose new colors
+        aren't added to this one.
+        """
+        canonicalizer = _ComponentCanonicalizer()
+        canonicalizer.colors = dict(self.colors)
+        return canonicalizer
+
+    def _color(self, label: Any) -> int:
+        return self.colors.setdefault(label, len(self.colors))
+
+    def signature(self, component: nx.DiGraph) -> Tuple[Any, ...]:
+        colors = {frame: self._color(_frame_label(cast(Frame, frame))) for frame in component.nodes()}
+        n_colors = len(set(colors.values()))
+        for iteration in range(1, component.number_of_nodes()):
+            colors = {
+                frame: self._color((
+                    iteration,
+                    colors[frame],
+                    tuple(sorted(
+                        (slot.slot_type.name, colors[filler])
+                        for _, filler, slot in component.out_edges(frame, data='slot')
+                    )),
+                    tuple(sorted(
+                        (slot.slot_type.name, colors[filler])
+                        for filler, _, slot in component.in_edges(frame, data='slot')
+                    )),
+                ))
+                for frame in component.nodes()
+            }
+            n_colors, previous = len(set(colors.values())), n_colors
+            if n_colors == previous:
+                break
+        return component.number_of_edges(), tuple(sorted(colors.values()))
+
+    @staticmethod
+    def is_complete(component: nx.DiGraph) -> bool:
+        """
+        Whether equal signatures imply isomorphism for this (connected) component, i.e. whether it is a tree.
+        """
+        return component.number_of_edges() == component.number_of_nodes() - 1
+
+
+def _documents(corpus: Corpus) -> Dict[str, List[Instance]]:
+    documents: Dict[str, List[Instance]] = defaultdict(list)
+    for instance in corpus.instances:
+        documents[instance.document_id].append(instance)
+    return documents
+
+
+def evaluate(
+        hypo: Corpus, gold: Corpus, task_spec: TaskSpecification,
+        n_jobs: int = 1, chunk_size: Optional[int] = None
+) -> Result:
     """
     Evaluate a corpus containing model predictions against a corpus containing gold-standard annotations
-    according to a supplied task-spec.
+    according to a supplied task-spec. To evaluate several corpora against the same gold corpus, use an
+    Evaluator instead.
 
     Args:
         hypo: The hypothesis corpus, containing model predictions.
         gold: The corpus containing gold-standard annotation data.
+        n_jobs: The number of worker processes to evaluate documents in. Workers are forked, so that they
+            share the corpora with this process instead of having them pickled; where forking isn't
+            available, documents are evaluated sequentially.
+        chunk_size: The number of documents each worker evaluates at a time. By default, the documents are
+            split into about four chunks per worker.
 
     Returns:
         A Result object representing the evaluation results.
@@ -108,22 +237,146 @@ def evaluate(hypo: Corpus, gold: Corpus, task_spec: TaskSpecification) -> Result
     # idea
 
     # TODO(Sean): Add support for different styles of soft evaluation
-    hypo_docs: Dict[str, List[Instance]] = defaultdict(list)
-    for hypo_instance in hypo.instances:
-        hypo_docs[hypo_instance.document_id].append(hypo_instance)
-    gold_docs: Dict[str, List[Instance]] = defaultdict(list)
-    for gold_instance in gold.instances:
-        gold_docs[gold_instance.document_id].append(gold_instance)
-    doc_pairs: List[Tuple[List[Instance], List[Instance]]] = []
-    for doc_id in hypo_docs.keys() | gold_docs.keys():
-        doc_pairs.append((hypo_docs[doc_id], gold_docs[doc_id]))
+    return Evaluator(gold, task_spec).evaluate(hypo, n_jobs, chunk_size)
+
+
+class Evaluator:
+    """
+    Evaluates any number of hypothesis corpora against the same gold corpus, e.g. the predictions of the
+    candidates of a hyperparameter search on the dev corpus. The gold corpus is indexed once, when the
+    Evaluator is created: the keys of its spans, and the signatures of its frame components. Each evaluation
+    then only has to index the hypothesis.
+
+    The gold corpus must not be changed while the Evaluator is in use.
+    """
+    def __init__(self, gold: Corpus, task_spec: TaskSpecification) -> None:
+        self.gold = gold
+        self.task_spec = task_spec
+        self._canonicalizer = _ComponentCanonicalizer()
+        self._documents = {
+            doc_id: _GoldDocument(instances, self._canonicalizer)
+            for doc_id, instances in _documents(gold).items()
+        }
+        self._empty_document = _GoldDocument([], self._canonicalizer)
+
+    def evaluate(self, hypo: Corpus, n_jobs: int = 1, chunk_size: Optional[int] = None) -> Result:
+        """
+        Evaluate a corpus containing model predictions against the gold corpus. See evaluate for the
+        parameters.
+        """
+        hypo_docs = _documents(hypo)
+        # sorted, so that the per-document counts of two evaluations against the same gold line up
+        doc_ids = sorted(hypo_docs.keys() | self._documents.keys())
+        # new colors of the hypothesis frames are kept out of the gold index
+        canonicalizer = self._canonicalizer.copy()
+
+        def evaluate_document(i: int) -> np.ndarray:
+            doc_id = doc_ids[i]
+            gold_document = self._documents.get(doc_id, self._empty_document)
+            return gold_document.match(hypo_docs.get(doc_id, []), canonicalizer, self.task_spec).counts()
+
+        document_counts = _document_counts(
+            len(doc_ids), evaluate_document, self.task_spec, n_jobs, chunk_size
+        )
+        return _document_result(document_counts, self.task_spec, doc_ids)
+
+
+def evaluate_documents(
+        doc_pairs: Sequence[Tuple[List[Instance], List[Instance]]], task_spec: TaskSpecification,
+        n_jobs: int = 1, chunk_size: Optional[int] = None, doc_ids: Optional[Sequence[str]] = None
+) -> Result:
+    """
+    Evaluate a sequence of (hypothesis instances, gold instances) pairs, one pair per document. See evaluate
+    for the other parameters.
 
+    Args:
+        doc_ids: The ids of the documents, to be stored in the Result along with their counts.
+    """
+    def evaluate_document(i: int) -> np.ndarray:
+        return _evaluate_document(*doc_pairs[i], task_spec).counts()
+
+    document_counts = _document_counts(len(doc_pairs), evaluate_document, task_spec, n_jobs, chunk_size)
+    return _document_result(document_counts, task_spec, doc_ids)
+
+
+def _document_counts(
+        n_documents: int, evaluate_document: Callable[[int], np.ndarray], task_spec: TaskSpecification,
+        n_jobs: int, chunk_size: Optional[int]
+) -> np.ndarray:
+    """
+    The counts of each of n_documents documents, as returned by evaluate_document for its index, evaluated in
+    n_jobs worker processes.
+    """
+    document_counts = np.zeros((n_documents, 3, len(Result(task_spec).sf_types)), dtype=np.int64)
+    if n_jobs > 1 and n_documents > 1 and "fork" in multiprocessing.get_all_start_methods():
+        if chunk_size is None:
+            chunk_size = max(1, math.ceil(n_documents / (4 * n_jobs)))
+        chunks = [range(i, min(i + chunk_size, n_documents)) for i in range(0, n_documents, chunk_size)]
+        global _shared_evaluate_document
+        _shared_evaluate_document = evaluate_document
+        try:
+            with multiprocessing.get_context("fork").Pool(min(n_jobs, len(chunks))) as pool:
+                for start, counts in pool.imap_unordered(_evaluate_chunk, chunks):
+                    document_counts[start:start + len(counts)] = counts
+        finally:
+            _shared_evaluate_document = None
+    else:
+        for i in range(n_documents):
+            document_counts[i] = evaluate_document(i)
+    return document_counts
+
+
+def _document_result(
+        document_counts: np.ndarray, task_spec: TaskSpecification, doc_ids: Optional[Sequence[str]]
+) -> Result:
     result = Result(task_spec)
-    for hypo_instances, gold_instances in doc_pairs:
-        result |= _evaluate_document(hypo_instances, gold_instances, task_spec)
+    result.add_counts(document_counts.sum(axis=0))
+    result.document_counts = document_counts
+    result.document_ids = list(doc_ids) if doc_ids is not None else None
     return result
 
 
+class DocumentPairs(Sequence[Tuple[List[Instance], List[Instance]]]):
+    """
+    The documents of a hypothesis and a gold corpus, as a sequence of (hypothesis instances, gold instances)
+    pairs that are only loaded from disk when they are accessed. Evaluating these one at a time, only one
+    document pair has to be in memory at once, instead of both corpora.
+    """
+    def __init__(self, corpus_io: CorpusIO, hypo_path: str, gold_path: str) -> None:
+        self.corpus_io = corpus_io
+        self.hypo_path = hypo_path
+        self.gold_path = gold_path
+        self.doc_ids = sorted(set(corpus_io.document_ids(hypo_path)) | set(corpus_io.document_ids(gold_path)))
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    @overload
+    def __getitem__(self, i: int) -> Tuple[List[Instance], List[Instance]]: ...
+
+    @overload
+    def __getitem__(self, i: slice) -> Sequence[Tuple[List[Instance], List[Instance]]]: ...
+
+    def __getitem__(self, i: Union[int, slice]) -> Any:
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        doc_id = self.doc_ids[i]
+        hypo = self.corpus_io.load_document(self.hypo_path, doc_id)
+        gold = self.corpus_io.load_document(self.gold_path, doc_id)
+        return hypo.instances, gold.instances
+
+
+# The function evaluating the documents being evaluated in parallel, which forked workers inherit, along with
+# the corpora it refers to. Workers are only sent the indices of the documents to evaluate, and only send
+# back count arrays.
+_shared_evaluate_document: Optional[Callable[[int], np.ndarray]] = None
+
+
+def _evaluate_chunk(indices: range) -> Tuple[int, np.ndarray]:
+    assert _shared_evaluate_document is not None
+    return indices.start, np.stack([_shared_evaluate_document(i) for i in indices])
+
+
 def _string_table(table: List[Union[List[Any], str]], padding: int = 2) -> str:
     column_widths: Dict[int, int] = {}
     for row in table:
@@ -150,6 +403,41 @@ def _string_table(table: List[Union[List[Any], str]], padding: int = 2) -> str:
     return s
 
 
+class _Counts(MutableMapping[_SFType, int]):
+    """
+    A dict-like view of one row of a Result's count array, mapping types to counts. Types that aren't in the
+    Result's sf_types are counted on the side, like in a defaultdict.
+    """
+    def __init__(self, result: Result, row: int) -> None:
+        self.result = result
+        self.row = row
+        self.others: Dict[_SFType, int] = defaultdict(int)
+
+    def __getitem__(self, sf_type: _SFType) -> int:
+        i = self.result.type_ids.get(sf_type)
+        if i is None:
+            return self.others[sf_type]
+        return int(self.result.count_array[self.row, i])
+
+    def __setitem__(self, sf_type: _SFType, n: int) -> None:
+        i = self.result.type_ids.get(sf_type)
+        if i is None:
+            self.others[sf_type] = n
+        else:
+            self.result.count_array[self.row, i] = n
+        self.result._totals.clear()
+
+    def __delitem__(self, sf_type: _SFType) -> None:
+        self[sf_type] = 0
+
+    def __iter__(self) -> Iterator[_SFType]:
+        yield from self.result.sf_types
+        yield from self.others
+
+    def __len__(self) -> int:
+        return len(self.result.sf_types) + len(self.others)
+
+
 @total_ordering
 class Result:
     """
@@ -157,6 +445,10 @@ class Result:
     negatives for frame and span evaluation, and can thus compute precision, recall, and fscore of a given
     evaluation. They are also comparable, and so the results of two evaluations can be compared -- The default
     comparison metric is f1 score on frame evaluation, with f1-score on span evaluation as a fallback.
+
+    The counts are stored in count_array, with a row for each of true positives, false positives, and false
+    negatives, and a column for each type in sf_types. true_positives, false_positives, and false_negatives
+    are dict-like views of its rows. Totals over collections of types are cached until the counts change.
     """
     def __init__(self, task_spec: TaskSpecification) -> None:
         """
@@ -171,9 +463,40 @@ class Result:
         self.sf_types: List[_SFType] = []
         self.sf_types.extend(self.span_types)
         self.sf_types.extend(self.frame_types)
-        self.true_positives: Dict[_SFType, int] = defaultdict(int)
-        self.false_positives: Dict[_SFType, int] = defaultdict(int)
-        self.false_negatives: Dict[_SFType, int] = defaultdict(int)
+        self.type_ids: Dict[_SFType, int] = {sf_type: i for i, sf_type in enumerate(self.sf_types)}
+        self.count_array = np.zeros((3, len(self.sf_types)), dtype=np.int64)
+        self._totals: Dict[Any, Tuple[int, int, int]] = {}
+        self.true_positives = _Counts(self, 0)
+        self.false_positives = _Counts(self, 1)
+        self.false_negatives = _Counts(self, 2)
+        # the counts of each document, as an array of shape (documents, 3, sf_types) with rows as in counts(),
+        # if this Result comes from an evaluation
+        self.document_counts: Optional[np.ndarray] = None
+        self.document_ids: Optional[List[str]] = None
+
+    def _total(self, cls: Union[_SFType, Collection[_SFType]]) -> Tuple[int, int, int]:
+        """
+        The true positive, false positive, and false negative counts for a type or collection of types.
+        """
+        # the span, frame, and overall totals are looked up by identity, to save hashing their types
+        if cls is self.span_types or cls is self.frame_types or cls is self.sf_types:
+            key: Any = id(cls)
+        elif isinstance(cls, Collection):
+            key = tuple(cls)
+        else:
+            key = cls
+        total = self._totals.get(key)
+        if total is None:
+            types = cls if isinstance(cls, Collection) else [cls]
+            columns = [self.type_ids[t] for t in types if t in self.type_ids]
+            tp, fp, fn = (int(n) for n in self.count_array[:, columns].sum(axis=1))
+            for t in types:
+                if t not in self.type_ids:
+                    tp += self.true_positives.others[t]
+                    fp += self.false_positives.others[t]
+                    fn += self.false_negatives.others[t]
+            total = self._totals[key] = (tp, fp, fn)
+        return total
 
     def tp(self, cls: Union[_SFType, Collection[_SFType]]) -> int:
         """
@@ -186,12 +509,7 @@ class Result:
         Returns:
             The number of true positives.
         """
-        if not isinstance(cls, Collection):
-            cls = [cls]
-        n = 0
-        for c in cls:
-            n += self.true_positives[c]
-        return n
+        return self._total(cls)[0]
 
     def fp(self, cls: Union[_SFType, Collection[_SFType]]) -> int:
         """
@@ -204,13 +522,7 @@ class Result:
         Returns:
             The number of false positives.
         """
-
-        if not isinstance(cls, Collection):
-            cls = [cls]
-        n = 0
-        for c in cls:
-            n += self.false_positives[c]
-        return n
+        return self._total(cls)[1]
 
     def fn(self, cls: Union[_SFType, Collection[_SFType]]) -> int:
         """
@@ -223,12 +535,7 @@ class Result:
         Returns:
             The number of false negatives.
         """
-        if not isinstance(cls, Collection):
-            cls = [cls]
-        n = 0
-        for c in cls:
-            n += self.false_negatives[c]
-        return n
+        return self._total(cls)[2]
 
     def precision(self, cls: Union[_SFType, Collection[_SFType]]) -> float:
         """
@@ -241,11 +548,11 @@ class Result:
         Returns:
             The precision, or zero if there were no true positives and no false positives
         """
-        tp = self.tp(cls)
+        tp, fp, _ = self._total(cls)
         if tp == 0:
             return 0
         else:
-            return tp / (tp + self.fp(cls))
+            return tp / (tp + fp)
 
     def recall(self, cls: Union[_SFType, Collection[_SFType]]) -> float:
         """
@@ -258,12 +565,11 @@ class Result:
         Returns:
             The recall, or zero if there were no true positives and no false negatives
         """
-
-        tp = self.tp(cls)
+        tp, _, fn = self._total(cls)
         if tp == 0:
             return 0
         else:
-            return tp / (tp + self.fn(cls))
+            return tp / (tp + fn)
 
     def fscore(self, cls: Union[_SFType, Collection[_SFType]], beta: float = 1) -> float:
         """
@@ -290,6 +596,27 @@ class Result:
             return 0
         return (1+b2) / (b2/precision + 1/recall)
 
+    def macro_fscore(self, cls: Collection[_SFType], beta: float = 1) -> float:
+        """
+        Compute the macro-averaged :math:`F_{\beta}` score for a collection of SpanTypes and FrameTypes,
+        i.e. the mean of their individual scores.
+
+        Args:
+            cls: A collection of SpanTypes and FrameTypes in sf_types.
+            beta: The beta parameter.
+
+        Returns:
+            The macro-averaged score, or zero for an empty collection.
+        """
+        if len(cls) == 0:
+            return 0
+        tp, fp, fn = self.count_array[:, [self.type_ids[t] for t in cls]].astype(np.float64)
+        b2 = beta**2
+        # with tp > 0, the score is (1 + b2) / (b2 / recall + 1 / precision)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scores = np.where(tp > 0, (1 + b2) * tp / ((1 + b2) * tp + b2 * fn + fp), 0.0)
+        return float(scores.mean())
+
     def union(self, other: Result) -> Result:
         """
         Returns the union of this Result and another Result.  True positive, false positive, and false
@@ -304,30 +631,61 @@ class Result:
         """
         assert self.task_spec == other.task_spec
         r = Result(self.task_spec)
-        for sf_type in self.sf_types:
-            r.true_positives[sf_type] = self.true_positives[sf_type] + other.true_positives[sf_type]
-            r.false_positives[sf_type] = self.false_positives[sf_type] + other.false_positives[sf_type]
-            r.false_negatives[sf_type] = self.false_negatives[sf_type] + other.false_negatives[sf_type]
+        np.add(self.count_array, other.count_array, out=r.count_array)
         return r
 
     def __or__(self, other: Result) -> Result:
         return self.union(other)
 
+    def __ior__(self, other: Result) -> Result:
+        """
+        Adds the counts of another Result to this one, in place.
+        """
+        assert self.task_spec == other.task_spec
+        self.add_counts(other.count_array)
+        return self
+
+    def counts(self) -> np.ndarray:
+        """
+        The counts of this Result as an array, with rows for true positives, false positives, and false
+        negatives, and a column for each type in sf_types.
+        """
+        return self.count_array.copy()
+
+    def add_counts(self, counts: np.ndarray) -> None:
+        """
+        Adds an array of counts, as returned by counts(), to this Result, in place.
+        """
+        assert counts.shape == self.count_array.shape
+        self.count_array += counts
+        self._totals.clear()
+
+    def add_type_counts(self, counts: Sequence[Mapping[_SFType, int]]) -> None:
+        """
+        Adds counts given by type to this Result, in place: one mapping for each of true positives, false
+        positives, and false negatives. Types that aren't in sf_types are counted on the side.
+        """
+        array = np.zeros_like(self.count_array)
+        views = [self.true_positives, self.false_positives, self.false_negatives]
+        for row, (view, type_counts) in enumerate(zip(views, counts)):
+            for sf_type, n in type_counts.items():
+                i = self.type_ids.get(sf_type)
+                if i is None:
+                    view.others[sf_type] += n
+                else:
+                    array[row, i] += n
+        self.add_counts(array)
+
+    def _key(self) -> Tuple[float, float]:
+        return self.fscore(self.frame_types), self.fscore(self.span_types)
+
     def __eq__(self, other: Any) -> bool:
         if not isinstance(other, Result):
             return False
-        return (
-            self.fscore(self.frame_types) == other.fscore(other.frame_types)
-            and self.fscore(self.span_types) == other.fscore(other.span_types)
-        )
+        return self._key() == other._key()
 
     def __lt__(self, other: Result) -> bool:
-        sf = self.fscore(self.frame_types)
-        of = other.fscore(other.frame_types)
-        if sf == of:
-            return self.fscore(self.span_types) < other.fscore(other.span_types)
-        else:
-            return sf < of
+        return self._key() < other._key()
 
     def report(self) -> str:
         """
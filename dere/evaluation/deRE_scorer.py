@@ -0,0 +1,890 @@
+#!/usr/bin/python
+"""
+Scores predicted BRAT annotations against gold annotations, span by span and event by event, for any task.
+
+What is scored is described by a ScoringTask, which can be derived from a task specification:
+
+    python -u deRE_scorer.py --task-spec ../../task-specs/usage.xml --hypo PATH --gold PATH
+
+deRE_evaluation.py and deRE_evaluation_usage.py are this scorer with the tasks of the BioNLP shared task
+and the USAGE corpus built in.
+"""
+
+import os
+import glob
+import re
+import bisect
+import logging
+import functools
+import multiprocessing
+import click
+import numpy as np
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, Tuple, List, Optional, Set, Iterable, Mapping
+
+logger = logging.getLogger(__name__)
+
+EVENT_ARG = re.compile(r"\:E[0-9-]+$")
+DOC_FILE = re.compile(r"(\S+)\.(a2|ann)")
+
+# the count tables of a document or corpus, by class
+COUNT_NAMES = ("gold", "matched_gold", "answer", "matched_answer")
+
+
+@dataclass(frozen=True)
+class ScoringTask:
+    """
+    What to score, and how to report it.
+
+    Attributes:
+        span_classes: The classes of the spans to report in the span evaluation.
+        event_classes: The classes of the events to count.
+        primary_role: The argument role that numbered roles (Theme2, ...) and modifications refer to, and
+            after which optional arguments are ignored in soft argument matching.
+        match_span_arguments: Whether arguments that aren't given entities match if their classes and spans
+            do. Otherwise, they have to be the very same given entity.
+        sections: The sections of the event evaluation, as (classes, total label, total classes) triples:
+            a line for each of the classes is reported, followed by a total over the total classes.
+        extensions: The extensions of the answer files.
+    """
+    span_classes: Tuple[str, ...]
+    event_classes: Tuple[str, ...]
+    primary_role: str
+    match_span_arguments: bool = False
+    sections: Tuple[Tuple[Tuple[str, ...], str, Tuple[str, ...]], ...] = ()
+    extensions: Tuple[str, ...] = (".a2", ".ann")
+
+    def __post_init__(self) -> None:
+        if not self.sections:
+            # a single section with all events
+            sections = ((self.event_classes, "=[EVENT-TOTAL]=", self.event_classes),)
+            object.__setattr__(self, "sections", sections)
+
+    @property
+    def numbered_role(self) -> Any:
+        # the pattern of Theme2, Theme3, ..., which are all treated as Theme
+        return re.compile("^" + re.escape(self.primary_role) + "[2-6]$")
+
+    @classmethod
+    def from_task_spec(
+        cls,
+        task_spec: Any,
+        sections: Tuple[Tuple[Tuple[str, ...], str, Tuple[str, ...]], ...] = (),
+        extensions: Tuple[str, ...] = (".a2", ".ann"),
+    ) -> "ScoringTask":
+        """
+        The task of a TaskSpecification: its frames are the events, with the slot named like the frame as
+        their trigger, and the argument slot most frames have as their primary role. Classes are reported in
+        the order of the given sections, and then in the order of the specification.
+        """
+        triggers: Dict[str, List[str]] = {}
+        roles: Counter[str] = Counter()
+        match_span_arguments = False
+        for frame_type in task_spec.frame_types:
+            triggers[frame_type.name] = []
+            for slot_type in frame_type.slot_types:
+                if slot_type.name == frame_type.name:
+                    triggers[frame_type.name] += [t.name for t in slot_type.types]
+                    continue
+                roles[slot_type.name] += 1
+                if any(t in task_spec.span_types and t.predict for t in slot_type.types):
+                    match_span_arguments = True
+        if not roles:
+            raise ValueError("task specification has no frames with arguments")
+
+        event_classes = [cl for classes, _, _ in sections for cl in classes]
+        event_classes += [name for name in triggers if name not in event_classes]
+        span_classes: List[str] = []
+        for name in event_classes:
+            span_classes += [t for t in triggers.get(name, []) if t not in span_classes]
+        return cls(
+            tuple(span_classes),
+            tuple(event_classes),
+            roles.most_common(1)[0][0],
+            match_span_arguments,
+            sections,
+            extensions,
+        )
+
+
+def read_text_file(filename: str) -> Tuple[str, int]:
+    output = ""
+    with open(filename) as f:
+        for line in f:
+            output += line
+    return output, len(output)
+
+
+def mark_span(events_in_text: bytearray, begin: int, end: int) -> None:
+    """
+    Mark the characters from begin to end as covered by an entity or event.
+    """
+    if end > len(events_in_text):
+        events_in_text.extend(bytes(end - len(events_in_text)))
+    events_in_text[begin:end] = b"\x01" * (end - begin)
+
+
+def read_a1_file(
+    filename: str, events_in_text: bytearray
+) -> Tuple[Dict[str, Tuple[str, int, int]], bytearray]:
+    """
+    Read the given entities of a document, marking their characters in events_in_text.
+    """
+    span_annotations: Dict[str, Tuple[str, int, int]] = {}
+    with open(filename) as f:
+        for line in f:
+            line = line.strip()
+            cur_id, exp, _ = line.split("\t")
+
+            if cur_id.startswith("T"):
+                cur_type, begin_offset, end_offset = exp.split(" ")
+                begin = int(begin_offset)
+                end = int(end_offset)
+                mark_span(events_in_text, begin, end)
+                span_annotations[cur_id] = (cur_type, begin, end)
+            else:
+                logger.warning("invalid annotation in a1 file: " + line)
+    return span_annotations, events_in_text
+
+
+def read_a2_file(
+    filename: str,
+    events_in_text: bytearray,
+    equiv: Dict[str, str],
+    mode: str,
+    task: ScoringTask,
+) -> Tuple[
+    Dict[str, Tuple[str, int, int]],
+    Dict[str, Tuple[str, str, List[str]]],
+    Dict[str, int],
+    Dict[str, int],
+    bytearray,
+    Dict[str, str],
+]:  # mode: either G for gold or A for predicted answer
+    """
+    Read the spans and events of a document. For gold annotations, the characters of spans are marked in
+    events_in_text. Equivalences are added to equiv. Both are updated in place, and returned.
+    """
+    span_annotations: Dict[str, Tuple[str, int, int]] = {}
+    frame_annotations: Dict[str, Tuple[str, str, List[str]]] = {}
+    span_list: List[Tuple[str, str, int, int]] = []
+    with open(filename) as f:
+        for line in f:
+            line = line.strip()
+            line_parts = line.split("\t")
+            cur_id = line_parts[0]
+            exp = line_parts[1]
+
+            if cur_id.startswith("T"):
+                cur_type, begin_offset, end_offset = exp.split(" ")
+                begin = int(begin_offset)
+                end = int(end_offset)
+                if mode == "G":
+                    mark_span(events_in_text, begin, end)
+                span_annotations[cur_id] = (cur_type, begin, end)
+                span_list.append((cur_id, cur_type, begin, end))
+            elif cur_id.startswith("E"):
+                exp_splitted = exp.split(" ")
+                t_type, t_id = exp_splitted.pop(0).split(":")
+                new_args = []
+                for e_item in exp_splitted:
+                    if e_item == "":
+                        continue
+                    a_type, a_id = e_item.split(":")
+                    a_type = task.numbered_role.sub(task.primary_role, a_type)
+                    if a_id in equiv:
+                        a_id = equiv[a_id]
+                    new_args.append(a_type + ":" + a_id)
+                frame_annotations[cur_id] = (t_type, t_id, new_args)
+            elif cur_id.startswith("M"):
+                cur_type, aid = exp.split(" ")
+                frame_annotations[cur_id] = (cur_type, " ", [task.primary_role + ":" + aid])
+            elif cur_id.startswith("*"):
+                exp_splitted = exp.split(" ")
+                rel = exp_splitted[0]
+                pid = exp_splitted[1:]
+                rep = pid[0]
+                other = pid[1:]
+                for o in other:
+                    equiv[o] = rep
+    e_list = []
+    for key in frame_annotations:
+        e_list.append(key)
+
+    # detect and remove duplication by Equiv
+    if mode == "A":
+        # sort events
+        new_e_list = []
+        added = {}
+        remain = []
+        for e_item in e_list:
+            remain.append(e_item)
+        while len(remain) > 0:
+            changep = 0
+            for r in remain:
+                e_arg = []
+                for item in frame_annotations[r][2]:
+                    if EVENT_ARG.search(item):
+                        e_arg.append(item)
+                e_aid = [
+                    parts[1] for e_arg_item in e_arg for parts in e_arg_item.split(":")
+                ]
+                danglingp = 0
+                for e_a in e_aid:
+                    if e_a not in added:
+                        danglingp = 1
+                        break
+                if danglingp == 0:
+                    new_e_list.append(r)
+                    added[r] = 1
+                    remain.remove(r)
+                    changep = 1
+            if changep == 0:
+                logger.info(
+                    "circular reference: [" + filename + "]" + ", ".join(remain)
+                )
+                new_e_list.extend(remain)
+                remain = []
+
+        e_list = new_e_list
+
+        eventexp: Dict[str, str] = {}  # for checking event duplication
+        to_remove = []
+        for e_id in e_list:
+            # get event expression
+            for r in frame_annotations[e_id][2]:
+                if ":" not in r:
+                    continue
+                a_type, a_id = r.split(":")
+                if a_id in equiv:
+                    a_id = equiv[a_id]
+                r = a_type + ":" + a_id
+
+            eventexp_key = frame_annotations[e_id][0] + "," + frame_annotations[e_id][1]
+            eventexp_key += "," + ",".join(frame_annotations[e_id][2])
+
+            # check duplication
+            if eventexp_key in eventexp:
+                d_id = eventexp[eventexp_key]
+                del frame_annotations[e_id]
+                to_remove.append(e_id)
+                equiv[e_id] = d_id
+                logger.info(
+                    "["
+                    + filename
+                    + "]"
+                    + e_id
+                    + " is equivalent to "
+                    + d_id
+                    + " => removed."
+                )
+            else:
+                eventexp[eventexp_key] = e_id
+
+        for e_id in to_remove:
+            e_list.remove(e_id)
+
+    # get statistics
+    num_event = {}
+    for e_id in e_list:
+        cur_type = frame_annotations[e_id][0]
+        if cur_type not in num_event:
+            num_event[cur_type] = 0
+        num_event[cur_type] += 1
+
+    num_span = {}
+    for span in span_list:
+        cur_type = span[1]
+        if cur_type not in num_span:
+            num_span[cur_type] = 0
+        num_span[cur_type] += 1
+
+    return (
+        span_annotations,
+        frame_annotations,
+        num_event,
+        num_span,
+        events_in_text,
+        equiv,
+    )
+
+
+def get_scores(gold: int, match_gold: int, answer: int, match_answer: int) -> Tuple[float, float, float]:
+    precision = 0.0
+    if answer > 0:
+        precision = float(match_answer) / answer
+    recall = 0.0
+    if gold > 0:
+        recall = float(match_gold) / gold
+    f1 = 0.0
+    if precision + recall > 0:
+        f1 = 2 * precision * recall / (precision + recall)
+    return precision * 100, recall * 100, f1 * 100
+
+
+def report_headline() -> None:
+    print(
+        "Class".ljust(20)
+        + "\t"
+        + "gold (match)".ljust(10)
+        + "\t"
+        + "answer (match)".ljust(10)
+        + "\t"
+        + "recall \t prec. \t fscore"
+    )
+
+
+def report(
+    cl: str, gold: int, matched_gold: int, answer: int, matched_answer: int
+) -> None:
+    precision, recall, f1 = get_scores(gold, matched_gold, answer, matched_answer)
+    gold_column = str(gold) + " (" + str(matched_gold) + ")"
+    answer_column = str(answer) + " (" + str(matched_answer) + ")"
+    print(
+        cl.ljust(20)
+        + "\t"
+        + gold_column.ljust(10)
+        + "\t"
+        + answer_column.ljust(10)
+        + "\t"
+        + str(round(recall, 2))
+        + "\t"
+        + str(round(precision, 2))
+        + "\t"
+        + str(round(f1, 2))
+    )
+
+
+# METHODS FOR CHECKING EQUALITY OF SPANS AND EVENTS
+
+SOFT_CLASSES = [
+    (re.compile(r"^Positive\_r"), "R"),
+    (re.compile(r"^Negative\_r"), "R"),
+    (re.compile(r"^Transcription$"), "Gene_expression"),
+]
+
+
+def make_soft_classes(cur_class: str) -> str:
+    for pattern, replacement in SOFT_CLASSES:
+        cur_class = pattern.sub(replacement, cur_class)
+    return cur_class
+
+
+class WordBoundaries:
+    """
+    The word boundaries of a document: delimiters, and characters covered by entities or events. For every
+    character, the nearest boundaries at or to the left and at or to the right of it are precomputed, so
+    that expanding a span to the surrounding word boundaries is a lookup.
+    """
+
+    DELIMITERS = " .!?,'\""
+
+    def __init__(self, text: str, events_in_text: bytearray) -> None:
+        self.text_len = len(text)
+        codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+        boundary = np.isin(codes, [ord(c) for c in self.DELIMITERS])
+        marked = np.frombuffer(bytes(events_in_text[:self.text_len]), dtype=np.uint8)
+        boundary[:len(marked)] |= marked.astype(bool)
+        positions = np.arange(self.text_len)
+        # the last boundary at or before each position (-1 if none) ...
+        self.left = np.maximum.accumulate(np.where(boundary, positions, -1))
+        # ... and the first one at or after it (text_len if none)
+        self.right = np.minimum.accumulate(np.where(boundary, positions, self.text_len)[::-1])[::-1]
+
+
+def expand_span(beg: int, end: int, boundaries: WordBoundaries) -> Tuple[int, int]:
+    """
+    Expand a span to the word boundaries around it, skipping over the characters right next to it.
+    """
+    if beg - 2 < 0:
+        ebeg = beg - 1
+    elif boundaries.text_len == 0:
+        ebeg = 0
+    else:
+        ebeg = int(boundaries.left[min(beg - 2, boundaries.text_len - 1)]) + 1
+
+    if end + 1 >= boundaries.text_len:
+        eend = end + 1
+    else:
+        eend = int(boundaries.right[end + 1])
+    return ebeg, eend
+
+
+class SpanIndex:
+    """
+    An index of gold spans, to look up the ones an answer span can match without comparing it to all of them.
+
+    Spans are (begin, end) pairs, and in the soft modes, gold spans are expected to be expanded already.
+    Exact matches are looked up by offsets. For overlap and containment, spans are sorted by their begin
+    offset, and since no span is longer than the longest one, only those beginning within that distance of
+    the answer span are candidates.
+    """
+
+    def __init__(
+        self, spans: List[Tuple[str, int, int]], do_soft_span: bool, do_soft_overlap: bool
+    ) -> None:
+        self.do_soft_span = do_soft_span
+        self.do_soft_overlap = do_soft_overlap
+        self.by_offsets: Dict[Tuple[int, int], List[str]] = {}
+        for cur_id, beg, end in spans:
+            self.by_offsets.setdefault((beg, end), []).append(cur_id)
+        self.sorted_spans = sorted(spans, key=lambda span: span[1])
+        self.begins = [beg for _, beg, _ in self.sorted_spans]
+        self.max_len = max([end - beg for _, beg, end in spans], default=0)
+
+    def matches(self, abeg: int, aend: int) -> List[str]:
+        """
+        The ids of the gold spans the answer span from abeg to aend matches.
+        """
+        if self.do_soft_overlap:
+            # (abeg <= gbeg <= aend) or (gbeg <= abeg <= gend), i.e. gbeg <= aend and gend >= abeg
+            lo = bisect.bisect_left(self.begins, abeg - self.max_len)
+            hi = bisect.bisect_right(self.begins, aend)
+            return [cur_id for cur_id, _, gend in self.sorted_spans[lo:hi] if gend >= abeg]
+        elif self.do_soft_span:
+            # the answer span has to be within the (expanded) gold span
+            lo = bisect.bisect_left(self.begins, aend - self.max_len)
+            hi = bisect.bisect_right(self.begins, abeg)
+            return [cur_id for cur_id, _, gend in self.sorted_spans[lo:hi] if gend >= aend]
+        return self.by_offsets.get((abeg, aend), [])
+
+
+class DocumentMatcher:
+    """
+    Matches the answer annotations of a document against its gold annotations.
+
+    Gold spans and events are indexed by class and offsets, so that each answer is only compared to the few
+    gold annotations it can possibly match, and the equivalence of (nested) events is memoized, so that
+    each pair of events is compared at most once however often it is reached through event arguments.
+    """
+
+    def __init__(
+        self,
+        a1_annotations: Dict[str, Tuple[str, int, int]],
+        answers_span: Dict[str, Tuple[str, int, int]],
+        answers_frame: Dict[str, Tuple[str, str, List[str]]],
+        golds_span: Dict[str, Tuple[str, int, int]],
+        golds_frame: Dict[str, Tuple[str, str, List[str]]],
+        boundaries: WordBoundaries,
+        task: ScoringTask,
+        do_soft_class: bool,
+        do_soft_args: bool,
+        do_soft_span: bool,
+        do_soft_overlap_span: bool,
+    ) -> None:
+        self.a1_annotations = a1_annotations
+        self.answers_span = answers_span
+        self.answers_frame = answers_frame
+        self.golds_span = golds_span
+        self.golds_frame = golds_frame
+        self.boundaries = boundaries
+        self.task = task
+        self.do_soft_class = do_soft_class
+        self.do_soft_args = do_soft_args
+        self.do_soft_span = do_soft_span
+        self.do_soft_overlap_span = do_soft_overlap_span
+        self.event_matches: Dict[Tuple[str, str], bool] = {}
+
+    def frame_class(self, frame: Tuple[str, str, List[str]]) -> str:
+        if self.do_soft_class:
+            return make_soft_classes(frame[0])
+        return frame[0]
+
+    def gold_span(self, beg: int, end: int) -> Tuple[int, int]:
+        if self.do_soft_span and not self.do_soft_overlap_span:
+            return expand_span(beg, end, self.boundaries)
+        return beg, end
+
+    def spans_match(self, abeg: int, aend: int, gbeg: int, gend: int) -> bool:
+        if self.do_soft_overlap_span:
+            return (abeg <= gbeg and aend >= gbeg) or (gbeg <= abeg and gend >= abeg)
+        elif self.do_soft_span:
+            gbeg, gend = self.gold_span(gbeg, gend)
+            return abeg >= gbeg and aend <= gend
+        else:
+            return abeg == gbeg and aend == gend
+
+    def args(self, frame: Tuple[str, str, List[str]]) -> List[str]:
+        args = frame[2]
+        if self.do_soft_args:
+            # ignore everything after the last primary argument
+            while not args[-1].startswith(self.task.primary_role + ":"):
+                args = args[:-1]
+        return args
+
+    def events_match(self, aid: str, gid: str) -> bool:
+        """
+        Whether the answer event or modification aid is equivalent to the gold one gid: their classes match,
+        their trigger spans match (for events), and their arguments match, recursively.
+        """
+        key = (aid, gid)
+        matches = self.event_matches.get(key)
+        if matches is None:
+            # an event that is reached again while comparing its own arguments is circular, and doesn't match
+            self.event_matches[key] = False
+            matches = self.event_matches[key] = self._events_match(aid, gid)
+        return matches
+
+    def _events_match(self, aid: str, gid: str) -> bool:
+        if aid not in self.answers_frame:
+            return False
+        answer = self.answers_frame[aid]
+        gold = self.golds_frame[gid]
+        if self.frame_class(answer) != self.frame_class(gold):
+            return False
+        if aid.startswith("E"):
+            if not gid.startswith("E"):
+                logger.error("failed to find the span: (" + aid + ", " + gid + ")")
+                return False
+            abeg, aend = self.answers_span[answer[1]][1:]
+            gbeg, gend = self.golds_span[gold[1]][1:]
+            if not self.spans_match(abeg, aend, gbeg, gend):
+                return False
+        return self.args_match(answer, gold)
+
+    def args_match(self, answer: Tuple[str, str, List[str]], gold: Tuple[str, str, List[str]]) -> bool:
+        ae_args = self.args(answer)
+        ge_args = self.args(gold)
+        if len(ge_args) != len(ae_args):
+            return False
+
+        # compare argument lists as ordered lists
+        for ae_arg, ge_arg in zip(ae_args, ge_args):
+            aatype, aaid = ae_arg.split(":")
+            gatype, gaid = ge_arg.split(":")
+
+            if not self.do_soft_args and aatype != gatype:
+                return False
+            # both have to be either t-entities or events
+            if aaid[0] != gaid[0]:
+                return False
+            if aaid.startswith("E") and not self.events_match(aaid, gaid):
+                return False
+            if aaid.startswith("T") and not self.entities_match(aaid, gaid):
+                return False
+        return True
+
+    def entities_match(self, aid: str, gid: str) -> bool:
+        if aid in self.a1_annotations:
+            # given entities have to be the very same entity
+            return aid == gid
+        if not self.task.match_span_arguments or aid not in self.answers_span or gid not in self.golds_span:
+            return False
+        acls, abeg, aend = self.answers_span[aid]
+        gcls, gbeg, gend = self.golds_span[gid]
+        if self.do_soft_class:
+            acls = make_soft_classes(acls)
+            gcls = make_soft_classes(gcls)
+        return acls == gcls and self.spans_match(abeg, aend, gbeg, gend)
+
+    def count_match(self) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """
+        The number of answer and gold events of each class that match any gold and answer event respectively.
+        """
+        # gold events by class, and by trigger span
+        gold_events: Dict[str, List[Tuple[str, int, int]]] = {}
+        gold_others: Dict[str, List[str]] = {}
+        for gid, gold in self.golds_frame.items():
+            if gid.startswith("E"):
+                _, gbeg, gend = self.golds_span[gold[1]]
+                gbeg, gend = self.gold_span(gbeg, gend)
+                gold_events.setdefault(self.frame_class(gold), []).append((gid, gbeg, gend))
+            gold_others.setdefault(self.frame_class(gold), []).append(gid)
+        event_indexes = {
+            cl: SpanIndex(spans, self.do_soft_span, self.do_soft_overlap_span)
+            for cl, spans in gold_events.items()
+        }
+
+        matched_answers = set()
+        matched_golds = set()
+        for aid, answer in self.answers_frame.items():
+            cl = self.frame_class(answer)
+            if aid.startswith("E"):
+                if cl not in event_indexes:
+                    continue
+                _, abeg, aend = self.answers_span[answer[1]]
+                candidates = event_indexes[cl].matches(abeg, aend)
+            elif aid.startswith("M"):
+                candidates = gold_others.get(cl, [])
+            else:
+                continue
+            for gid in candidates:
+                if self.events_match(aid, gid):
+                    matched_answers.add(aid)
+                    matched_golds.add(gid)
+
+        return (
+            count_classes(self.answers_frame, matched_answers),
+            count_classes(self.golds_frame, matched_golds),
+        )
+
+    def count_match_span(self) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """
+        The number of answer and gold spans of each class that match any gold and answer span respectively.
+        """
+        gold_ids = [gid for gid in self.golds_span if gid.startswith("T")]
+        gold_index = SpanIndex(
+            [(gid,) + self.gold_span(*self.golds_span[gid][1:]) for gid in gold_ids],
+            self.do_soft_span,
+            self.do_soft_overlap_span,
+        )
+        gold_id_set = set(gold_ids)
+
+        matched_answers = set()
+        matched_golds = set()
+        for aid, answer in self.answers_span.items():
+            if not aid.startswith("T"):
+                continue
+            if aid in self.a1_annotations:
+                # a given entity only matches itself
+                candidates = [aid] if aid in gold_id_set else []
+            else:
+                candidates = gold_index.matches(answer[1], answer[2])
+            if candidates:
+                matched_answers.add(aid)
+                matched_golds.update(candidates)
+
+        return (
+            count_classes(self.answers_span, matched_answers),
+            count_classes(self.golds_span, matched_golds),
+        )
+
+
+def count_classes(annotations: Mapping[str, Tuple[Any, ...]], ids: Set[str]) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for cur_id in ids:
+        cur_class = annotations[cur_id][0]
+        counts[cur_class] = counts.get(cur_class, 0) + 1
+    return counts
+
+
+def adjust_duplicates(counts: Dict[str, Dict[str, int]], classes: Tuple[str, ...], events: bool) -> None:
+    """
+    Don't count more matched answers of a class than matched golds, for the given classes. For events,
+    the surplus answers are dropped altogether.
+    """
+    for cl in classes:
+        surplus = counts["matched_answer"].get(cl, 0) - counts["matched_gold"].get(cl, 0)
+        if surplus > 0:
+            counts["matched_answer"][cl] -= surplus
+            if events:
+                counts["answer"][cl] -= surplus
+
+
+def score_document(
+    hypo_file: str,
+    gold_dir: str,
+    task: ScoringTask,
+    do_soft_class: bool,
+    do_soft_args: bool,
+    do_soft_span: bool,
+    do_soft_overlap_span: bool,
+) -> Tuple[Dict[str, Dict[str, int]], Dict[str, Dict[str, int]]]:
+    """
+    Score the answers in hypo_file against the gold annotations of the same document in gold_dir.
+
+    Returns:
+        The event and the span counts of the document, as tables by class for each of COUNT_NAMES.
+    """
+    f_dir, f_base = os.path.split(hypo_file)
+    pmid = DOC_FILE.sub("\\1", f_base)
+    a1_annotations: Dict[str, Tuple[str, int, int]] = {}
+    equiv: Dict[str, str] = {}
+
+    # read text file
+    text, text_len = read_text_file(gold_dir + "/" + pmid + ".txt")
+    events_in_text = bytearray(text_len)
+
+    # read given annotations
+    if os.path.exists(gold_dir + "/" + pmid + ".a1"):
+        a1_annotations, events_in_text = read_a1_file(gold_dir + "/" + pmid + ".a1", events_in_text)
+
+    # read gold annotations
+    (
+        gold_span_annotations,
+        gold_frame_annotations,
+        num_gold,
+        num_gold_span,
+        events_in_text,
+        equiv
+    ) = read_a2_file(gold_dir + "/" + pmid + ".a2.t1", events_in_text, equiv, "G", task)
+    boundaries = WordBoundaries(text, events_in_text)
+
+    # read answers from system
+    (
+        answer_span_predictions,
+        answer_frame_predictions,
+        num_answer,
+        num_answer_span,
+        events_in_text,
+        equiv
+    ) = read_a2_file(f_dir + "/" + f_base, events_in_text, equiv, "A", task)
+
+    matcher = DocumentMatcher(
+        a1_annotations,
+        answer_span_predictions,
+        answer_frame_predictions,
+        gold_span_annotations,
+        gold_frame_annotations,
+        boundaries,
+        task,
+        do_soft_class,
+        do_soft_args,
+        do_soft_span,
+        do_soft_overlap_span,
+    )
+
+    # get number of matched spans
+    num_matched_answer_span, num_matched_gold_span = matcher.count_match_span()
+    span_counts = {
+        "gold": num_gold_span,
+        "matched_gold": num_matched_gold_span,
+        "answer": num_answer_span,
+        "matched_answer": num_matched_answer_span,
+    }
+    adjust_duplicates(span_counts, task.span_classes, events=False)
+
+    num_matched_answer, num_matched_gold = matcher.count_match()
+    event_counts = {
+        "gold": num_gold,
+        "matched_gold": num_matched_gold,
+        "answer": num_answer,
+        "matched_answer": num_matched_answer,
+    }
+    adjust_duplicates(event_counts, task.event_classes, events=True)
+
+    return event_counts, span_counts
+
+
+def score(
+    hypo: str,
+    gold: str,
+    task: ScoringTask,
+    do_soft_class: bool = False,
+    do_soft_args: bool = False,
+    do_soft_span: bool = False,
+    do_soft_overlap_span: bool = False,
+    n_jobs: int = 1,
+) -> Tuple[Dict[str, Dict[str, int]], Dict[str, Dict[str, int]]]:
+    """
+    Score all answer files in the hypo directory against the gold annotations in the gold directory.
+
+    Args:
+        n_jobs: The number of worker processes to score documents in.
+
+    Returns:
+        The event and the span counts of all documents, as tables by class for each of COUNT_NAMES.
+    """
+    files = [f for extension in task.extensions for f in glob.glob(hypo + "/*" + extension)]
+    score_file = functools.partial(
+        score_document,
+        gold_dir=gold,
+        task=task,
+        do_soft_class=do_soft_class,
+        do_soft_args=do_soft_args,
+        do_soft_span=do_soft_span,
+        do_soft_overlap_span=do_soft_overlap_span,
+    )
+
+    event_totals = {name: {cl: 0 for cl in task.event_classes} for name in COUNT_NAMES}
+    span_totals = {name: {cl: 0 for cl in task.span_classes} for name in COUNT_NAMES}
+
+    def add(totals: Dict[str, Dict[str, int]], counts: Dict[str, Dict[str, int]]) -> None:
+        for name in COUNT_NAMES:
+            for cl in totals[name]:
+                totals[name][cl] += counts[name].get(cl, 0)
+
+    pool: Optional[Any] = None
+    documents: Iterable[Tuple[Dict[str, Dict[str, int]], Dict[str, Dict[str, int]]]]
+    if n_jobs > 1 and len(files) > 1:
+        pool = multiprocessing.Pool(min(n_jobs, len(files)))
+        chunk_size = max(1, len(files) // (4 * n_jobs))
+        documents = pool.imap_unordered(score_file, files, chunk_size)
+    else:
+        documents = map(score_file, files)
+    try:
+        for event_counts, span_counts in documents:
+            add(event_totals, event_counts)
+            add(span_totals, span_counts)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return event_totals, span_totals
+
+
+# CALCULATE AND OUTPUT RESULTS
+
+
+def print_report(
+    task: ScoringTask, event_totals: Dict[str, Dict[str, int]], span_totals: Dict[str, Dict[str, int]]
+) -> None:
+    def report_total(label: str, totals: Dict[str, Dict[str, int]], classes: Tuple[str, ...]) -> None:
+        report(label, *[sum(totals[name][cl] for cl in classes) for name in COUNT_NAMES])
+
+    report_headline()
+
+    print("-------------- SPAN EVALUATION ------------------")
+    for cl in task.span_classes:
+        report(cl, *[span_totals[name][cl] for name in COUNT_NAMES])
+    report_total("=[TOTAL]=", span_totals, task.span_classes)
+    print("----------------------------------------------")
+    print("-------------- EVENT EVALUATION ------------------")
+
+    for classes, label, total_classes in task.sections:
+        for cl in classes:
+            report(cl, *[event_totals[name][cl] for name in COUNT_NAMES])
+        report_total(label, event_totals, total_classes)
+        print("----------------------------------------------")
+
+
+# MAIN
+
+
+def scoring_command(task: Optional[ScoringTask] = None) -> click.Command:
+    """
+    A command line interface to score answers for the given task, or for the task of a task specification
+    given on the command line.
+    """
+    def command(
+        hypo: str,
+        gold: str,
+        verbose: bool,
+        soft_span: bool,
+        soft_overlap_span: bool,
+        n_jobs: int,
+        task_spec: Optional[str] = None,
+    ) -> None:
+        if verbose:
+            logging.basicConfig(level=logging.INFO)
+        scoring_task = task
+        if scoring_task is None:
+            from dere.taskspec import load_from_xml
+            assert task_spec is not None
+            scoring_task = ScoringTask.from_task_spec(load_from_xml(task_spec))
+        event_totals, span_totals = score(
+            hypo,
+            gold,
+            scoring_task,
+            do_soft_span=soft_span,
+            do_soft_overlap_span=soft_overlap_span,
+            n_jobs=n_jobs,
+        )
+        print_report(scoring_task, event_totals, span_totals)
+
+    params: List[click.Parameter] = [
+        click.Option(["--hypo"], required=True),
+        click.Option(["--gold"], required=True),
+        click.Option(["--verbose"], is_flag=True, default=False),
+        click.Option(["--soft-span"], is_flag=True, default=False),
+        click.Option(["--soft-overlap-span"], is_flag=True, default=False),
+        click.Option(["--n-jobs"], type=int, default=1, help="Number of documents to score in parallel"),
+    ]
+    if task is None:
+        params.append(click.Option(["--task-spec"], required=True))
+    return click.Command("deRE_evaluation", callback=command, params=params)
+
+
+if __name__ == "__main__":
+    scoring_command()()
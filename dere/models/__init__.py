@@ -1,4 +1,22 @@
+import importlib
+from typing import Any
+
 from ._model import Model
-from ._baseline.baseline_model import BaselineModel
-from ._nop_model import NOPModel
-from ._bio_span_model import BIOSpanModel
+
+__all__ = ["Model", "BaselineModel", "NOPModel", "BIOSpanModel"]
+
+# Models are imported when they are first accessed, so that e.g. "dere evaluate" doesn't have to import
+# the baseline and its dependencies.
+_MODELS = {
+    "BaselineModel": "._baseline.baseline_model",
+    "NOPModel": "._nop_model",
+    "BIOSpanModel": "._bio_span_model",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _MODELS:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    model_class = getattr(importlib.import_module(_MODELS[name], __name__), name)
+    globals()[name] = model_class
+    return model_class
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+from .dependency_tree import DependencyTree
+
+
+def token_distance(tokens1: range, tokens2: range) -> int:
+    """
+    The distance between the closest tokens of two token ranges: 0 if they overlap, 1 if they are adjacent.
+    """
+    if not tokens1 or not tokens2:
+        return 0
+    return max(0, tokens2.start - (tokens1.stop - 1), tokens1.start - (tokens2.stop - 1))
+
+
+@dataclass
+class CandidateFilter:
+    """
+    Decides which candidate (anchor, filler) span pairs of an instance the SlotClassifier considers at all.
+    Pairs that are filtered out are never featurized or classified, and so never become slot fillers.
+
+    Attributes:
+        max_token_distance: The maximum token_distance between the two spans: 0 keeps only overlapping
+            spans, 1 also adjacent ones, 2 also those with one token between them, and so on.
+        max_dependency_distance: The maximum length of the dependency path between the two spans. Spans in
+            different sentences have no dependency path and are dropped if this is set.
+        max_fillers_per_anchor: The number of closest (by token distance) candidate fillers to keep for
+            each anchor.
+    """
+    max_token_distance: Optional[int] = None
+    max_dependency_distance: Optional[int] = None
+    max_fillers_per_anchor: Optional[int] = None
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]] = None) -> CandidateFilter:
+        return cls(**(config or {}))
+
+    @property
+    def active(self) -> bool:
+        return any(
+            limit is not None
+            for limit in [self.max_token_distance, self.max_dependency_distance, self.max_fillers_per_anchor]
+        )
+
+    def keep(
+            self,
+            tree: DependencyTree,
+            anchors: Sequence[Any],
+            tokens1_list: Sequence[range],
+            tokens2_list: Sequence[range],
+    ) -> List[bool]:
+        """
+        Whether to keep each of the span pairs of an instance, given the token ranges of their anchors and
+        fillers.
+        """
+        distances = [
+            token_distance(tokens1, tokens2) for tokens1, tokens2 in zip(tokens1_list, tokens2_list)
+        ]
+        keep = [True] * len(distances)
+        for i, (tokens1, tokens2) in enumerate(zip(tokens1_list, tokens2_list)):
+            if self.max_token_distance is not None and distances[i] > self.max_token_distance:
+                keep[i] = False
+            elif self.max_dependency_distance is not None:
+                _, path = tree.shortest_path(tokens1, tokens2)
+                if path is None or len(path) - 1 > self.max_dependency_distance:
+                    keep[i] = False
+        if self.max_fillers_per_anchor is not None:
+            by_anchor: Dict[Any, List[int]] = {}
+            for i, anchor in enumerate(anchors):
+                if keep[i]:
+                    by_anchor.setdefault(anchor, []).append(i)
+            for indices in by_anchor.values():
+                # stable, so ties go to the pair that came first
+                for i in sorted(indices, key=lambda i: distances[i])[self.max_fillers_per_anchor:]:
+                    keep[i] = False
+        return keep
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+from typing import List, Optional, Sequence, Tuple
+
+from spacy.tokens import Doc
+
+
+class DependencyTree:
+    """
+    The dependency parse of a doc as a parent array over token indices. Roots are their own parents, and
+    a doc with several sentences is a forest.
+
+    Since there is exactly one path between two tokens of the same tree, paths are found by walking up
+    from both tokens to their lowest common ancestor, without any graph search.
+    """
+    def __init__(self, heads: Sequence[int], words: Sequence[str], deps: Sequence[str]) -> None:
+        self.heads = list(heads)
+        self.words = list(words)
+        self.deps = list(deps)
+        n = len(self.heads)
+        self.depth = [-1] * n
+        self.root = [-1] * n
+        for i in range(n):
+            # walk up to the first token whose depth is known (or the root), then fill in the way back
+            chain = []
+            j = i
+            while self.depth[j] < 0 and self.heads[j] != j:
+                chain.append(j)
+                j = self.heads[j]
+            if self.depth[j] < 0:
+                self.depth[j] = 0
+                self.root[j] = j
+            for k in reversed(chain):
+                self.depth[k] = self.depth[self.heads[k]] + 1
+                self.root[k] = self.root[j]
+
+    @classmethod
+    def from_doc(cls, doc: Doc) -> DependencyTree:
+        return cls(
+            [token.head.i for token in doc],
+            [token.text for token in doc],
+            [token.dep_ for token in doc],
+        )
+
+    def path(self, i: int, j: int) -> Optional[List[int]]:
+        """
+        The tokens on the path from token i to token j (both included), or None if they are in different
+        sentences.
+        """
+        if self.root[i] != self.root[j]:
+            return None
+        up = [i]
+        down = [j]
+        while self.depth[up[-1]] > self.depth[down[-1]]:
+            up.append(self.heads[up[-1]])
+        while self.depth[down[-1]] > self.depth[up[-1]]:
+            down.append(self.heads[down[-1]])
+        while up[-1] != down[-1]:
+            up.append(self.heads[up[-1]])
+            down.append(self.heads[down[-1]])
+        return up + down[-2::-1]
+
+    def shortest_path(
+            self, tokens1: Sequence[int], tokens2: Sequence[int]
+    ) -> Tuple[int, Optional[List[int]]]:
+        """
+        The shortest path between any token of tokens1 and any token of tokens2, and its length in edges.
+
+        As with the networkx paths SlotClassifier used to compute, the length is -1 as soon as any pair of
+        tokens is unconnected (and then the shortest of the connected paths is still returned). Ties go to
+        the first pair.
+        """
+        shortest: Optional[List[int]] = None
+        unconnected = not tokens1 or not tokens2
+        for token1 in tokens1:
+            for token2 in tokens2:
+                this = self.path(token1, token2)
+                if this is None:
+                    unconnected = True
+                elif shortest is None or len(this) < len(shortest):
+                    shortest = this
+        if unconnected or shortest is None:
+            return -1, shortest
+        return len(shortest) - 1, shortest
+
+    def path_features(self, tokens1: Sequence[int], tokens2: Sequence[int]) -> Tuple[int, str, str]:
+        """
+        The length of the shortest path between two groups of tokens, its words, and its words interleaved
+        with the dependency labels of its edges.
+        """
+        distance, shortest = self.shortest_path(tokens1, tokens2)
+        if shortest is None:
+            return distance, "", ""
+        words_deps = [self.words[shortest[0]]]
+        for left, right in zip(shortest, shortest[1:]):
+            # an edge is labelled with the relation of the child to its head
+            words_deps.append(self.deps[left] if self.heads[left] == right else self.deps[right])
+            words_deps.append(self.words[right])
+        return distance, " ".join(self.words[i] for i in shortest), " ".join(words_deps)
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+import pycrfsuite
+
+Features = Dict[str, Union[str, bool]]
+
+
+def _attributes(features: Features) -> Iterator[str]:
+    # the same attributes python-crfsuite derives from a feature dict. False features have a value of zero
+    # and never contribute to a score, so they can be left out
+    for key, value in features.items():
+        if isinstance(value, str):
+            yield key + ":" + value
+        elif value:
+            yield key
+
+
+class EncodedSequences:
+    """
+    A list of feature sequences, in which every token is represented by the ids of its attributes. The ids
+    of each sequence are kept in a single array, together with an array of offsets marking where each
+    token's ids start.
+
+    EncodedSequences can be passed to a CRF wherever a list of feature dict sequences is expected. The
+    crfsuite item sequences are built once, on first use, and then reused for every fit and prediction.
+    crfsuite only takes string attribute names, so the ids are handed to it as strings and it still hashes
+    them itself; the encoding saves memory and the conversion of feature dicts, not CRF training time.
+
+    Item sequences can't be pickled, so they are left out when EncodedSequences are sent to worker
+    processes, and each trial of a parallel search builds the ones it uses again.
+    """
+    def __init__(self, ids: List[np.ndarray], offsets: List[np.ndarray]) -> None:
+        self.ids = ids
+        self.offsets = offsets
+        self._item_sequences: Optional[List[pycrfsuite.ItemSequence]] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, index: Union[slice, Sequence[int]]) -> EncodedSequences:
+        # a subset shares the item sequences that have been built already, or builds only its own
+        item_sequences = self._item_sequences
+        if isinstance(index, slice):
+            subset = EncodedSequences(self.ids[index], self.offsets[index])
+            if item_sequences is not None:
+                subset._item_sequences = item_sequences[index]
+        else:
+            subset = EncodedSequences([self.ids[i] for i in index], [self.offsets[i] for i in index])
+            if item_sequences is not None:
+                subset._item_sequences = [item_sequences[i] for i in index]
+        return subset
+
+    def __iter__(self) -> Iterator[pycrfsuite.ItemSequence]:
+        return iter(self.item_sequences())
+
+    def __add__(self, other: EncodedSequences) -> EncodedSequences:
+        result = EncodedSequences(self.ids + other.ids, self.offsets + other.offsets)
+        if self._item_sequences is not None and other._item_sequences is not None:
+            result._item_sequences = self._item_sequences + other._item_sequences
+        return result
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = dict(self.__dict__)
+        state["_item_sequences"] = None
+        return state
+
+    def item_sequences(self) -> List[pycrfsuite.ItemSequence]:
+        if self._item_sequences is None:
+            self._item_sequences = [
+                pycrfsuite.ItemSequence([
+                    [str(i) for i in ids[left:right]] for left, right in zip(offsets[:-1], offsets[1:])
+                ])
+                for ids, offsets in zip(self.ids, self.offsets)
+            ]
+        return self._item_sequences
+
+    def merge(self, other: EncodedSequences) -> EncodedSequences:
+        """
+        Token-wise union of the attributes of two encodings of the same sequences, e.g. of general and of
+        span type specific features.
+        """
+        ids = []
+        offsets = []
+        for ids1, offsets1, ids2, offsets2 in zip(self.ids, self.offsets, other.ids, other.offsets):
+            # each token's ids from self are followed by its ids from other, so the tokens shift by the
+            # number of ids from other before them (and vice versa)
+            tokens1 = np.repeat(np.arange(len(offsets1) - 1), np.diff(offsets1))
+            tokens2 = np.repeat(np.arange(len(offsets2) - 1), np.diff(offsets2))
+            merged = np.empty(len(ids1) + len(ids2), dtype=ids1.dtype)
+            merged[np.arange(len(ids1)) + offsets2[tokens1]] = ids1
+            merged[np.arange(len(ids2)) + offsets1[tokens2 + 1]] = ids2
+            ids.append(merged)
+            offsets.append(offsets1 + offsets2)
+        return EncodedSequences(ids, offsets)
+
+
+class FeatureEncoder:
+    """
+    Maps the attributes of feature dicts to integer ids. The vocabulary is built once per training run, so
+    the same encoding can be shared between all span types and hyperparameter setups.
+    """
+    def __init__(self) -> None:
+        self.vocabulary: Dict[str, int] = {}
+
+    def encode(self, X: List[List[Features]], grow: bool = False) -> EncodedSequences:
+        """
+        Args:
+            X: A list of feature dict sequences.
+            grow: Whether to add unseen attributes to the vocabulary. If False, they are dropped, which is
+                what crfsuite does with attributes it hasn't seen during training anyway.
+        """
+        vocabulary = self.vocabulary
+        all_ids = []
+        all_offsets = []
+        for sequence in X:
+            ids: List[int] = []
+            offsets = [0]
+            for features in sequence:
+                for attribute in _attributes(features):
+                    index = vocabulary.get(attribute)
+                    if index is None:
+                        if not grow:
+                            continue
+                        index = vocabulary[attribute] = len(vocabulary)
+                    ids.append(index)
+                offsets.append(len(ids))
+            all_ids.append(np.array(ids, dtype=np.int32))
+            all_offsets.append(np.array(offsets, dtype=np.int32))
+        return EncodedSequences(all_ids, all_offsets)
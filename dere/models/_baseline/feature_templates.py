@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import re
+import string
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from nltk.stem import PorterStemmer
+
+from dere.corpus import Instance
+from dere.taskspec import SpanType
+
+from .feature_encoding import Features
+
+FeatureValue = Union[str, bool]
+
+_stemmer = PorterStemmer()
+_DIGITS = frozenset(string.digits)
+# only these characters count as punctuation, as they always have, so that results stay comparable
+_PUNCT = frozenset(".,-")
+
+
+def _shape(word: str) -> str:
+    # e.g. "CTLA-4" -> "X-d", "Mediated" -> "Xx"
+    shape = re.sub("[A-Z]+", "X", word)
+    shape = re.sub("[a-z]+", "x", shape)
+    return re.sub("[0-9]+", "d", shape)
+
+
+# the kinds of features that can be computed from a token's text
+WORD_FEATURES: Dict[str, Callable[[str], FeatureValue]] = {
+    "lower": lambda word: word.lower(),
+    "isupper": lambda word: word.isupper(),
+    "istitle": lambda word: word.istitle(),
+    "isdigit": lambda word: word.isdigit(),
+    "containsdigit": lambda word: not _DIGITS.isdisjoint(word),
+    "containspunct": lambda word: not _PUNCT.isdisjoint(word),
+    "stem": lambda word: _stemmer.stem(word),
+    "prefix3": lambda word: word[:3],
+    "suffix3": lambda word: word[-3:],
+    "shape": _shape,
+}
+
+DEFAULT_WINDOW = [0, -1, 1]
+DEFAULT_WORD_FEATURES = ["lower", "isupper", "istitle", "isdigit", "containsdigit", "containspunct", "stem"]
+
+
+def is_token_in_span(instance: Instance, token: Tuple[int, int], span_type: SpanType) -> bool:
+    left, right = token
+    for span in instance.spans:
+        if span.span_type == span_type:
+            if span.left <= left and span.right >= right:
+                return True
+            else:  # If tokenizer does not split the same way as annotation
+                if span.left == left and right > span.right:
+                    return True
+                elif span.right == right and left < span.left:
+                    return True
+    return False
+
+
+class FeatureExtractor:
+    """
+    Token features for the span CRFs, compiled from a feature template.
+
+    Every token gets a set of base features (word features of its text, and whether it lies within a span
+    of each given span type). These are computed once per token and then copied, under a prefix such as
+    "-1:word", to the features of each token whose window includes it. The first and the last token are
+    marked with BOS and EOS features, whatever the window.
+    """
+    def __init__(
+            self,
+            given_span_types: Sequence[SpanType],
+            window: Optional[Sequence[int]] = None,
+            word: Optional[Sequence[str]] = None,
+            given: bool = True,
+    ) -> None:
+        """
+        Args:
+            given_span_types: The span types which are given in the input, rather than predicted.
+            window: The token offsets whose base features are included, in order. Defaults to [0, -1, 1].
+            word: The kinds of word features, i.e. keys of WORD_FEATURES.
+            given: Whether to include membership in spans of the given span types in the base features.
+        """
+        self.window = list(DEFAULT_WINDOW if window is None else window)
+        self.word = list(DEFAULT_WORD_FEATURES if word is None else word)
+        for kind in self.word:
+            if kind not in WORD_FEATURES:
+                raise ValueError("Unknown word feature: %s" % kind)
+        self.given_span_types = list(given_span_types) if given else []
+        self._word_functions = [WORD_FEATURES[kind] for kind in self.word]
+        names = self.word + ["is_" + str(span_type.name) for span_type in self.given_span_types]
+        # the feature names of each window position, e.g. "-1:word.lower"
+        self._keys = [
+            [self._prefix(offset) + "." + name for name in names] for offset in self.window
+        ]
+        # word features only depend on the word, and words repeat a lot
+        self._word_cache: Dict[str, Tuple[FeatureValue, ...]] = {}
+
+    @staticmethod
+    def _prefix(offset: int) -> str:
+        return "word" if offset == 0 else "%+d:word" % offset
+
+    @classmethod
+    def from_config(
+            cls, given_span_types: Sequence[SpanType], config: Optional[Dict[str, Any]] = None
+    ) -> FeatureExtractor:
+        """
+        Compile a feature template from its model spec configuration, e.g.
+        {"window": [0, -1, 1, -2, 2], "word": ["lower", "stem", "shape"], "given": true}.
+        """
+        return cls(given_span_types, **(config or {}))
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = dict(self.__dict__)
+        del state["_word_functions"]
+        state["_word_cache"] = {}
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._word_functions = [WORD_FEATURES[kind] for kind in self.word]
+
+    def _word_values(self, word: str) -> Tuple[FeatureValue, ...]:
+        values = self._word_cache.get(word)
+        if values is None:
+            values = self._word_cache[word] = tuple(function(word) for function in self._word_functions)
+        return values
+
+    def base_features(
+            self, instance: Instance, token_spans: List[Tuple[int, int]]
+    ) -> List[Tuple[FeatureValue, ...]]:
+        text = instance.text
+        base = []
+        for token in token_spans:
+            values = self._word_values(text[token[0]:token[1]])
+            if self.given_span_types:
+                values += tuple(
+                    is_token_in_span(instance, token, span_type) for span_type in self.given_span_types
+                )
+            base.append(values)
+        return base
+
+    def extract(self, instance: Instance, token_spans: List[Tuple[int, int]]) -> List[Features]:
+        base = self.base_features(instance, token_spans)
+        n = len(base)
+        window = list(zip(self.window, self._keys))
+        feature_list = []
+        for i in range(n):
+            features: Features = {}
+            for offset, keys in window:
+                j = i + offset
+                if 0 <= j < n:
+                    features.update(zip(keys, base[j]))
+            if i == 0:
+                features["BOS"] = True
+            if i == n - 1:
+                features["EOS"] = True
+            feature_list.append(features)
+        return feature_list
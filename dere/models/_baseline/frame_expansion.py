@@ -0,0 +1,63 @@
+"""
+Best-first enumeration of the ways to split an overfilled frame.
+
+Both functions take scores sorted in descending order and yield index tuples in order of non-increasing
+total score, keeping a heap of candidates, so that the k best results can be found without enumerating
+all of them.
+"""
+import heapq
+from math import factorial
+from typing import Iterator, Sequence, Set, Tuple
+
+
+def n_combinations(n: int, k: int) -> int:
+    if not 0 <= k <= n:
+        return 0
+    return factorial(n) // (factorial(k) * factorial(n - k))
+
+
+def best_subsets(scores: Sequence[float], size: int) -> Iterator[Tuple[float, Tuple[int, ...]]]:
+    """
+    The subsets of the given size of range(len(scores)), as sorted index tuples, best total score first.
+    """
+    m = len(scores)
+    if size > m:
+        return
+    start = tuple(range(size))
+    heap = [(-sum(scores[i] for i in start), start)]
+    seen: Set[Tuple[int, ...]] = {start}
+    while heap:
+        negative_score, indices = heapq.heappop(heap)
+        yield -negative_score, indices
+        # move a single index one step to the right, if the next position is free
+        for position, index in enumerate(indices):
+            limit = indices[position + 1] if position + 1 < size else m
+            if index + 1 < limit:
+                successor = indices[:position] + (index + 1,) + indices[position + 1:]
+                if successor not in seen:
+                    seen.add(successor)
+                    score = -negative_score - scores[index] + scores[index + 1]
+                    heapq.heappush(heap, (-score, successor))
+
+
+def best_products(scores: Sequence[Sequence[float]]) -> Iterator[Tuple[float, Tuple[int, ...]]]:
+    """
+    The elements of the cartesian product of the given score lists, as index tuples, best total score
+    first.
+    """
+    if any(len(options) == 0 for options in scores):
+        return
+    start = (0,) * len(scores)
+    heap = [(-sum(options[0] for options in scores), start)]
+    seen: Set[Tuple[int, ...]] = {start}
+    while heap:
+        negative_score, indices = heapq.heappop(heap)
+        yield -negative_score, indices
+        for position, index in enumerate(indices):
+            options = scores[position]
+            if index + 1 < len(options):
+                successor = indices[:position] + (index + 1,) + indices[position + 1:]
+                if successor not in seen:
+                    seen.add(successor)
+                    score = -negative_score - options[index] + options[index + 1]
+                    heapq.heappush(heap, (-score, successor))
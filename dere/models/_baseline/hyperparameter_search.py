@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import logging
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+from sklearn.externals import joblib
+
+from dere.utils import progressify
+
+Setup = Dict[str, Any]
+# A trial trains a model with the given setup on the given fraction (the "budget") of the training data,
+# and returns the trained model together with its score on the development data.
+Trial = Callable[[Setup, float], Tuple[Any, float]]
+
+
+@dataclass
+class TraceEntry:
+    setup: Setup
+    budget: float
+    score: float
+    seconds: float
+    pruned: bool = False
+
+
+@dataclass
+class SearchResult:
+    best_setup: Setup
+    best_model: Any
+    best_score: float
+    trace: List[TraceEntry] = field(default_factory=list)
+
+
+def _timed_trial(trial: Trial, setup: Setup, budget: float) -> Tuple[Any, float, float]:
+    start = time.perf_counter()
+    model, score = trial(setup, budget)
+    return model, score, time.perf_counter() - start
+
+
+class SearchStrategy:
+    """
+    A strategy for choosing the best of a list of hyperparameter setups. Strategies only decide which setups
+    to try, on how much data, and in which order -- training and scoring a model is left to the trial
+    function supplied by the classifier. Trials may be run in parallel, in which case the trial function
+    (and everything it references) has to be picklable.
+    """
+    def __init__(self, n_jobs: int = 1, stop_score: Optional[float] = 1.0) -> None:
+        """
+        Args:
+            n_jobs: The number of trials to run in parallel. Negative values are interpreted as by joblib,
+                i.e. -1 uses all cores.
+            stop_score: If a trial reaches this score, no further setups are tried, since we cannot get any
+                better. None disables early stopping.
+        """
+        self.n_jobs = n_jobs
+        self.stop_score = stop_score
+        self.logger = logging.getLogger("dere")
+
+    def search(self, setups: List[Setup], trial: Trial) -> SearchResult:
+        raise NotImplementedError()
+
+    @property
+    def n_workers(self) -> int:
+        if self.n_jobs > 0:
+            return self.n_jobs
+        return max(1, joblib.cpu_count() + 1 + self.n_jobs)
+
+    def _run(self, setups: List[Setup], trial: Trial, budget: float) -> List[Tuple[Any, float, float]]:
+        if self.n_workers == 1 or len(setups) == 1:
+            return [_timed_trial(trial, setup, budget) for setup in setups]
+        results: List[Tuple[Any, float, float]] = joblib.Parallel(n_jobs=self.n_jobs)(
+            joblib.delayed(_timed_trial)(trial, setup, budget) for setup in setups
+        )
+        return results
+
+    def _is_perfect(self, score: float) -> bool:
+        return self.stop_score is not None and score >= self.stop_score
+
+
+class GridSearch(SearchStrategy):
+    """
+    Exhaustive search: every setup is trained on all of the training data. Setups are run in batches of
+    n_jobs, so that the search can still stop early once a setup reaches stop_score.
+    """
+    def search(self, setups: List[Setup], trial: Trial) -> SearchResult:
+        trace: List[TraceEntry] = []
+        best: Optional[Tuple[Any, float, Setup]] = None
+        batch_size = self.n_workers
+        batches = [setups[i:i + batch_size] for i in range(0, len(setups), batch_size)]
+
+        def message(i: int, batch: List[Setup]) -> str:
+            return "{} | {}/{}".format(batch[0], min((i + 1) * batch_size, len(setups)), len(setups))
+
+        for batch in progressify(batches, message):
+            for setup, (model, score, seconds) in zip(batch, self._run(batch, trial, 1.0)):
+                self.logger.debug("[GridSearch] %r: %s (%.1fs)", setup, score, seconds)
+                trace.append(TraceEntry(setup, 1.0, score, seconds))
+                if best is None or score > best[1]:
+                    best = (model, score, setup)
+            assert best is not None
+            if self._is_perfect(best[1]):
+                break
+        assert best is not None
+        return SearchResult(best[2], best[0], best[1], trace)
+
+
+class SuccessiveHalving(SearchStrategy):
+    """
+    Successive halving: all setups are first trained on a small fraction of the training data, and only the
+    best 1/eta of them advance to the next rung, where the budget is multiplied by eta. The last rung trains
+    on all of the training data. Additionally, setups scoring below prune_ratio times the best score of
+    their rung are dropped right away.
+    """
+    def __init__(
+            self, n_jobs: int = 1, stop_score: Optional[float] = 1.0,
+            eta: int = 3, min_budget: float = 0.1, prune_ratio: float = 0.5
+    ) -> None:
+        super().__init__(n_jobs, stop_score)
+        if eta < 2:
+            raise ValueError("eta has to be at least 2")
+        self.eta = eta
+        self.min_budget = min_budget
+        self.prune_ratio = prune_ratio
+
+    def budgets(self, n_setups: int) -> List[float]:
+        n_rungs = 1 + int(math.log(max(n_setups, 1), self.eta))
+        # don't go below the minimal budget
+        max_rungs = 1 + int(math.log(1 / self.min_budget, self.eta) + 1e-9)
+        n_rungs = min(n_rungs, max_rungs)
+        return [self.eta ** (k - n_rungs + 1) for k in range(n_rungs)]
+
+    def search(self, setups: List[Setup], trial: Trial) -> SearchResult:
+        trace: List[TraceEntry] = []
+        survivors = list(setups)
+        budgets = self.budgets(len(setups))
+        best: Optional[Tuple[Any, float, Setup]] = None
+        for rung, budget in enumerate(budgets):
+            last_rung = rung == len(budgets) - 1
+            self.logger.info(
+                "[SuccessiveHalving] rung %d/%d: %d setups on %.0f%% of the data",
+                rung + 1, len(budgets), len(survivors), 100 * budget
+            )
+            results = self._run(survivors, trial, budget)
+            rung_best = max(score for _, score, _ in results)
+            entries = []
+            for setup, (model, score, seconds) in zip(survivors, results):
+                entry = TraceEntry(setup, budget, score, seconds)
+                trace.append(entry)
+                entries.append((entry, model))
+            if last_rung or self._is_perfect(rung_best):
+                # stable, so ties are resolved in favour of setups that came first in the grid
+                entry, model = max(entries, key=lambda em: em[0].score)
+                best = (model, entry.score, entry.setup)
+                break
+            ranked = sorted(entries, key=lambda em: -em[0].score)
+            n_keep = max(1, math.ceil(len(survivors) / self.eta))
+            for i, (entry, _) in enumerate(ranked):
+                if i >= n_keep or entry.score < self.prune_ratio * rung_best:
+                    entry.pruned = True
+            # keep the grid order among the survivors
+            survivors = [entry.setup for entry, _ in entries if not entry.pruned]
+        assert best is not None
+        return SearchResult(best[2], best[0], best[1], trace)
+
+
+SEARCH_STRATEGIES: Dict[str, Type[SearchStrategy]] = {
+    "grid": GridSearch,
+    "halving": SuccessiveHalving,
+}
+
+
+def make_search_strategy(config: Optional[Dict[str, Any]] = None) -> SearchStrategy:
+    """
+    Instantiate a search strategy from its model spec configuration, e.g.
+    {"strategy": "halving", "n_jobs": 4, "eta": 3}. All keys except "strategy" are passed on to the
+    strategy's constructor. Without a configuration, a sequential grid search is used.
+    """
+    config = dict(config or {})
+    name = config.pop("strategy", "grid")
+    if name not in SEARCH_STRATEGIES:
+        raise ValueError("Unknown search strategy: %s" % name)
+    return SEARCH_STRATEGIES[name](**config)
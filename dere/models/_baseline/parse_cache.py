@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+from collections import OrderedDict
+from typing import Any, Callable, Iterable, List, Optional
+
+from spacy.tokens import Doc
+from spacy.vocab import Vocab
+
+
+class ParseCache:
+    """
+    A content-addressed cache of spaCy parses. Docs are keyed by a hash of their text and of the spaCy
+    model (name, version and disabled components) that produced them, so a cache directory can be shared
+    between corpora, runs and models.
+
+    The most recently used docs are kept in memory. If a directory is given, docs are additionally
+    stored there as Doc.to_bytes, one file per text, and survive the process.
+    """
+    def __init__(self, model_key: str, directory: Optional[str] = None, max_size: int = 10000) -> None:
+        """
+        Args:
+            model_key: Identifies the spaCy model and configuration, see make_model_key().
+            directory: Where to store parses on disk. None keeps them in memory only.
+            max_size: The maximum number of docs kept in memory.
+        """
+        self.model_key = model_key
+        self.directory = directory
+        self.max_size = max_size
+        self._docs: OrderedDict[str, Doc] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_model_key(nlp: Any, disable: Iterable[str] = ()) -> str:
+        meta = nlp.meta
+        return "{}_{}-{} -{}".format(
+            meta.get("lang"), meta.get("name"), meta.get("version"), ",".join(sorted(disable))
+        )
+
+    def key(self, text: str) -> str:
+        return hashlib.sha1((self.model_key + "\n" + text).encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        assert self.directory is not None
+        return os.path.join(self.directory, key[:2], key + ".bin")
+
+    def get(self, text: str, vocab: Vocab) -> Optional[Doc]:
+        key = self.key(text)
+        doc = self._docs.get(key)
+        if doc is not None:
+            self._docs.move_to_end(key)
+        elif self.directory is not None and os.path.exists(self._path(key)):
+            with open(self._path(key), "rb") as f:
+                doc = Doc(vocab).from_bytes(f.read())
+            self._remember(key, doc)
+        return doc
+
+    def put(self, text: str, doc: Doc) -> None:
+        key = self.key(text)
+        self._remember(key, doc)
+        if self.directory is not None:
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # write to a temporary file first, so that concurrent runs never see a partial parse
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, "wb") as f:
+                f.write(doc.to_bytes(exclude=["tensor", "user_data"]))
+            os.replace(tmp_path, path)
+
+    def _remember(self, key: str, doc: Doc) -> None:
+        self._docs[key] = doc
+        self._docs.move_to_end(key)
+        while len(self._docs) > self.max_size:
+            self._docs.popitem(last=False)
+
+    def parse(self, texts: List[str], vocab: Vocab, parse: Callable[[List[str]], Iterable[Doc]]) -> List[Doc]:
+        """
+        Look up the parses of texts, and parse the missing ones (all in one call of parse).
+        """
+        docs = [self.get(text, vocab) for text in texts]
+        missing = [i for i, doc in enumerate(docs) if doc is None]
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        if missing:
+            # parse every distinct text once
+            missing_texts = list(OrderedDict.fromkeys(texts[i] for i in missing))
+            parsed = dict(zip(missing_texts, parse(missing_texts)))
+            for text, doc in parsed.items():
+                self.put(text, doc)
+            for i in missing:
+                docs[i] = parsed[texts[i]]
+        return docs  # type: ignore
@@ -1,20 +1,20 @@
 # Author: Laura
 from __future__ import annotations
 
-import copy
+import bisect
+import functools
 import logging
+import os
 import random
 import pickle
+import time
 
-from itertools import chain, combinations, product
+from itertools import chain, combinations, islice, product
 from operator import mul
-from typing import Optional, Dict, Tuple, List, Set, Any, Union, cast, Sequence, IO
+from typing import Optional, Dict, Tuple, List, Set, Any, Union, cast, Sequence, IO, Iterator
 from mypy_extensions import TypedDict
 
-import networkx as nx
 import numpy as np
-import spacy
-import spacy.cli
 
 from spacy.tokens import Doc
 from sklearn.svm import LinearSVC
@@ -25,22 +25,21 @@ from sklearn.metrics import (
     confusion_matrix,
 )
 from sklearn.externals import joblib
-from scipy.sparse import hstack, csr_matrix, spmatrix, vstack
+from scipy.sparse import spmatrix, vstack
 from sklearn.utils import shuffle
 
 from dere.corpus import Corpus, Instance, Frame, Span, Slot, Filler
 from dere.taskspec import TaskSpecification, FrameType, SpanType, SlotType
 from dere.models import Model
 from dere.utils import progressify
+from dere import resources
 
-try:
-    nlp = spacy.load("en")
-except OSError:
-    # This feels dirty :(
-    # A better approach would be to depend upon the model as a module and let dependency handle it.
-    # Unfortunately, those modules are not on PyPi, and so installation would be more complicated
-    spacy.cli.download("en")
-    nlp = spacy.load("en")
+from .candidate_filter import CandidateFilter
+from .dependency_tree import DependencyTree
+from .frame_expansion import best_products, best_subsets, n_combinations
+from .hyperparameter_search import make_search_strategy, TraceEntry
+from .parse_cache import ParseCache
+from .sparse_features import FeatureBlock, NumericBlock, SparseFeatureBuilder, TextBlock
 
 SpanPair = Tuple[Span, Span]
 Edge = Tuple[FrameType, SlotType]
@@ -48,15 +47,109 @@ Label = Union[str, Edge]
 Relation = Tuple[SpanPair, Label]
 Arc = Tuple[FrameType, SlotType]
 _ArrayLike = Union[List, np.ndarray, spmatrix]
+C_GRID = [0.01, 0.03, 0.1, 0.3, 1.0, 3.0, 10.0, 30.0, 100]
+
+
+def _svc_macro_f1(cls: LinearSVC, x: spmatrix, y_gold: np.ndarray, eval_labels: List[int]) -> float:
+    logger = logging.getLogger("dere")
+    y_pred = cls.predict(x)
+    prec, reca, f1, supp = precision_recall_fscore_support(
+        y_gold,
+        y_pred,
+        labels=eval_labels,
+        average="macro",
+    )
+    assert isinstance(f1, float)
+    accuracy = accuracy_score(y_gold, y_pred)
+    for score, name in [
+        (prec, "Precision"),
+        (reca, "Recall"),
+        (f1, "F1-score"),
+        (accuracy, "Accuracy"),
+    ]:
+        logger.info("[SlotClassifier] %r", name + "\t" + str(score))
+
+    logger.debug("[SlotClassifier] Confusion matrix:")
+    logger.debug("[SlotClassifier] %r", confusion_matrix(y_gold, y_pred))
+    return f1
+
+
+# module level, so that trials can be sent to worker processes during a parallel search
+def _svc_trial(
+        setup: Dict[str, Any], budget: float,
+        x: spmatrix, y: np.ndarray,
+        x_dev: spmatrix, y_dev: np.ndarray,
+        eval_labels: List[int]
+) -> Tuple[LinearSVC, float]:
+    n = max(1, int(round(x.shape[0] * budget)))
+    cls = LinearSVC(C=setup["C"], class_weight="balanced", max_iter=10000)
+    cls.fit(x[:n], y[:n])
+    return cls, _svc_macro_f1(cls, x_dev, y_dev, eval_labels)
+
+
+class SpanTokenIndex:
+    """
+    Maps spans to the range of indices of the tokens of a doc that overlap them, by bisecting the token
+    offsets. Ranges are remembered per span.
+    """
+    def __init__(self, doc: Doc) -> None:
+        self.starts = [token.idx for token in doc]
+        self.ends = [token.idx + len(token.text) for token in doc]
+        self._ranges: Dict[Span, range] = {}
+
+    def token_range(self, span: Span) -> range:
+        token_range = self._ranges.get(span)
+        if token_range is None:
+            # the tokens which end after the span starts, and start before it ends
+            first = bisect.bisect_right(self.ends, span.left)
+            last = bisect.bisect_left(self.starts, span.right)
+            token_range = self._ranges[span] = range(first, max(first, last))
+        return token_range
 
 
 class SlotClassifier(Model):
     def __init__(
             self, task_spec: TaskSpecification, model_spec: Dict[str, Any],
-            seed: int = 98765
+            seed: int = 98765,
+            parse_batch_size: int = 256,
+            parse_n_process: int = 1,
+            parse_disable: Sequence[str] = ("ner",),
+            parse_cache: Optional[str] = None,
+            parse_cache_size: int = 10000,
+            spacy_model: str = "en",
+            feature_hashing: Optional[int] = None,
+            max_split_frames: Optional[int] = 1000,
+            search: Optional[Dict[str, Any]] = None,
+            c_grid: Sequence[float] = C_GRID,
+            candidate_filter: Optional[Dict[str, Any]] = None
     ) -> None:
         super().__init__(task_spec, model_spec)
         self.seed = seed
+        # the spaCy pipeline is only loaded once it is needed, see the nlp property
+        self.spacy_model = spacy_model
+        # how instance texts are run through spaCy: we only need the tagger and the dependency parser
+        self.parse_batch_size = parse_batch_size
+        self.parse_n_process = parse_n_process
+        self.parse_disable = list(parse_disable)
+        # parses are always cached in memory, and additionally on disk if a cache directory is given
+        if parse_cache is not None:
+            model_spec_dir = os.path.join(*os.path.split(model_spec['__path__'])[:-1])
+            parse_cache = os.path.join(model_spec_dir, parse_cache)
+        self.parse_cache_dir = parse_cache
+        self.parse_cache_size = parse_cache_size
+        self._parse_cache: Optional[ParseCache] = None
+        # if set, features are hashed into this many columns instead of using fitted vocabularies
+        self.feature_hashing = feature_hashing
+        # the maximum number of frames an overfilled frame is split into, None for no limit
+        self.max_split_frames = max_split_frames
+        # how to search for the best C when a dev corpus is given (see make_search_strategy), and what was
+        # tried. Parallel trials get the training data as memory-mapped arrays, shared between the workers.
+        self.search_strategy = make_search_strategy(search)
+        self.c_grid = list(c_grid)
+        self.search_trace: List[TraceEntry] = []
+        # which candidate span pairs to consider at all. It is saved with the model, so that predictions use
+        # the same filter the classifier was trained with.
+        self.candidate_filter = CandidateFilter.from_config(candidate_filter)
 
         # TODO(Sean) move this to model.__init__
         self.logger = logging.getLogger("dere")
@@ -98,9 +191,10 @@ class SlotClassifier(Model):
         return X_shuffled, y_shuffled
 
     def train(self, corpus: Corpus, dev_corpus: Optional[Corpus] = None) -> None:
-        x_tmp, y_tmp, _ = self.get_features_and_labels(corpus, is_train=True)
+        x_tmp, y_tmp, _, _ = self.get_features_and_labels(corpus, is_train=True)
 
         x, y = self.shuffle(x_tmp, y_tmp)
+        assert isinstance(x, spmatrix) and isinstance(y, np.ndarray)
 
         self.logger.info("[SlotClassifier] Using " + str(x.shape[0]) + " instances for training")
 
@@ -108,65 +202,68 @@ class SlotClassifier(Model):
             self.cls = LinearSVC(max_iter=10000)
             self.cls.fit(x, y)
         else:
-            x_dev, y_dev, _ = self.get_features_and_labels(dev_corpus)
-            best_f1 = -1.0
-            best_c = 0.0
-            best_cls = None
-            self.logger.info("[SlotClassifier] Starting grid search...")
-            for c_param in progressify([0.01, 0.03, 0.1, 0.3, 1.0, 3.0, 10.0, 30.0, 100]):
-                self.cls = LinearSVC(C=c_param, class_weight="balanced", max_iter=10000)
-                self.cls.fit(x, y)
-                self.logger.debug("[SlotClassifier] current c: " + str(c_param))
-                micro_f1 = self._eval(dev_corpus, x=x_dev, y_gold=y_dev)
-                if micro_f1 > best_f1:
-                    best_c = c_param
-                    best_cls = copy.deepcopy(self.cls)
-                    best_f1 = micro_f1
-            assert best_cls is not None
+            x_dev, y_dev, _, _ = self.get_features_and_labels(dev_corpus)
+            self.logger.info("[SlotClassifier] Starting grid search over C: %s", self.c_grid)
+            trial = functools.partial(
+                _svc_trial, x=x, y=y, x_dev=x_dev, y_dev=y_dev, eval_labels=self._eval_labels()
+            )
+            result = self.search_strategy.search([{"C": c} for c in self.c_grid], trial)
+            self.search_trace = result.trace
+            for entry in result.trace:
+                self.logger.info(
+                    "[SlotClassifier] C=%s: macro F1 %.4f (%.1fs%s)",
+                    entry.setup["C"], entry.score, entry.seconds,
+                    ", %.0f%% of the data" % (100 * entry.budget) if entry.budget < 1 else "",
+                )
             self.logger.info("[SlotClassifier] Grid search done")
-            self.logger.debug("[SlotClassifier] Best c: " + str(best_c))
+            best_c = result.best_setup["C"]
+            self.logger.info("[SlotClassifier] Best C: %s (macro F1 %.4f)", best_c, result.best_score)
             self.logger.info("[SlotClassifier] Training on all training data...")
-            dev_x, dev_y, _ = self.get_features_and_labels(dev_corpus, is_train=False)
-            assert(isinstance(x, spmatrix))
-            train_x_all_tmp = vstack([x, dev_x])
+            train_x_all_tmp = vstack([x, x_dev])
             self.logger.debug("[SlotClassifier] train_x_all shape: " + str(train_x_all_tmp.shape))
-            train_y_all_tmp = np.concatenate([y, dev_y])
+            train_y_all_tmp = np.concatenate([y, y_dev])
             train_x_all, train_y_all = self.shuffle(train_x_all_tmp, train_y_all_tmp)
+            start = time.perf_counter()
             self.cls = LinearSVC(C=best_c, class_weight="balanced", max_iter=10000)
             self.cls.fit(train_x_all, train_y_all)
-            self.logger.info("[SlotClassifier] Training done")
+            self.logger.info("[SlotClassifier] Training done (%.1fs)", time.perf_counter() - start)
 
     def predict(self, corpus: Corpus) -> None:
         assert self.cls is not None
-        x, _, span_pairs = self.get_features_and_labels(corpus)
+        x, _, span_pairs, instance_ids = self.get_features_and_labels(corpus)
         if x.shape[0] == 0:
             # edge case -- we have no span pairs to classify
             # so there's nothing for us to do
             return
         self.logger.info("[SlotClassifier] Predicting relations")
-        y_pred = self.cls.predict(x)
-        predicted_labels = [self.labels[pi] for pi in y_pred]
-        results_by_instance: List[List[Relation]] = []
+        y_pred, y_margins = self.decide(x)
+        results_by_instance: Dict[int, List[Relation]] = {}
+        # margins are only looked up for the span pairs that end up in frames
+        margins: Dict[SpanPair, float] = {}
         self.logger.info("[SlotClassifier] Generating frames")
-        for (anchor_span, filler_span), predicted_label in zip(
-            span_pairs, predicted_labels
-        ):
-            instance = anchor_span.instance
-            for instance_results in results_by_instance:
-                if instance_results[0][0][0].instance == instance:
-                    instance_results.append(
-                        ((anchor_span, filler_span), predicted_label)
-                    )
-                    break
-            else:
-                results_by_instance.append(
-                    [((anchor_span, filler_span), predicted_label)]
-                )
-        for instance_results in results_by_instance:
+        for span_pair, pi, margin, instance_id in zip(span_pairs, y_pred, y_margins.tolist(), instance_ids):
+            predicted_label = self.labels[pi]
+            results_by_instance.setdefault(instance_id, []).append((span_pair, predicted_label))
+            if predicted_label != "Nothing":
+                margins[span_pair] = margin
+        for instance_results in results_by_instance.values():
             instance_results = self.filter_results(instance_results)
-            self.generate_frames(instance_results)
+            self.generate_frames(instance_results, margins)
         self.logger.info("[SlotClassifier] Finished generating frames")
 
+    def decide(self, x: spmatrix) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The classifier's predicted class for each row, and its decision function value for that class, from
+        a single pass of the decision function.
+        """
+        assert self.cls is not None
+        scores = self.cls.decision_function(x)
+        if scores.ndim == 1:
+            # with two classes, positive values predict the second one
+            return self.cls.classes_[(scores > 0).astype(int)], abs(scores)
+        columns = scores.argmax(axis=1)
+        return self.cls.classes_[columns], scores[np.arange(len(columns)), columns]
+
     def filter_results(self, results: List[Relation]) -> List[Relation]:
         def filt(relation: Relation) -> bool:
             (anchor, filler), label = relation
@@ -177,7 +274,9 @@ class SlotClassifier(Model):
 
         return list(filter(filt, results))
 
-    def generate_frames(self, results: List[Relation]) -> None:
+    def generate_frames(
+            self, results: List[Relation], margins: Optional[Dict[SpanPair, float]] = None
+    ) -> None:
         instance = results[0][0][0].instance
         anchored_frames: Dict[Span, Frame] = {}
         for (anchor, filler), label in results:
@@ -193,39 +292,83 @@ class SlotClassifier(Model):
                 anchor_slot.add(anchor)
                 anchored_frames[anchor] = frame
             frame.slots[slot_type].add(filler)
-        self.split_overfilled_frames(instance)
+        self.split_overfilled_frames(instance, margins)
 
-    def split_overfilled_frames(self, instance: Instance) -> None:
+    def split_overfilled_frames(
+            self, instance: Instance, margins: Optional[Dict[SpanPair, float]] = None
+    ) -> None:
+        """
+        Replace every frame with more fillers in a slot than its max cardinality allows by one frame per
+        way of choosing the allowed number of fillers for each slot.
+
+        Args:
+            instance: The instance whose frames to split.
+            margins: The classifier's margin for each (anchor, filler) pair. If a frame could be split into
+                more than max_split_frames frames, only that many are created, choosing the fillers with
+                the highest total margin.
+        """
         old_frames = list(instance.frames)
         for frame in old_frames:
             frame.remove()
-            frame_type = frame.frame_type
-            # Each element of prod corresponds to a particular slot
-            # For each slot, we have a list of ways to fill that slot
-            # Each way to fill that slot is a list of (SlotType, Filler) pairs
-            prod: List[List[List[Tuple[SlotType, Filler]]]] = []
-            for slot_type, slot in frame.slots.items():
-                if slot_type.max_cardinality is None:
-                    prod.append([[(slot_type, filler) for filler in slot.fillers]])
-                else:
-                    n = min(slot_type.max_cardinality, len(slot.fillers))
-                    prod.append(
-                        [
-                            [(slot_type, ci) for ci in c]
-                            for c in combinations(slot.fillers, n)
-                        ]
-                    )
-            for assignment in product(*prod):
+            for assignment in self._frame_assignments(frame, margins):
                 new_frame = instance.new_frame(frame.frame_type)
                 for term in assignment:
                     for slot_type, filler in term:
                         new_frame.slots[slot_type].add(filler)
-                # check frame for min cardinality
-                for slot_type, slot in new_frame.slots.items():
-                    if slot_type.min_cardinality is not None:
-                        if len(slot.fillers) < slot_type.min_cardinality:
-                            new_frame.remove()
-                            break
+
+    def _frame_assignments(
+            self, frame: Frame, margins: Optional[Dict[SpanPair, float]]
+    ) -> Iterator[Sequence[List[Tuple[SlotType, Filler]]]]:
+        # For each slot, the fillers and how many of them each new frame gets
+        slots: List[Tuple[SlotType, List[Filler], int]] = []
+        n_assignments = 1
+        for slot_type, slot in frame.slots.items():
+            if slot_type.max_cardinality is None:
+                n = len(slot.fillers)
+            else:
+                n = min(slot_type.max_cardinality, len(slot.fillers))
+            # every new frame gets the same number of fillers per slot, so either all of them have enough
+            # fillers for the min cardinality, or none
+            if slot_type.min_cardinality is not None and n < slot_type.min_cardinality:
+                return
+            slots.append((slot_type, slot.fillers, n))
+            n_assignments *= n_combinations(len(slot.fillers), n)
+
+        if self.max_split_frames is None or n_assignments <= self.max_split_frames:
+            # Each element of prod corresponds to a particular slot
+            # For each slot, we have a list of ways to fill that slot
+            # Each way to fill that slot is a list of (SlotType, Filler) pairs
+            prod: List[List[List[Tuple[SlotType, Filler]]]] = [
+                [[(slot_type, ci) for ci in c] for c in combinations(fillers, n)]
+                for slot_type, fillers, n in slots
+            ]
+            yield from product(*prod)
+            return
+
+        self.logger.debug(
+            "[SlotClassifier] Keeping %d of %d ways to split a %s frame",
+            self.max_split_frames, n_assignments, frame.frame_type.name
+        )
+        anchor_fillers = self.get_anchor_slot(frame).fillers
+        # margins are only known for pairs of spans
+        anchor = anchor_fillers[0] if anchor_fillers and isinstance(anchor_fillers[0], Span) else None
+        # For each slot, its best ways to fill it (by total margin), as lists of (SlotType, Filler) pairs
+        terms: List[List[List[Tuple[SlotType, Filler]]]] = []
+        term_scores: List[List[float]] = []
+        for slot_type, fillers, n in slots:
+            filler_scores = [
+                (margins or {}).get((anchor, filler), 0.0)
+                if anchor is not None and isinstance(filler, Span) else 0.0
+                for filler in fillers
+            ]
+            order = sorted(range(len(fillers)), key=lambda i: -filler_scores[i])
+            best = list(islice(best_subsets([filler_scores[i] for i in order], n), self.max_split_frames))
+            terms.append([
+                [(slot_type, fillers[j]) for j in sorted(order[i] for i in indices)] for _, indices in best
+            ])
+            term_scores.append([score for score, _ in best])
+        for _, choice in islice(best_products(term_scores), self.max_split_frames):
+            yield [slot_terms[i] for slot_terms, i in zip(terms, choice)]
 
     def _eval(
             self,
@@ -239,37 +382,22 @@ class SlotClassifier(Model):
         assert self.cls is not None
 
         if x is None:
-            x, y_gold, _ = self.get_features_and_labels(corpus)
+            x, y_gold, _, _ = self.get_features_and_labels(corpus)
 
         assert isinstance(x, spmatrix)
         assert isinstance(y_gold, np.ndarray)
 
-        y_pred = self.cls.predict(x)
-        prec, reca, f1, supp = precision_recall_fscore_support(
-            y_gold,
-            y_pred,
-            labels=[i for i, label in enumerate(self.labels) if label != "Nothing"],
-            average="macro",
-        )
-        assert isinstance(f1, float)
-        accuracy = accuracy_score(y_gold, y_pred)
-        for score, name in [
-            (prec, "Precision"),
-            (reca, "Recall"),
-            (f1, "F1-score"),
-            (accuracy, "Accuracy"),
-        ]:
-            self.logger.info("[SlotClassifier] %r", name + "\t" + str(score))
+        f1 = _svc_macro_f1(self.cls, x, y_gold, self._eval_labels())
 
         self.logger.debug("[SlotClassifier] labels:")
         for i, label in enumerate(self.labels):
             self.logger.debug("[SlotClassifier] %s\t%s", i, label)
 
-        self.logger.debug("[SlotClassifier] Confusion matrix:")
-        self.logger.debug("[SlotClassifier] %r", confusion_matrix(y_gold, y_pred))
-
         return f1
 
+    def _eval_labels(self) -> List[int]:
+        return [i for i, label in enumerate(self.labels) if label != "Nothing"]
+
     # Heuristic -- the first slot of every frame type is its anchor
     def _frame_type_anchor(self, frame_type: FrameType) -> SlotType:
         return frame_type.slot_types[0]
@@ -279,45 +407,83 @@ class SlotClassifier(Model):
 
     def get_features_and_labels(
         self, corpus: Corpus, is_train: bool = False
-    ) -> Tuple[spmatrix, np.ndarray, List[SpanPair]]:
-
+    ) -> Tuple[spmatrix, np.ndarray, List[SpanPair], np.ndarray]:
+        """
+        Returns:
+            The features and labels of all candidate span pairs of the corpus, the span pairs themselves,
+            and for each pair the index of its instance in the corpus.
+        """
         labels: List[Any] = []
         span1_list: List[Span] = []
         span2_list: List[Span] = []
-        doc_list: List[Doc] = []
-        graph_list: List[nx.Graph] = []
-        idx2word_list: List[Dict[int, str]] = []
-        edge2dep_list = []
+        tokens1_list: List[range] = []
+        tokens2_list: List[range] = []
+        tree_list: List[DependencyTree] = []
         sequence_words_list: List[Any] = []
         self.logger.info("[SlotClassifier] Getting features/labels...")
-        for i, instance in enumerate(progressify(corpus.instances, "getting features")):
-            instance_text = instance.text.replace('"', "'")
-            doc, graph, idx2word, edge2dep = self.preprocess_text(instance_text)
-            relations = self.get_relations(instance)
-            for (span1, span2), relation in relations:
+        # instances without candidate span pairs contribute nothing, so they don't need to be parsed
+        instance_relations = [
+            (instance_id, relations)
+            for instance_id, relations in enumerate(map(self.get_relations, corpus.instances))
+            if relations
+        ]
+        docs = self.parse([relations[0][0][0].instance.text for _, relations in instance_relations])
+        instance_ids: List[int] = []
+        n_candidates = 0
+        n_relations = 0
+        n_relations_kept = 0
+        for (instance_id, relations), doc in zip(instance_relations, docs):
+            tree = self.preprocess_doc(doc)
+            token_index = SpanTokenIndex(doc)
+            token_ranges = [
+                (token_index.token_range(span1), token_index.token_range(span2))
+                for (span1, span2), _ in relations
+            ]
+            n_candidates += len(relations)
+            n_relations += sum(relation != "Nothing" for _, relation in relations)
+            if self.candidate_filter.active:
+                keep = self.candidate_filter.keep(
+                    tree,
+                    [span1 for (span1, _), _ in relations],
+                    [tokens1 for tokens1, _ in token_ranges],
+                    [tokens2 for _, tokens2 in token_ranges],
+                )
+                relations = [relation for relation, kept in zip(relations, keep) if kept]
+                token_ranges = [ranges for ranges, kept in zip(token_ranges, keep) if kept]
+            n_relations_kept += sum(relation != "Nothing" for _, relation in relations)
+            for ((span1, span2), relation), (tokens1, tokens2) in zip(relations, token_ranges):
                 span1_list.append(span1)
                 span2_list.append(span2)
-                doc_list.append(doc)
-                graph_list.append(graph)
-                idx2word_list.append(idx2word)
-                edge2dep_list.append(edge2dep)
-                sequence_words_list.append(self.build_sequence(doc, span1, span2))
+                tokens1_list.append(tokens1)
+                tokens2_list.append(tokens2)
+                tree_list.append(tree)
+                sequence_words_list.append(self.build_sequence(doc, tokens1, tokens2))
                 labels.append(relation)
+                instance_ids.append(instance_id)
 
+        if self.candidate_filter.active:
+            self.logger.info(
+                "[SlotClassifier] Candidate filter kept %d of %d span pairs", len(labels), n_candidates
+            )
+            if n_relations > 0:
+                # relations between pruned pairs can never be predicted
+                self.logger.info(
+                    "[SlotClassifier] Candidate filter kept %d of %d gold relations (recall ceiling %.2f%%)",
+                    n_relations_kept, n_relations, 100 * n_relations_kept / n_relations,
+                )
         self.logger.info("[SlotClassifier] Getting features/labels done")
+        # the path features are needed both for fitting the count vectorizers and for the features
+        shortest_path_features = self.get_shortest_path_features(tree_list, tokens1_list, tokens2_list)
         # TOmaybeDO:
         # possibly give a list of all words in this
-        # (list(iwl.values() for iwl in idx2word_list))
+        # (list(tree.words for tree in tree_list))
         self.logger.info("[SlotClassifier] Fitting count vectorizer...")
         # this is only for training
         if is_train:
             self.fit_count_vectorizers(
                 span1_list,
                 span2_list,
-                doc_list,
-                graph_list,
-                idx2word_list,
-                edge2dep_list,
+                shortest_path_features,
                 sequence_words_list,
             )
         self.logger.info("[SlotClassifier] Fitting count vectorizer done")
@@ -327,22 +493,22 @@ class SlotClassifier(Model):
         x = self.features_from_instance(
             span1_list,
             span2_list,
-            doc_list,
-            graph_list,
-            idx2word_list,
-            edge2dep_list,
+            tokens1_list,
+            tokens2_list,
+            shortest_path_features,
             sequence_words_list,
         )
         self.logger.info("[SlotClassifier] Creating features for " + str(set_name) + " set done")
 
-        y = np.array([self.labels.index(label) for label in labels])
+        label_ids = {label: i for i, label in enumerate(self.labels)}
+        y = np.array([label_ids[label] for label in labels], dtype=np.int64)
 
         if is_train:
             self.logger.debug("[SlotClassifier] labels: " + str(self.labels))
             bincount_y = np.bincount(y)
             self.logger.debug("[SlotClassifier] %r", str(bincount_y))
 
-        return x, y, list(zip(span1_list, span2_list))
+        return x, y, list(zip(span1_list, span2_list)), np.array(instance_ids, dtype=np.int64)
 
     def get_relations(self, instance: Instance) -> List[Relation]:
         arcs: Dict[SpanPair, Arc] = {}
@@ -382,210 +548,129 @@ class SlotClassifier(Model):
                 )
         return span_pairs
 
-    def preprocess_text(
-        self, text: str
-    ) -> Tuple[Doc, nx.Graph, Dict[int, str], Dict[Tuple[int, int], str]]:
-        doc = nlp(text)
-        edges = []
-        idx2word = {}
-        edge2dep = {}
-        # using the tokens themselves would require different instances of the
-        # same token to compare? hash? to the same value, but different tokens
-        # in the same sentence, that happen to have the same term need to hash?
-        # compare? to different values. This is a more complicated assumption/
-        # requirement than just looking at their offset, which should be
-        # guaranteed to be unique (per sentence), and identical for multiple
-        # instances of the same token.
-        for token in doc:
-            edges.append((token.idx, token.head.idx))
-            idx2word[token.idx] = token.text
-            edge2dep[(token.idx, token.head.idx)] = token.dep_
-            edge2dep[(token.head.idx, token.idx)] = token.dep_
-        graph = nx.Graph(edges)
+    @property
+    def nlp(self) -> Any:
+        return resources.spacy_pipeline(self.spacy_model)
+
+    @property
+    def parse_cache(self) -> ParseCache:
+        if self._parse_cache is None:
+            model_key = ParseCache.make_model_key(self.nlp, self.parse_disable)
+            self._parse_cache = ParseCache(model_key, self.parse_cache_dir, self.parse_cache_size)
+        return self._parse_cache
+
+    def parse(self, texts: List[str]) -> List[Doc]:
+        """
+        Parse instance texts with spaCy, in batches and optionally in several processes. Texts which have
+        been parsed before are looked up in the parse cache instead.
+        """
+        def parse_missing(missing: List[str]) -> List[Doc]:
+            docs = self.nlp.pipe(
+                missing,
+                batch_size=self.parse_batch_size,
+                n_process=self.parse_n_process,
+                disable=self.parse_disable,
+            )
+            return list(progressify(docs, "parsing", length=len(missing)))
+
+        texts = [text.replace('"', "'") for text in texts]
+        docs = self.parse_cache.parse(texts, self.nlp.vocab, parse_missing)
         self.logger.debug(
-            "[SlotClassifier] preprocess text - edges: %r, graph: %r",
-            edges,
-            graph,
+            "[SlotClassifier] parse cache: %d hits, %d misses", self.parse_cache.hits, self.parse_cache.misses
         )
-        return doc, graph, idx2word, edge2dep
+        return docs
+
+    def preprocess_doc(self, doc: Doc) -> DependencyTree:
+        tree = DependencyTree.from_doc(doc)
+        self.logger.debug("[SlotClassifier] preprocess text - heads: %r", tree.heads)
+        return tree
 
     def fit_count_vectorizers(
         self,
         span1_list: List[Span],
         span2_list: List[Span],
-        doc_list: List[Doc],
-        graph_list: List[nx.Graph],
-        idx2word_list: List[Dict[int, str]],
-        edge2dep_list: List[Dict[Tuple[int, int], str]],
+        shortest_path_features: Tuple[np.ndarray, List[str], np.ndarray],
         sequence_words_list: List[Any],
     ) -> None:
 
-        _, shortest_path_list, path_list = self.get_shortest_path_features(
-            doc_list,
-            graph_list,
-            span1_list,
-            span2_list,
-            idx2word_list,
-            edge2dep_list,
-        )
+        _, shortest_path_list, path_list = shortest_path_features
 
-        self.logger.debug("[SlotClassifier] Fitting count vectorizer (text)...")
         self.cv_text = CountVectorizer()
+        self.cv_labels = CountVectorizer()
+        self.cv_deps_words = CountVectorizer(ngram_range=(2, 2))  # type: ignore
+        self.cv_sequence_text = CountVectorizer()
+        if self.feature_hashing is not None:
+            # hashed features only need the vectorizers to split texts into terms, not vocabularies
+            return
+
+        self.logger.debug("[SlotClassifier] Fitting count vectorizer (text)...")
         span_text_list = [sp.text for sp in span1_list + span2_list]
         self.cv_text.fit(span_text_list + shortest_path_list)
 
         self.logger.debug("[SlotClassifier] Fitting count vectorizer (labels)...")
-        self.cv_labels = CountVectorizer()
         span_label_list = [sp.span_type.name for sp in span1_list + span2_list]
         self.cv_labels.fit(span_label_list)
 
         self.logger.debug("[SlotClassifier] Fitting count vectorizer (dep_words)...")
-        self.cv_deps_words = CountVectorizer(ngram_range=(2, 2))  # type: ignore
         self.cv_deps_words.fit(path_list)
 
         self.logger.debug("[SlotClassifier] Fitting count vectorizer (sequence_text)...")
-        self.cv_sequence_text = CountVectorizer()
         self.cv_sequence_text.fit(sequence_words_list)
 
     def get_shortest_path_features(
         self,
-        doc_list: List[Doc],
-        graph_list: List[nx.Graph],
-        span1_list: List[Span],
-        span2_list: List[Span],
-        idx2word_list: List[Dict[int, str]],
-        edge2dep_list: List[Dict[Tuple[int, int], str]],
+        tree_list: List[DependencyTree],
+        tokens1_list: List[range],
+        tokens2_list: List[range],
     ) -> Tuple[np.ndarray, List[str], np.ndarray]:
-        sp1_words = [
-            self.find_node(doc, span1) for doc, span1 in zip(doc_list, span1_list)
-        ]
-        sp2_words = [
-            self.find_node(doc, span2) for doc, span2 in zip(doc_list, span2_list)
-        ]
-
-        f_shortest_path = np.array(
-            [
-                self.edge_distance(graph, sp1, sp2)
-                for graph, sp1, sp2 in zip(graph_list, sp1_words, sp2_words)
-            ]
-        )
-
+        """
+        The length of the shortest dependency path between the spans of each pair, the words on it, and
+        the words interleaved with the dependency labels, all from a single path search per pair.
+        """
+        distances = []
         shortest_path_list = []
-        for graph, sp1, sp2, idx2word in zip(
-            graph_list, sp1_words, sp2_words, idx2word_list
-        ):
-            shortest_path = " ".join(
-                [word for word in self.edge_words(graph, sp1, sp2, idx2word)]
-            )
-            shortest_path_list.append(shortest_path)
-
-        f_path_deps = np.array(
-            [
-                self.edge_words_deps(
-                    graph,
-                    self.find_node(doc, sp1),
-                    self.find_node(doc, sp2),
-                    idx2word,
-                    edge2dep,
-                )
-                for graph, sp1, sp2, idx2word, edge2dep, doc in zip(
-                    graph_list,
-                    span1_list,
-                    span2_list,
-                    idx2word_list,
-                    edge2dep_list,
-                    doc_list,
-                )
-            ]
-        )
-
-        return f_shortest_path, shortest_path_list, f_path_deps
+        path_deps = []
+        for tree, tokens1, tokens2 in zip(tree_list, tokens1_list, tokens2_list):
+            distance, words, words_deps = tree.path_features(tokens1, tokens2)
+            distances.append(distance)
+            shortest_path_list.append(words)
+            path_deps.append(words_deps)
+        return np.array(distances), shortest_path_list, np.array(path_deps)
 
     def features_from_instance(
         self,
         span1_list: List[Span],
         span2_list: List[Span],
-        doc_list: List[Doc],
-        graph_list: List[nx.Graph],
-        idx2word_list: List[Dict[int, str]],
-        edge2dep_list: List[Dict[Tuple[int, int], str]],
+        tokens1_list: List[range],
+        tokens2_list: List[range],
+        shortest_path_features: Tuple[np.ndarray, List[str], np.ndarray],
         sequence_words_list: List[str],
     ) -> spmatrix:
         assert self.cv_text is not None
         assert self.cv_labels is not None
         assert self.cv_deps_words is not None
         assert self.cv_sequence_text is not None
-        # spacy words
-
-        self.logger.debug("[SlotClassifier] Getting features (text)...")
-        f_sp1_text = self.cv_text.transform([span1.text for span1 in span1_list])
-        f_sp2_text = self.cv_text.transform([span2.text for span2 in span2_list])
-
-        self.logger.debug("[SlotClassifier] Getting features (labels)...")
-        f_sp1_label = self.cv_labels.transform(
-            [span1.span_type.name for span1 in span1_list]
-        )
-        f_sp2_label = self.cv_labels.transform(
-            [span2.span_type.name for span2 in span2_list]
-        )
-
-        self.logger.debug("[SlotClassifier] Getting features (shortest path)...")
-        shortest_path_features = self.get_shortest_path_features(
-            doc_list, graph_list, span1_list, span2_list, idx2word_list, edge2dep_list
-        )
 
         f_shortest_path, shortest_path_list, f_path_deps = shortest_path_features
-
-        f_shortest_path = f_shortest_path.reshape(f_shortest_path.shape[0], 1)
-        f_shortest_path_words = self.cv_text.transform(shortest_path_list)
-
-        f_path_deps = self.cv_deps_words.transform(f_path_deps)  # type: ignore
-
-        f_sequence_distance = np.array(
-            [
-                abs(self.find_node(doc, span1)[0].i - self.find_node(doc, span2)[0].i)
-                for span1, span2, doc in zip(span1_list, span2_list, doc_list)
-            ]
-        )
-        # np.ma: masked array; such that we only do logarithm on non-zero cells
-        f_sequence_distance = np.ma.log(
-            f_sequence_distance.reshape(f_sequence_distance.shape[0], 1)
-        )
-        f_sequence_words = self.cv_sequence_text.transform(sequence_words_list)
-
-        self.logger.debug("[SlotClassifier] f_sp1_text")
-        self.logger.debug("[SlotClassifier] %r", f_sp1_text.shape)
-        self.logger.debug("[SlotClassifier] f_sp2_text")
-        self.logger.debug("[SlotClassifier] %r", f_sp2_text.shape)
-        self.logger.debug("[SlotClassifier] f_sp1_label")
-        self.logger.debug("[SlotClassifier] %r", f_sp1_label.shape)
-        self.logger.debug("[SlotClassifier] f_sp2_label")
-        self.logger.debug("[SlotClassifier] %r", f_sp2_label.shape)
-        self.logger.debug("[SlotClassifier] f_shortest_path_distance")
-        self.logger.debug("[SlotClassifier] %r", f_shortest_path.shape)
-        self.logger.debug("[SlotClassifier] f_sequence_distance")
-        self.logger.debug("[SlotClassifier] %r", f_sequence_distance.shape)
-        self.logger.debug("[SlotClassifier] f_sequence_words")
-        self.logger.debug("[SlotClassifier] %r", f_sequence_words.shape)
-        self.logger.debug("[SlotClassifier] f_shortest_path_words")
-        self.logger.debug("[SlotClassifier] %r", f_shortest_path_words.shape)
-        self.logger.debug("[SlotClassifier] f_path_deps")
-        self.logger.debug("[SlotClassifier] %r", f_path_deps.shape)
-
-        X_feats = hstack(
-            [
-                f_sp1_text,
-                f_sp2_text,
-                f_sp1_label,
-                f_sp2_label,
-                csr_matrix(f_shortest_path),
-                csr_matrix(f_sequence_distance),
-                f_sequence_words,
-                f_shortest_path_words,
-                csr_matrix(f_path_deps),
-            ]
+        sequence_distance = np.array(
+            [abs(tokens1[0] - tokens2[0]) for tokens1, tokens2 in zip(tokens1_list, tokens2_list)]
         )
-
+        # only take the logarithm of non-zero distances
+        f_sequence_distance = np.zeros(len(sequence_distance))
+        np.log(sequence_distance, out=f_sequence_distance, where=sequence_distance > 0)
+        blocks: List[FeatureBlock] = [
+            TextBlock("sp1_text", [span1.text for span1 in span1_list], self.cv_text),
+            TextBlock("sp2_text", [span2.text for span2 in span2_list], self.cv_text),
+            TextBlock("sp1_label", [span1.span_type.name for span1 in span1_list], self.cv_labels),
+            TextBlock("sp2_label", [span2.span_type.name for span2 in span2_list], self.cv_labels),
+            NumericBlock("shortest_path_distance", f_shortest_path.tolist()),
+            NumericBlock("sequence_distance", f_sequence_distance.tolist()),
+            TextBlock("sequence_words", sequence_words_list, self.cv_sequence_text),
+            TextBlock("shortest_path_words", shortest_path_list, self.cv_text),
+            TextBlock("path_deps", f_path_deps.tolist(), self.cv_deps_words),
+        ]
+        X_feats = SparseFeatureBuilder(self.feature_hashing).build(blocks, len(span1_list))
+        self.logger.debug("[SlotClassifier] features: %r", X_feats.shape)
         return X_feats
 
     def dump(self, f: IO[bytes]) -> None:
@@ -599,12 +684,14 @@ class SlotClassifier(Model):
                 self.labels,
                 self.cv_deps_words,
                 self.cv_sequence_text,
+                self.candidate_filter,
             ),
             f,
         )
 
     def load(self, f: IO[bytes]) -> None:
         self.logger.info("[SlotClassifier] Loading model")
+        state = joblib.load(f)
         (
             random_state,
             self.cls,
@@ -613,105 +700,20 @@ class SlotClassifier(Model):
             self.labels,
             self.cv_deps_words,
             self.cv_sequence_text,
-        ) = joblib.load(f)
+        ) = state[:7]
+        # models saved before candidate filtering was added considered all pairs
+        self.candidate_filter = state[7] if len(state) > 7 else CandidateFilter()
         random.setstate(random_state)
 
-    @staticmethod
-    def find_node(doc: Doc, span: Span) -> List[spacy.tokens.Token]:
-        tokens = []
-        for token in doc:
-            token_left = token.idx
-            token_right = token_left + len(token.text)
-            # if the token starts within the span
-            if span.left <= token_left < span.right:
-                tokens.append(token)
-            # if the token ends within the span
-            elif span.left < token_right <= span.right:
-                tokens.append(token)
-            # if the token starts before the span and ends after the span
-            elif token_left < span.left and token_right > span.right:
-                tokens.append(token)
-            # if the token starts after the end of the span, break
-            elif token_left > span.right:
-                break
-        return tokens
-
-    @staticmethod
-    def edge_distance(
-        graph: nx.Graph,
-        tokens1: List[spacy.tokens.Token],
-        tokens2: List[spacy.tokens.Token],
-    ) -> int:
-        try:
-            shortest_length = min(
-                nx.shortest_path_length(graph, token1.idx, token2.idx)
-                for token1 in tokens1
-                for token2 in tokens2
-            )
-            assert isinstance(shortest_length, int)
-            return shortest_length
-        except nx.NetworkXNoPath:
-            return -1  # 10000 # float("inf")
-
-    def edge_words_deps(
-        self,
-        graph: nx.Graph,
-        tokens1: List[spacy.tokens.Token],
-        tokens2: List[spacy.tokens.Token],
-        idx2word: Dict[int, str],
-        edge2dep: Dict[Tuple[int, int], str],
-    ) -> str:
-        shortest = self.get_shortest_path(graph, tokens1, tokens2)
-        if shortest is None:
-            return ""
-        one = iter(shortest)
-        two = iter(shortest)
-        next(two)
-        words_deps = [idx2word[shortest[0]]]
-        for left, right in zip(one, two):
-            words_deps.append(edge2dep[left, right])
-            words_deps.append(idx2word[right])
-
-        return " ".join(words_deps)
-
-    def edge_words(
-        self,
-        graph: nx.Graph,
-        tokens1: List[spacy.tokens.Token],
-        tokens2: List[spacy.tokens.Token],
-        idx2word: Dict[int, str],
-    ) -> List[str]:
-        shortest = self.get_shortest_path(graph, tokens1, tokens2)
-        if shortest is None:
-            return []
-        return [idx2word[idx] for idx in shortest]
-
-    @staticmethod
-    def get_shortest_path(
-        graph: nx.Graph,
-        tokens1: List[spacy.tokens.Token],
-        tokens2: List[spacy.tokens.Token],
-    ) -> Optional[List[int]]:
-        shortest = None
-        for token1 in tokens1:
-            for token2 in tokens2:
-                try:
-                    this = nx.shortest_path(graph, token1.idx, token2.idx)
-                    if shortest is None or len(this) < len(shortest):
-                        shortest = this
-                except nx.NetworkXNoPath:
-                    continue
-        return shortest  # type: ignore
-
-    def build_sequence(self, doc: Doc, span1: Span, span2: Span) -> str:
-        tokens1 = self.find_node(doc, span1)
-        tokens2 = self.find_node(doc, span2)
-
-        max1 = max(token.i for token in tokens1)
-        min1 = min(token.i for token in tokens1)
+    def build_sequence(self, doc: Doc, tokens1: range, tokens2: range) -> str:
+        """
+        The text between two spans, given as ranges of token indices (see SpanTokenIndex).
+        """
+        max1 = max(tokens1)
+        min1 = min(tokens1)
 
-        max2 = max(token.i for token in tokens2)
-        min2 = min(token.i for token in tokens2)
+        max2 = max(tokens2)
+        min2 = min(tokens2)
 
         if max1 + min1 > max2 + min2:
             # 1 is after 2
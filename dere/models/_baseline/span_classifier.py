@@ -1,17 +1,16 @@
 # Author: Heike, Sean
 from __future__ import annotations
 
-import copy
+import functools
 import logging
-import string
 import random
 import os
+import time
 from typing import Dict, List, Tuple, Set, Optional, Union, Any, cast
 from mypy_extensions import TypedDict
 
 from mypy_extensions import TypedDict
 from sklearn_crfsuite import CRF, metrics
-from nltk.stem import PorterStemmer
 from nltk.tokenize import TreebankWordTokenizer
 
 
@@ -22,16 +21,71 @@ from dere.utils import progressify
 
 from sklearn.externals import joblib
 
+from .hyperparameter_search import make_search_strategy, SearchResult, TraceEntry
+from .feature_encoding import EncodedSequences, FeatureEncoder, Features
+from .feature_templates import FeatureExtractor
+
 word_tokenizer = TreebankWordTokenizer()
 
-Features = Dict[str, Union[str, bool]]
+# Feature sequences are either lists of feature dicts, or their encoding if encode_features is set
+FeatureSequences = Union[List[List[Features]], EncodedSequences]
+
+
+def _crf_micro_f1(classifier: CRF, X_dev: FeatureSequences, y_dev: List[List[str]]) -> float:
+    logger = logging.getLogger("dere")
+    y_pred = classifier.predict(X_dev)
+    try:
+        logger.debug(
+            "[SpanClassifier] %s",
+            metrics.flat_classification_report(
+                y_dev, y_pred, labels=["I", "B"], digits=3
+            )
+        )
+    except ZeroDivisionError:
+        pass
+    micro_f1 = metrics.flat_f1_score(
+        y_dev, y_pred, average="micro", labels=["I", "B"]
+    )
+    logger.debug("[SpanClassifier] micro F1: " + str(micro_f1))
+    return micro_f1
+
+
+def _concatenate(X1: FeatureSequences, X2: FeatureSequences) -> FeatureSequences:
+    # both are encoded, or neither is
+    if isinstance(X1, EncodedSequences):
+        assert isinstance(X2, EncodedSequences)
+        return X1 + X2
+    assert not isinstance(X2, EncodedSequences)
+    return X1 + X2
+
+
+# module level, so that trials can be sent to worker processes during a parallel search
+def _crf_trial(
+        setup: Dict[str, Any], budget: float,
+        X_train: FeatureSequences, y_train: List[List[str]],
+        X_dev: FeatureSequences, y_dev: List[List[str]]
+) -> Tuple[CRF, float]:
+    n = max(1, int(round(len(X_train) * budget)))
+    crf = CRF(
+        algorithm="l2sgd",
+        all_possible_transitions=True,
+        all_possible_states=setup["aps"],
+        c2=setup["c2v"],
+    )
+    crf.fit(X_train[:n], y_train[:n])
+    return crf, _crf_micro_f1(crf, X_dev, y_dev)
 
 
 class SpanClassifier(Model):
 
     def __init__(
             self, task_spec: TaskSpecification, model_spec: Dict[str, Any],
-            gazetteer: Optional[str] = None
+            gazetteer: Optional[str] = None,
+            search: Optional[Dict[str, Any]] = None,
+            refit: bool = True,
+            encode_features: bool = False,
+            batch_size: int = 256,
+            features: Optional[Dict[str, Any]] = None
     ) -> None:
         super().__init__(task_spec, model_spec)
         self.target_span_types: List[SpanType] = []
@@ -51,35 +105,63 @@ class SpanClassifier(Model):
         self.logger = logging.getLogger("dere")
 
         self.target2classifier: Dict[str, CRF] = {}
-        self.ps = PorterStemmer()
+        # which token features to extract, see FeatureExtractor.from_config
+        self.feature_extractor = FeatureExtractor.from_config(self.given_span_types, features)
+
+        # how to search for the best CRF hyperparameters when a dev corpus is given, and what was tried
+        self.search_strategy = make_search_strategy(search)
+        self.search_traces: Dict[str, List[TraceEntry]] = {}
+        # whether to retrain the best setup on train+dev after the search. Without, the dev data only
+        # chooses the setup, and the final model is trained on none of it
+        self.refit = refit
+        # whether to hand the CRFs integer-encoded features instead of feature dicts, which saves memory
+        # and feature dict conversions (see EncodedSequences)
+        self.encode_features = encode_features
+        self.feature_encoder: Optional[FeatureEncoder] = None
+        # number of instances whose features are extracted and tagged together during prediction
+        self.batch_size = batch_size
 
         # initialize everything necessary
         self.logger.debug("[SpanClassifier] initialized successfully")
 
-    def shuffle(self, X: List, y: List) -> Tuple[List, List]:
+    def shuffle(self, X: FeatureSequences, y: List[List[str]]) -> Tuple[FeatureSequences, List[List[str]]]:
         indices = [i for i in range(len(X))]
         # using shuffle instead of permutation to reproduce set from old code
         # TODO: change to permutation as this is more elegant
         random.seed(1111)
         random.shuffle(indices)
-        X_shuffled = [X[i] for i in indices]
+        if isinstance(X, EncodedSequences):
+            X_shuffled: FeatureSequences = X[indices]
+        else:
+            X_shuffled = [X[i] for i in indices]
         y_shuffled = [y[i] for i in indices]
         return X_shuffled, y_shuffled
 
+    def encode(self, X: List[List[Features]], grow: bool = False) -> FeatureSequences:
+        """
+        Encode feature dict sequences, if encode_features is set. Otherwise, they are returned unchanged.
+        """
+        if self.feature_encoder is None:
+            return X
+        return self.feature_encoder.encode(X, grow)
+
     def train(
         self,
         corpus_train: Corpus,
         dev_corpus: Optional[Corpus] = None,
     ) -> None:
+        if self.encode_features:
+            # one vocabulary for the whole training run, shared by all span types
+            self.feature_encoder = FeatureEncoder()
         self.logger.info("[SpanClassifier] Extracting features...")
-        X_train = self.get_features(corpus_train)
+        X_train = self.encode(self.get_features(corpus_train), grow=True)
         self.logger.info("[SpanClassifier] Extracting features done")
 
         self.logger.debug("[SpanClassifier] using " + str(len(X_train)) + " sentences for training")
 
         if dev_corpus is not None:
             self.logger.info("[SpanClassifier] Extracting features from dev corpus...")
-            X_dev = self.get_features(dev_corpus)
+            X_dev = self.encode(self.get_features(dev_corpus), grow=True)
             self.logger.info("[SpanClassifier] Extracting features from dev corpus done")
 
         self.logger.info(
@@ -93,7 +175,7 @@ class SpanClassifier(Model):
                 "[SpanClassifier] No dev corpus given. Using setup: " + str(default_setup)
             )
         for t in self.target_span_types:
-            X_train2 = self.get_span_type_specific_features(corpus_train, t)
+            X_train2 = self.encode(self.get_span_type_specific_features(corpus_train, t), grow=True)
             X_train_merged = self.merge_features(X_train, X_train2)
             self.logger.debug("[SpanClassifier] Optimizing classifier for class " + str(t))
             target_t = self.get_binary_labels(corpus_train, t, use_bio=True)
@@ -112,94 +194,82 @@ class SpanClassifier(Model):
                 self.target2classifier[t.name] = crf
             else:
                 # get features for dev corpus
-                X_dev2 = self.get_span_type_specific_features(dev_corpus, t)
+                X_dev2 = self.encode(self.get_span_type_specific_features(dev_corpus, t), grow=True)
                 X_dev_merged = self.merge_features(X_dev, X_dev2)
                 y_dev = self.get_binary_labels(dev_corpus, t, use_bio=True)
-                self.logger.info("[SpanClassifier] Starting grid search for " + t.name)
+                self.logger.info("[SpanClassifier] Starting hyperparameter search for " + t.name)
                 # optimize on dev
-                best_f1 = -1.0
-                best_setup: Setup = {"c2v": 0.001, "aps": True}
-                stopTraining = False
                 aps_possibilities = [True, False]
                 c2v_possibilities = [0.001, 0.01, 0.1, 0.3, 0.5, 0.6, 0.9,
                                      0.99, 1.0, 1.3, 1.6, 3.0, 6.0, 10.0]
-                num_hyperparam_combination = len(aps_possibilities) * len(c2v_possibilities)
-                for aps_index, aps in enumerate(aps_possibilities):
-                    if stopTraining:
-                        break
-
-                    def message(i: int, val: float) -> str:
-                        return "c2v: {}, aps: {} | {}/{}".format(
-                            val,
-                            aps,
-                            i + 1,
-                            num_hyperparam_combination,
-                        )
-
-                    for c2v in progressify(
-                        c2v_possibilities,
-                        message,
-                        offset=aps_index*len(c2v_possibilities),
-                        length=num_hyperparam_combination,
-                    ):
-                        if stopTraining:
-                            break
-                        cur_setup: Setup = {"aps": aps, "c2v": c2v}
-                        self.logger.debug("[SpanClassifier] Current setup: " + str(cur_setup))
-                        crf = CRF(
-                            algorithm="l2sgd",
-                            all_possible_transitions=True,
-                            all_possible_states=aps,
-                            c2=c2v,
-                        )
-                        crf.fit(X_train_merged, target_t)
-
-                        micro_f1 = self._eval(crf, X_dev_merged, y_dev)
-                        if micro_f1 > best_f1:
-                            self.target2classifier[t.name] = crf
-                            best_setup = cur_setup
-                            best_f1 = micro_f1
-                        if micro_f1 == 1.0:  # cannot get better
-                            stopTraining = True
-                self.logger.info("[SpanClassifier] Best setup: " + str(best_setup))
-                with open("best_parameters_span", 'a') as out:
-                    out.write(t.name)
-                    out.write("\n")
-                    for k, v in best_setup.items():
-                        out.write(str(k) + "\t" + str(v) + "\n")
-                    out.write("\n")
-                self.logger.info("[SpanClassifier] Retraining best setup with all available data")
-                X_train_all = X_train_merged + X_dev_merged
-                target_all = target_t + y_dev
-                X_train_all, target_all = self.shuffle(X_train_all, target_all)
-                crf = CRF(
-                        algorithm="l2sgd",
-                        all_possible_transitions=True,
-                        all_possible_states=best_setup["aps"],
-                        c2=best_setup["c2v"]
+                setups: List[Setup] = [
+                    {"aps": aps, "c2v": c2v} for aps in aps_possibilities for c2v in c2v_possibilities
+                ]
+                for X in (X_train_merged, X_dev_merged):
+                    if isinstance(X, EncodedSequences):
+                        # once, rather than in every trial that runs in this process
+                        X.item_sequences()
+                trial = functools.partial(
+                    _crf_trial,
+                    X_train=X_train_merged,
+                    y_train=target_t,
+                    X_dev=X_dev_merged,
+                    y_dev=y_dev,
                 )
-                crf.fit(X_train_all, target_all)
-                self.target2classifier[t.name] = crf
+                result = self.search_strategy.search(cast(List[Dict[str, Any]], setups), trial)
+                self.search_traces[t.name] = result.trace
+                best_setup = cast(Setup, result.best_setup)
+                self.logger.info(
+                    "[SpanClassifier] Best setup: %s (micro F1 %.4f, %d trials)",
+                    best_setup, result.best_score, len(result.trace)
+                )
+                if self.refit:
+                    self.target2classifier[t.name] = self._refit(
+                        result, X_train_merged, target_t, X_dev_merged, y_dev
+                    )
+                else:
+                    self.logger.info(
+                        "[SpanClassifier] Not retraining; keeping best setup trained on training data only,"
+                        + " the dev data is not trained on"
+                    )
+                    self.target2classifier[t.name] = result.best_model
             self.logger.info("[SpanClassifier] Finished training")
 
-    def _eval(
-        self, classifier: CRF, X_dev: List[List[Features]], y_dev: List[List[str]]
-    ) -> float:
-        y_pred = classifier.predict(X_dev)
-        try:
-            self.logger.debug(
-                "[SpanClassifier] %s",
-                metrics.flat_classification_report(
-                    y_dev, y_pred, labels=["I", "B"], digits=3
-                )
-            )
-        except ZeroDivisionError:
-            pass
-        micro_f1 = metrics.flat_f1_score(
-            y_dev, y_pred, average="micro", labels=["I", "B"]
+    def _refit(
+        self,
+        result: SearchResult,
+        X_train: FeatureSequences,
+        y_train: List[List[str]],
+        X_dev: FeatureSequences,
+        y_dev: List[List[str]],
+    ) -> CRF:
+        """
+        Train the best setup of a search on the training and dev data together.
+
+        crfsuite has no way to start training from existing weights, so this is a cold start from
+        scratch rather than a continuation of result.best_model.
+        """
+        self.logger.info("[SpanClassifier] Retraining best setup with all available data")
+        setup = result.best_setup
+        X_train_all, target_all = self.shuffle(_concatenate(X_train, X_dev), y_train + y_dev)
+        start = time.perf_counter()
+        crf = CRF(
+                algorithm="l2sgd",
+                all_possible_transitions=True,
+                all_possible_states=setup["aps"],
+                c2=setup["c2v"]
+        )
+        crf.fit(X_train_all, target_all)
+        seconds = time.perf_counter() - start
+        search_seconds = [
+            entry.seconds for entry in result.trace if entry.setup == setup and entry.budget == 1.0
+        ]
+        self.logger.info(
+            "[SpanClassifier] Retraining took %.1fs (%s on training data only)",
+            seconds,
+            "%.1fs" % search_seconds[0] if search_seconds else "unknown",
         )
-        self.logger.debug("[SpanClassifier] micro F1: " + str(micro_f1))
-        return micro_f1
+        return crf
 
     def predict(self, corpus: Corpus) -> None:
         # input:
@@ -211,19 +281,34 @@ class SpanClassifier(Model):
                 + " first or load existing model to initialize it"
             )
             return
-        X_test = self.get_features(corpus)
-        predictions = {}
-        for t in self.target_span_types:
-            self.logger.debug("[SpanClassifer] %r", t)
-            X_test2 = self.get_span_type_specific_features(corpus, t)
-            X_test_merged = self.merge_features(X_test, X_test2)
-            y_pred = self.target2classifier[t.name].predict(X_test_merged)
-            for X_item, y_item in zip(X_test_merged, y_pred):
-                self.logger.debug("[SpanClassifier] %r", X_item)
-                self.logger.debug("[SpanClassifier] %r", y_item)
-            self.logger.debug("[SpanClassifier] -----")
-            predictions[t.name] = y_pred
-        self.prepare_results(predictions, corpus)
+        # open every tagger once, rather than going through CRF.predict for every span type
+        taggers = [(t, self.target2classifier[t.name].tagger_) for t in self.target_span_types]
+        debug = self.logger.isEnabledFor(logging.DEBUG)
+        instances = corpus.instances
+        batches = [
+            instances[i:i + self.batch_size] for i in range(0, len(instances), self.batch_size)
+        ]
+        self.logger.info("[SpanClassifier] Predicting spans...")
+        for batch in progressify(batches, "predicting spans"):
+            token_spans = [self.tokenize(instance) for instance in batch]
+            words = [list(word_tokenizer.tokenize(instance.text)) for instance in batch]
+            X_batch = self.encode([
+                self.instance_features(instance, tokens) for instance, tokens in zip(batch, token_spans)
+            ])
+            batch_labels = []
+            for t, tagger in taggers:
+                X_type = self.encode([self.span_type_specific_features(w, t) for w in words])
+                X_merged = self.merge_features(X_batch, X_type)
+                labels = [tagger.tag(xseq) for xseq in X_merged]
+                if debug:
+                    self.logger.debug("[SpanClassifer] %r", t)
+                    for X_item, y_item in zip(X_merged, labels):
+                        self.logger.debug("[SpanClassifier] %r", X_item)
+                        self.logger.debug("[SpanClassifier] %r", y_item)
+                batch_labels.append(labels)
+            for i, instance in enumerate(batch):
+                self.make_spans(instance, token_spans[i], [labels[i] for labels in batch_labels])
+        self.logger.info("[SpanClassifier] Predicting spans done")
 
     def get_spans_for_tokens(
         self, tokens: List[Tuple[int, int]], instance: Instance
@@ -310,140 +395,78 @@ class SpanClassifier(Model):
             instance_text = instance.text.replace('"', "'")
             instance.text = instance_text
             words = list(word_tokenizer.tokenize(instance_text))
-            instance_feature_list = []
-            for word in words:
-                features: Features = {}
-                if target.name in self.gazetteer:
-                    features["in_" + str(target.name) + "_gazetteer"] = (
-                        word.lower() in self.gazetteer[target.name]
-                    )
-                instance_feature_list.append(features)
-            feature_list.append(instance_feature_list)
+            feature_list.append(self.span_type_specific_features(words, target))
         return feature_list
 
+    def span_type_specific_features(self, words: List[str], target: SpanType) -> List[Features]:
+        instance_feature_list = []
+        for word in words:
+            features: Features = {}
+            if target.name in self.gazetteer:
+                features["in_" + str(target.name) + "_gazetteer"] = (
+                    word.lower() in self.gazetteer[target.name]
+                )
+            instance_feature_list.append(features)
+        return instance_feature_list
+
     def merge_features(
-        self, features1: List[List[Features]], features2: List[List[Features]]
-    ) -> List[List[Features]]:
-        result = copy.deepcopy(features1)
-        for instance_features1, instance_features2 in zip(result, features2):
-            for f1, f2 in zip(instance_features1, instance_features2):
-                f1.update(f2)
-        return result
-
-    def word_features(self, word: str, prefix: str) -> Features:
-        return {
-            prefix + ".lower": word.lower(),
-            prefix + ".isupper": word.isupper(),
-            prefix + ".istitle": word.istitle(),
-            prefix + ".isdigit": word.isdigit(),
-            prefix + ".containsdigit": self.contains_digit(word),
-            prefix + ".containspunct": self.contains_punct(word),
-            prefix + ".stem": self.get_stem(word),
-        }
-
-    def token_features(
-        self, instance: Instance, token: Tuple[int, int], prefix: str
-    ) -> Features:
-        left, right = token
-        word = instance.text[left:right]
-        features = self.word_features(word, prefix)
-        for given_span_type in self.given_span_types:
-            features[
-                prefix + ".is_" + str(given_span_type.name)
-            ] = self.is_token_in_span(instance, token, given_span_type)
-        return features
+        self, features1: FeatureSequences, features2: FeatureSequences
+    ) -> FeatureSequences:
+        if isinstance(features1, EncodedSequences):
+            assert isinstance(features2, EncodedSequences)
+            return features1.merge(features2)
+        assert not isinstance(features2, EncodedSequences)
+        # feature values are immutable, so shallow copies are enough
+        return [
+            [{**f1, **f2} for f1, f2 in zip(instance_features1, instance_features2)]
+            for instance_features1, instance_features2 in zip(features1, features2)
+        ]
+
+    def tokenize(self, instance: Instance) -> List[Tuple[int, int]]:
+        instance.text = instance.text.replace('"', "'")
+        return list(word_tokenizer.span_tokenize(instance.text))
 
     def get_features(self, corpus: Corpus) -> List[List[Features]]:
-        feature_list = []
-        for instance in progressify(corpus.instances, "getting features"):
-            instance_text = instance.text.replace('"', "'")
-            instance.text = instance_text
-            token_spans = list(word_tokenizer.span_tokenize(instance_text))
-            instance_feature_list = []
-            for i, token in enumerate(token_spans):
-                features = self.token_features(instance, token, "word")
-
-                # context features: features of previous token
-                if i > 0:
-                    prev_token = token_spans[i - 1]
-                    features.update(
-                        self.token_features(instance, prev_token, "-1:word")
-                    )
-                else:
-                    features["BOS"] = True
+        return [
+            self.instance_features(instance, self.tokenize(instance))
+            for instance in progressify(corpus.instances, "getting features")
+        ]
 
-                # context features: features of next token
-                if i < len(token_spans) - 1:
-                    next_token = token_spans[i + 1]
-                    features.update(
-                        self.token_features(instance, next_token, "+1:word")
-                    )
-                else:
-                    features["EOS"] = True
-
-                instance_feature_list.append(features)
-
-            feature_list.append(instance_feature_list)
-        return feature_list
+    def instance_features(self, instance: Instance, token_spans: List[Tuple[int, int]]) -> List[Features]:
+        return self.feature_extractor.extract(instance, token_spans)
 
-    def is_token_in_span(
-        self, instance: Instance, token: Tuple[int, int], span_type: SpanType
-    ) -> bool:
-        left, right = token
-        for span in instance.spans:
-            if span.span_type == span_type:
-                if span.left <= left and span.right >= right:
-                    return True
-                else:  # If tokenizer does not split the same way as annotation
-                    if span.left == left and right > span.right:
-                        return True
-                    elif span.right == right and left < span.left:
-                        return True
-        return False
-
-    def contains_digit(self, word: str) -> bool:
-        return len(set(word) & set(string.digits)) > 0
-
-    def contains_punct(self, word: str) -> bool:
-        # TODO -- change to string.punctuation
-        punct = ".,-"
-        return len(set(word) & set(punct)) > 0
-
-    def get_stem(self, word: str) -> str:
-        return self.ps.stem(word)
-
-    def prepare_results(
-        self, predictions: Dict[str, List[List[str]]], corpus: Corpus
+    def make_spans(
+        self, instance: Instance, token_spans: List[Tuple[int, int]], labels: List[List[str]]
     ) -> None:
-        self.logger.info("[SpanClassifier] Preparing results...")
-        for i, instance in enumerate(corpus.instances):
-            instance_text = instance.text.replace('"', "'")
-            instance.text = instance_text
-            instance_tokens = list(word_tokenizer.span_tokenize(instance_text))
-            for target_span_type in self.target_span_types:
-                instance_predictions = predictions[target_span_type.name][i]
-                current_span_left: Optional[int] = None
-                current_span_right = 0
-                for token, label in zip(instance_tokens, instance_predictions):
-                    if label != "O":
-                        d_msg = "token: " + str(token) + "\t" + str(instance.text[token[0]:token[1]])
-                        d_msg += "\t" + "label: " + str(target_span_type)
-                        self.logger.debug("[SpanClassifier] %r", d_msg)
-                    if current_span_left is not None and label in "BO":
-                        instance.new_span(
-                            target_span_type,
-                            current_span_left,
-                            current_span_right,
-                        )
-                        current_span_left = None
-                    if label == "B":
-                        current_span_left = token[0]
-                    if label in "BI":
-                        current_span_right = token[1]
-                if current_span_left is not None:  # otherwise spans at end of window are neglected
-                    instance.new_span(
-                            target_span_type,
-                            current_span_left,
-                            current_span_right,
-                    )
-        self.logger.info("[SpanClassifier] Preparing results done")
+        """
+        Decode the BIO labels predicted for each target span type (in the order of target_span_types) in a
+        single pass over the tokens, and add the resulting spans to the instance.
+        """
+        debug = self.logger.isEnabledFor(logging.DEBUG)
+        n_types = len(self.target_span_types)
+        current_lefts: List[Optional[int]] = [None] * n_types
+        current_rights = [0] * n_types
+        spans: List[List[Tuple[int, int]]] = [[] for _ in range(n_types)]
+        for i, token in enumerate(token_spans):
+            for k in range(n_types):
+                label = labels[k][i]
+                if label == "O":
+                    if current_lefts[k] is not None:
+                        spans[k].append((cast(int, current_lefts[k]), current_rights[k]))
+                        current_lefts[k] = None
+                    continue
+                if debug:
+                    d_msg = "token: " + str(token) + "\t" + str(instance.text[token[0]:token[1]])
+                    d_msg += "\t" + "label: " + str(self.target_span_types[k])
+                    self.logger.debug("[SpanClassifier] %r", d_msg)
+                if label == "B":
+                    if current_lefts[k] is not None:
+                        spans[k].append((cast(int, current_lefts[k]), current_rights[k]))
+                    current_lefts[k] = token[0]
+                current_rights[k] = token[1]
+        for k, target_span_type in enumerate(self.target_span_types):
+            if current_lefts[k] is not None:  # otherwise spans at end of window are neglected
+                spans[k].append((cast(int, current_lefts[k]), current_rights[k]))
+            # spans are added type by type, as they always have been
+            for left, right in spans[k]:
+                instance.new_span(target_span_type, left, right)
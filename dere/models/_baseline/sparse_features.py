@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from scipy.sparse import csr_matrix, coo_matrix
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.utils import murmurhash3_32
+
+
+@dataclass
+class TextBlock:
+    """
+    A bag of words feature block: the counts of the terms the vectorizer extracts from each text.
+    """
+    name: str
+    texts: Sequence[str]
+    vectorizer: CountVectorizer
+
+
+@dataclass
+class NumericBlock:
+    """
+    A single numeric feature column.
+    """
+    name: str
+    values: Sequence[float]
+
+
+FeatureBlock = Union[TextBlock, NumericBlock]
+
+
+class SparseFeatureBuilder:
+    """
+    Assembles feature blocks side by side into a single CSR matrix, in one pass over the rows. Terms are
+    looked up in the fitted vocabularies of the blocks' vectorizers, each block getting its own range of
+    columns, which gives the same matrix as transforming each block and stacking the results.
+
+    Alternatively, like sklearn's FeatureHasher, all features can be hashed into n_hash_features columns
+    (with alternating signs, so that collisions cancel out in expectation). Then no vocabularies are needed,
+    and the vectorizers are only used to split texts into terms.
+    """
+    def __init__(self, n_hash_features: Optional[int] = None) -> None:
+        self.n_hash_features = n_hash_features
+
+    @property
+    def hashing(self) -> bool:
+        return self.n_hash_features is not None
+
+    def _hash(self, key: str) -> Tuple[int, float]:
+        assert self.n_hash_features is not None
+        h = murmurhash3_32(key, seed=0)
+        return abs(h) % self.n_hash_features, 1.0 if h >= 0 else -1.0
+
+    def build(self, blocks: Sequence[FeatureBlock], n_rows: int) -> csr_matrix:
+        rows: List[int] = []
+        columns: List[int] = []
+        values: List[float] = []
+        offset = 0
+        for block in blocks:
+            if isinstance(block, TextBlock):
+                analyze: Callable[[str], List[str]] = block.vectorizer.build_analyzer()
+                if self.hashing:
+                    prefix = block.name + "="
+                    for row, text in enumerate(block.texts):
+                        for term in analyze(text):
+                            column, sign = self._hash(prefix + term)
+                            rows.append(row)
+                            columns.append(column)
+                            values.append(sign)
+                else:
+                    vocabulary: Dict[str, int] = block.vectorizer.vocabulary_
+                    for row, text in enumerate(block.texts):
+                        for term in analyze(text):
+                            index = vocabulary.get(term)
+                            if index is not None:
+                                rows.append(row)
+                                columns.append(offset + index)
+                                values.append(1.0)
+                    offset += len(vocabulary)
+            else:
+                if self.hashing:
+                    column, sign = self._hash(block.name)
+                else:
+                    column = offset
+                    sign = 1.0
+                    offset += 1
+                for row, value in enumerate(block.values):
+                    if value != 0:
+                        rows.append(row)
+                        columns.append(column)
+                        values.append(sign * value)
+        n_columns = self.n_hash_features if self.n_hash_features is not None else offset
+        # duplicate entries (repeated terms) are summed up by the conversion to CSR
+        matrix = coo_matrix(
+            (np.array(values, dtype=np.float64), (np.array(rows, dtype=int), np.array(columns, dtype=int))),
+            shape=(n_rows, n_columns),
+        ).tocsr()
+        if self.hashing:
+            matrix.eliminate_zeros()
+        return matrix
@@ -5,7 +5,7 @@ import pickle
 
 from dere.corpus import Corpus
 from dere.taskspec import TaskSpecification
-from dere.evaluation import evaluate, Result
+from dere.evaluation import Evaluator, Result
 
 
 class Model:
@@ -53,8 +53,19 @@ class Model:
     def predict(self, corpus: Corpus) -> None:
         ...
 
-    def evaluate(self, corpus: Corpus) -> Result:
+    def evaluate(self, corpus: Corpus, evaluator: Optional[Evaluator] = None) -> Result:
+        '''
+        Predict the gold annotations of a corpus, and evaluate the predictions against them.
+
+        Args:
+            corpus: The corpus to evaluate on.
+            evaluator: An Evaluator for the corpus, to reuse its index of the gold annotations when evaluating
+                several times on the same corpus.
+        '''
+        if evaluator is None:
+            evaluator = Evaluator(corpus, self.task_spec)
+        assert evaluator.gold is corpus
         prediction = corpus.clone()
         prediction.strip_gold()
         self.predict(prediction)
-        return evaluate(prediction, corpus, self.task_spec)
+        return evaluator.evaluate(prediction)
@@ -0,0 +1,61 @@
+"""
+A process-wide registry of expensive, read-only resources such as spaCy pipelines.
+
+Resources are loaded on first use and then shared by every model in the process, so that importing DeRE
+stays cheap, and a long-running process (or each worker of a pool) loads every resource at most once.
+"""
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+_resources: Dict[Hashable, Any] = {}
+_lock = threading.RLock()
+logger = logging.getLogger("dere")
+
+
+def get(key: Hashable, loader: Callable[[], T]) -> T:
+    """
+    Return the resource registered under key, loading it with loader if it isn't loaded yet.
+    """
+    try:
+        return _resources[key]  # type: ignore
+    except KeyError:
+        pass
+    with _lock:
+        if key not in _resources:
+            logger.debug("[resources] loading %r", key)
+            _resources[key] = loader()
+        return _resources[key]  # type: ignore
+
+
+def is_loaded(key: Hashable) -> bool:
+    return key in _resources
+
+
+def release(key: Hashable) -> None:
+    """
+    Forget a loaded resource, e.g. to free its memory. It is loaded again when it is next needed.
+    """
+    with _lock:
+        _resources.pop(key, None)
+
+
+def spacy_pipeline(name: str = "en") -> Any:
+    """
+    The spaCy pipeline with the given name, downloading the model if it isn't installed.
+    """
+    def load() -> Any:
+        import spacy
+        try:
+            return spacy.load(name)
+        except OSError:
+            # This feels dirty :(
+            # A better approach would be to depend upon the model as a module and let dependency handle it.
+            # Unfortunately, those modules are not on PyPi, and so installation would be more complicated
+            from spacy.cli.download import download
+            download(name)
+            return spacy.load(name)
+
+    return get(("spacy", name), load)
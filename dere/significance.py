@@ -0,0 +1,199 @@
+"""
+Confidence intervals and significance tests for evaluation Results, computed from their per-document counts.
+
+All of these resample documents, and compute micro-averaged F1 scores of the resampled corpora from the
+summed counts of their documents. The resamples are drawn in batches, each of which is a few matrix
+operations, so that thousands of resamples take milliseconds even for large corpora.
+"""
+from __future__ import annotations
+from typing import Any, Collection, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from dere.evaluation import Result, _SFType, _string_table
+
+# the number of (resample, document) entries per batch
+_BATCH_ENTRIES = 2 ** 20
+
+
+def _fscores(counts: np.ndarray) -> np.ndarray:
+    """
+    Micro-averaged F1 scores from an array of (tp, fp, fn) counts along the last axis.
+    """
+    tp = counts[..., 0]
+    denominator = 2 * tp + counts[..., 1] + counts[..., 2]
+    return np.where(tp > 0, 2 * tp / np.maximum(denominator, 1), 0.0)
+
+
+def _document_totals(result: Result, cls: Union[_SFType, Collection[_SFType]]) -> np.ndarray:
+    """
+    The (tp, fp, fn) counts of each document of an evaluation, summed over the given types.
+    """
+    if result.document_counts is None:
+        raise ValueError("Result has no per-document counts")
+    if not isinstance(cls, Collection):
+        cls = [cls]
+    columns = [result.type_ids[c] for c in cls]
+    return np.asarray(result.document_counts[:, :, columns].sum(axis=2))
+
+
+def _paired_totals(
+        result_a: Result, result_b: Result, cls: Union[_SFType, Collection[_SFType]]
+) -> Tuple[np.ndarray, np.ndarray]:
+    if result_a.document_ids != result_b.document_ids:
+        raise ValueError("Results have to be evaluated on the same documents to be compared")
+    return _document_totals(result_a, cls), _document_totals(result_b, cls)
+
+
+def _batches(n_resamples: int, n_documents: int) -> Iterator[int]:
+    batch_size = max(1, _BATCH_ENTRIES // max(1, n_documents))
+    for start in range(0, n_resamples, batch_size):
+        yield min(batch_size, n_resamples - start)
+
+
+def _bootstrap_fscores(
+        totals: List[np.ndarray], n_resamples: int, random_state: np.random.RandomState
+) -> List[np.ndarray]:
+    """
+    The F1 scores of n_resamples bootstrap resamples of the documents, for each of the given (paired)
+    per-document counts.
+    """
+    n_documents = len(totals[0])
+    scores: List[List[np.ndarray]] = [[] for _ in totals]
+    for batch_size in _batches(n_resamples, n_documents):
+        # how often each document is drawn in each resample
+        draws = random_state.randint(0, n_documents, size=(batch_size, n_documents))
+        draws += np.arange(batch_size)[:, np.newaxis] * n_documents
+        weights = np.bincount(draws.ravel(), minlength=batch_size * n_documents)
+        weights = weights.reshape(batch_size, n_documents)
+        for i, document_totals in enumerate(totals):
+            scores[i].append(_fscores(weights @ document_totals))
+    return [np.concatenate(s) for s in scores]
+
+
+def _interval(samples: np.ndarray, confidence: float) -> Tuple[float, float]:
+    alpha = (1 - confidence) / 2
+    low, high = np.percentile(samples, [100 * alpha, 100 * (1 - alpha)])
+    return float(low), float(high)
+
+
+def bootstrap_interval(
+        result: Result, cls: Union[_SFType, Collection[_SFType]],
+        n_resamples: int = 10000, confidence: float = 0.95, seed: Optional[int] = None
+) -> Tuple[float, float]:
+    """
+    A bootstrap confidence interval for the F1 score of a SpanType or FrameType, or the micro-averaged F1
+    score of a collection thereof.
+
+    Args:
+        result: A Result with per-document counts, as returned by evaluate.
+        cls: The type or collection of types to score.
+        n_resamples: The number of bootstrap resamples of the documents.
+        confidence: The confidence level of the interval.
+        seed: Seed for the resampling.
+
+    Returns:
+        The lower and upper bounds of the interval.
+    """
+    totals = _document_totals(result, cls)
+    scores, = _bootstrap_fscores([totals], n_resamples, np.random.RandomState(seed))
+    return _interval(scores, confidence)
+
+
+def paired_bootstrap(
+        result_a: Result, result_b: Result, cls: Union[_SFType, Collection[_SFType]],
+        n_resamples: int = 10000, confidence: float = 0.95, seed: Optional[int] = None
+) -> Tuple[float, float, float]:
+    """
+    A paired bootstrap confidence interval for the difference between the F1 scores of two evaluations of
+    the same gold documents: both are scored on the same resamples of the documents.
+
+    Args:
+        result_a: The Result of the first system.
+        result_b: The Result of the second system.
+        cls: The type or collection of types to score.
+        n_resamples: The number of bootstrap resamples of the documents.
+        confidence: The confidence level of the interval.
+        seed: Seed for the resampling.
+
+    Returns:
+        The observed difference (F1 of a minus F1 of b), and the lower and upper bounds of its interval.
+    """
+    totals_a, totals_b = _paired_totals(result_a, result_b, cls)
+    scores_a, scores_b = _bootstrap_fscores([totals_a, totals_b], n_resamples, np.random.RandomState(seed))
+    delta = _fscores(totals_a.sum(axis=0)) - _fscores(totals_b.sum(axis=0))
+    low, high = _interval(scores_a - scores_b, confidence)
+    return float(delta), low, high
+
+
+def randomization_test(
+        result_a: Result, result_b: Result, cls: Union[_SFType, Collection[_SFType]],
+        n_resamples: int = 10000, seed: Optional[int] = None
+) -> float:
+    """
+    An approximate randomization test of the null hypothesis that two systems are equally good, on the
+    F1 score of a type or the micro-averaged F1 score of a collection of types. Each resample swaps the
+    counts of the two systems on a random half of the documents.
+
+    Args:
+        result_a: The Result of the first system.
+        result_b: The Result of the second system, evaluated on the same documents.
+        cls: The type or collection of types to score.
+        n_resamples: The number of random swaps.
+        seed: Seed for the swaps.
+
+    Returns:
+        The (two-sided) p-value.
+    """
+    totals_a, totals_b = _paired_totals(result_a, result_b, cls)
+    sum_a = totals_a.sum(axis=0)
+    sum_b = totals_b.sum(axis=0)
+    observed = abs(_fscores(sum_a) - _fscores(sum_b))
+    difference = totals_b - totals_a
+    random_state = np.random.RandomState(seed)
+    n_extreme = 0
+    for batch_size in _batches(n_resamples, len(totals_a)):
+        swaps = (random_state.random_sample((batch_size, len(totals_a))) < 0.5).astype(np.int64)
+        shift = swaps @ difference
+        statistics = np.abs(_fscores(sum_a + shift) - _fscores(sum_b - shift))
+        # a small tolerance, so that resamples that tie with the observed difference count as extreme
+        n_extreme += int(np.count_nonzero(statistics >= observed - 1e-12))
+    return (n_extreme + 1) / (n_resamples + 1)
+
+
+def comparison_report(
+        result_a: Result, result_b: Result,
+        n_resamples: int = 10000, confidence: float = 0.95, seed: Optional[int] = None
+) -> str:
+    """
+    Return a pretty-printed comparison of two evaluations of the same gold documents, showing the F1 scores
+    of both with their confidence intervals, their difference, and its significance, for the span, frame and
+    overall totals.
+
+    Returns:
+        A string containing the report, rendered as an ascii-art table.
+    """
+    def interval(low: float, high: float) -> str:
+        return "[%.2f, %.2f]" % (100 * low, 100 * high)
+
+    table: List[Union[List[Any], str]] = [[
+        "Class", "fscore a", "interval", "fscore b", "interval", "a - b", "interval", "p"
+    ]]
+    totals: List[Tuple[Sequence[_SFType], str]] = [
+        (result_a.span_types, "=[SPAN TOTAL]="),
+        (result_a.frame_types, "=[FRAME TOTAL]="),
+        (result_a.sf_types, "=[TOTAL]="),
+    ]
+    for cls, label in totals:
+        delta, low, high = paired_bootstrap(result_a, result_b, cls, n_resamples, confidence, seed)
+        table.append([
+            label,
+            "%.2f" % (100 * result_a.fscore(cls)),
+            interval(*bootstrap_interval(result_a, cls, n_resamples, confidence, seed)),
+            "%.2f" % (100 * result_b.fscore(cls)),
+            interval(*bootstrap_interval(result_b, cls, n_resamples, confidence, seed)),
+            "%.2f" % (100 * delta),
+            interval(low, high),
+            "%.4f" % randomization_test(result_a, result_b, cls, n_resamples, seed),
+        ])
+    return _string_table(table)
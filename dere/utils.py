@@ -5,6 +5,7 @@ import sys
 
 from dere.models import Model
 from dere.corpus import Corpus
+from dere.evaluation import Evaluator
 from dere.taskspec import TaskSpecification
 
 
@@ -171,10 +172,12 @@ def _grid_search_class(
                 return
             best_model_index = None
             best_score = None
+            # the dev corpus is only indexed once for all models
+            evaluator = Evaluator(dev_corpus, self.task_spec)
             for i, (model, value) in enumerate(zip(self.models, param_values)):
                 print("Grid Search: %s: %s" % (param_name, str(value)))
                 model.train(corpus, dev_corpus)
-                score = model.evaluate(dev_corpus)
+                score = model.evaluate(dev_corpus, evaluator)
                 if best_model_index is None or score > best_score:
                     print("Best score!")
                     best_model_index = i
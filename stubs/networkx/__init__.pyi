@@ -23,11 +23,25 @@ class Graph:
 
     def subgraph(self, nbunch: Iterable[Hashable]) -> Graph:
         ...
+
+    def number_of_nodes(self) -> int:
+        ...
+
+    def number_of_edges(self) -> int:
+        ...
         
 class DiGraph(Graph):
     def subgraph(self, nbunch: Iterable[Hashable]) -> DiGraph:
         ...
 
+    # nbunch is a node or an iterable of nodes. With data given as an attribute name, the edges are
+    # (u, v, value of the attribute) triples
+    def in_edges(self, nbunch: Any = None, data: Union[bool, str] = False) -> List[Tuple[Any, ...]]:
+        ...
+
+    def out_edges(self, nbunch: Any = None, data: Union[bool, str] = False) -> List[Tuple[Any, ...]]:
+        ...
+
 
 def shortest_path(
     G: Graph,
@@ -48,6 +62,9 @@ def shortest_path_length(
 def connected_components(G: Graph) -> Iterator[Set[Hashable]]:
     ...
 
+def weakly_connected_components(G: DiGraph) -> Iterator[Set[Hashable]]:
+    ...
+
 def is_isomorphic(
         G1: Graph,
         G2: Graph,
@@ -0,0 +1,16 @@
+from typing import Any, Dict, Iterable, List, Union
+
+class ItemSequence:
+    # feature dicts, or lists of attribute names
+    def __init__(self, items: Iterable[Union[Dict[str, Any], Iterable[str]]]) -> None:
+        ...
+
+    def items(self) -> List[Dict[str, float]]:
+        ...
+
+    def __len__(self) -> int:
+        ...
+
+class Tagger:
+    def tag(self, xseq: Union[ItemSequence, List[Dict[str, Any]], None] = None) -> List[str]:
+        ...
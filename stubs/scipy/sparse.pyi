@@ -1,4 +1,4 @@
-from typing import Sequence, Optional, Tuple, Union, Iterator
+from typing import Any, Sequence, Optional, Tuple, Union, Iterator
 from numpy import dtype, ndarray
 
 class spmatrix:
@@ -7,6 +7,9 @@ class spmatrix:
     def __iter__(self) -> Iterator:
         ...
 
+    def __getitem__(self, key: Any) -> spmatrix:
+        ...
+
 class csr_matrix(spmatrix):
     def __init__(
         self,
@@ -14,6 +17,20 @@ class csr_matrix(spmatrix):
     ) -> None:
         ...
 
+    def eliminate_zeros(self) -> None:
+        ...
+
+class coo_matrix(spmatrix):
+    def __init__(
+        self,
+        arg1: Union[ndarray, spmatrix, Tuple[ndarray, Tuple[ndarray, ndarray]]],
+        shape: Optional[Tuple[int, int]] = None
+    ) -> None:
+        ...
+
+    def tocsr(self) -> csr_matrix:
+        ...
+
 def hstack(
     blocks: Sequence[spmatrix],
     format: Optional[str] = None,
@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import Union, Any, List, Tuple, Optional, IO
+from typing import Union, Any, Callable, Iterable, List, Tuple, Optional, IO
 
 def dump(
     value: Any,
@@ -15,3 +15,16 @@ def load(
     mmap_mode: Optional[str] = None
 ) -> Any:
     ...
+
+def cpu_count() -> int:
+    ...
+
+def delayed(function: Callable[..., Any]) -> Callable[..., Any]:
+    ...
+
+class Parallel:
+    def __init__(self, n_jobs: Optional[int] = None, **kwargs: Any) -> None:
+        ...
+
+    def __call__(self, iterable: Iterable[Any]) -> List[Any]:
+        ...
@@ -1,10 +1,12 @@
-from typing import Iterable, Union
+from typing import Callable, Dict, Iterable, List, Union
 from io import TextIOBase
 
 import scipy.sparse
 from sklearn import _ArrayLike
 
 class CountVectorizer:
+    vocabulary_: Dict[str, int]
+
     def fit(
         self,
         raw_documents: Iterable[Union[str, TextIOBase]]
@@ -16,3 +18,6 @@ class CountVectorizer:
         raw_documents: Iterable[Union[str, TextIOBase]]
     ) -> scipy.sparse.spmatrix:
         ...
+
+    def build_analyzer(self) -> Callable[[str], List[str]]:
+        ...
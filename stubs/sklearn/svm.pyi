@@ -5,6 +5,8 @@ import numpy as np
 from sklearn import _ArrayLike
 
 class LinearSVC:
+    classes_: np.ndarray
+
     def __init__(
         self,
         penalty: str = 'l2',
@@ -33,5 +35,11 @@ class LinearSVC:
     def predict(
         self,
         X: _ArrayLike
-    ) -> _ArrayLike:
+    ) -> np.ndarray:
+        ...
+
+    def decision_function(
+        self,
+        X: _ArrayLike
+    ) -> np.ndarray:
         ...
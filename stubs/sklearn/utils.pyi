@@ -10,3 +10,6 @@ def shuffle(
 	n_samples: Union[None, int] = None
 ) -> Sequence[_ArrayLike]:
 	...
+
+def murmurhash3_32(key: Union[int, str, bytes], seed: int = 0, positive: bool = False) -> int:
+	...
@@ -1,6 +1,10 @@
-from typing import Optional, List
+from typing import Any, Iterable, Optional, List
+
+from pycrfsuite import Tagger
 
 class CRF:
+    tagger_: Tagger
+
     def __init__(
         self,
         algorithm: str = 'lbfgs',
@@ -32,14 +36,15 @@ class CRF:
     ) -> None:
         ...
 
+    # the sequences in X are lists of feature dicts or pycrfsuite.ItemSequences
     def fit(
         self,
-        X: List[List[dict]],
+        X: Iterable[Any],
         y: List[List[str]],
-        X_dev: Optional[List[List[dict]]] = None,
+        X_dev: Optional[Iterable[Any]] = None,
         y_dev: Optional[List[List[str]]] = None,
     ) -> CRF:
         ...
 
-    def predict(self, X: List[List[dict]]) -> List[List[str]]:
+    def predict(self, X: Iterable[Any]) -> List[List[str]]:
         ...
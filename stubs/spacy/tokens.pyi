@@ -1,4 +1,4 @@
-from typing import Iterator, Any, Union, List, overload
+from typing import Iterator, Any, Iterable, Union, List, Optional, overload
 
 
 from spacy.vocab import Vocab
@@ -85,3 +85,14 @@ class Doc:
     @overload
     def __getitem__(self, i: slice) -> Span:
         ...
+
+    def __init__(
+        self, vocab: Vocab, words: Optional[List[str]] = None, spaces: Optional[List[bool]] = None
+    ) -> None:
+        ...
+
+    def to_bytes(self, exclude: Iterable[str] = ...) -> bytes:
+        ...
+
+    def from_bytes(self, bytes_data: bytes, exclude: Iterable[str] = ...) -> Doc:
+        ...
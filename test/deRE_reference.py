@@ -0,0 +1,185 @@
+"""
+How deRE_evaluation.py used to match answers against gold annotations: every answer is compared to every gold
+annotation, and nested events are compared again every time they are reached. DocumentMatcher and SpanIndex
+replace this; it is kept, condensed, as the reference they are tested against.
+"""
+import re
+
+
+def make_soft_classes(cur_class):
+    cur_class = re.sub(r"^Positive\_r", "R", cur_class)
+    cur_class = re.sub(r"^Negative\_r", "R", cur_class)
+    cur_class = re.sub(r"^Transcription$", "Gene_expression", cur_class)
+    return cur_class
+
+
+class QuadraticMatcher:
+    def __init__(
+        self,
+        a1_annotations,
+        answers_span,
+        answers_frame,
+        golds_span,
+        golds_frame,
+        text,
+        events_in_text,
+        primary_role="Theme",
+        match_span_arguments=False,
+        do_soft_class=False,
+        do_soft_args=False,
+        do_soft_span=False,
+        do_soft_overlap_span=False,
+    ):
+        self.a1_annotations = a1_annotations
+        self.answers_span = answers_span
+        self.answers_frame = answers_frame
+        self.golds_span = golds_span
+        self.golds_frame = golds_frame
+        self.text = text
+        self.events_in_text = events_in_text
+        self.text_len = len(text)
+        self.primary_role = primary_role
+        # the USAGE copy of the script also compared the classes of answer spans
+        self.match_span_arguments = match_span_arguments
+        self.do_soft_class = do_soft_class
+        self.do_soft_args = do_soft_args
+        self.do_soft_span = do_soft_span
+        self.do_soft_overlap_span = do_soft_overlap_span
+
+    def eq_event(self, aid, gid):
+        if aid.startswith("E"):
+            return self.eq_class(aid, gid) and self.eq_span(aid, gid) and self.eq_args(aid, gid)
+        elif aid.startswith("M"):
+            return self.eq_class(aid, gid) and self.eq_args(aid, gid)
+        return False
+
+    def eq_class(self, aid, gid):
+        if aid in self.a1_annotations:
+            return aid == gid
+        elif aid in self.answers_frame:
+            aclass = self.answers_frame[aid][0]
+            gclass = self.golds_frame[gid][0]
+        elif self.match_span_arguments and aid in self.answers_span:
+            aclass = self.answers_span[aid][0]
+            gclass = self.golds_span[gid][0]
+        else:
+            return False
+        if self.do_soft_class:
+            aclass = make_soft_classes(aclass)
+            gclass = make_soft_classes(gclass)
+        return aclass == gclass
+
+    def eq_args(self, aid, gid):
+        ae_args = list(self.answers_frame[aid][2])
+        ge_args = list(self.golds_frame[gid][2])
+        if self.do_soft_args:
+            while not ae_args[-1].startswith(self.primary_role + ":"):
+                ae_args.pop(-1)
+            while not ge_args[-1].startswith(self.primary_role + ":"):
+                ge_args.pop(-1)
+        if len(ge_args) != len(ae_args):
+            return False
+
+        for ae_arg, ge_arg in zip(ae_args, ge_args):
+            aatype, aaid = ae_arg.split(":")
+            gatype, gaid = ge_arg.split(":")
+            if not self.do_soft_args and aatype != gatype:
+                return False
+            if aaid[0] != gaid[0]:
+                return False
+            if aaid.startswith("E") and not self.eq_revent(aaid, gaid):
+                return False
+            if aaid.startswith("T") and not self.eq_entity(aaid, gaid):
+                return False
+        return True
+
+    def eq_revent(self, aeid, geid):
+        if not aeid.startswith("E") or not geid.startswith("E"):
+            return False
+        return self.eq_class(aeid, geid) and self.eq_span(aeid, geid) and self.eq_args(aeid, geid)
+
+    def eq_entity(self, aeid, geid):
+        if not aeid.startswith("T") or not geid.startswith("T"):
+            return False
+        return self.eq_class(aeid, geid) and self.eq_span(aeid, geid)
+
+    def eq_span(self, aid, gid):
+        if aid.startswith("T") and aid in self.a1_annotations:
+            return aid == gid
+
+        abeg = aend = gbeg = gend = -1
+        if aid.startswith("T"):
+            abeg, aend = self.answers_span[aid][1:]
+        elif aid.startswith("E"):
+            abeg, aend = self.answers_span[self.answers_frame[aid][1]][1:]
+        if gid.startswith("T"):
+            gbeg, gend = self.golds_span[gid][1:]
+        elif gid.startswith("E"):
+            gbeg, gend = self.golds_span[self.golds_frame[gid][1]][1:]
+        if abeg < 0 or gbeg < 0:
+            return False
+
+        if self.do_soft_overlap_span:
+            return (abeg <= gbeg and aend >= gbeg) or (gbeg <= abeg and gend >= abeg)
+        elif self.do_soft_span:
+            gbeg, gend = expand_span(gbeg, gend, self.text, self.events_in_text, self.text_len)
+            return abeg >= gbeg and aend <= gend
+        else:
+            return abeg == gbeg and aend == gend
+
+    def count_match(self):
+        matched_answers = set()
+        matched_golds = set()
+        for aid in self.answers_frame:
+            for gid in self.golds_frame:
+                if self.eq_event(aid, gid):
+                    matched_answers.add(aid)
+                    matched_golds.add(gid)
+        return (
+            count_classes(self.answers_frame, matched_answers),
+            count_classes(self.golds_frame, matched_golds),
+        )
+
+    def count_match_span(self):
+        answers = [aid for aid in self.answers_span if aid.startswith("T")]
+        golds = [gid for gid in self.golds_span if gid.startswith("T")]
+        matched_answers = set()
+        matched_golds = set()
+        for aid in answers:
+            for gid in golds:
+                if self.eq_span(aid, gid):
+                    matched_answers.add(aid)
+                    matched_golds.add(gid)
+        return (
+            count_classes(self.answers_span, matched_answers),
+            count_classes(self.golds_span, matched_golds),
+        )
+
+
+def expand_span(beg, end, text, events_in_text, text_len):
+    ebeg = beg - 2
+    while (
+        (ebeg >= 0)
+        and (text[ebeg: ebeg + 1] not in [" ", ".", "!", "?", ",", "'", '"'])
+        and (ebeg not in events_in_text or events_in_text[ebeg] != "E")
+    ):
+        ebeg -= 1
+    ebeg += 1
+
+    eend = end + 2
+    while (
+        (eend <= text_len)
+        and (text[eend - 1: eend] not in [" ", ".", "!", "?", ",", "'", '"'])
+        and (eend - 1 not in events_in_text or events_in_text[eend - 1] != "E")
+    ):
+        eend += 1
+    eend -= 1
+    return ebeg, eend
+
+
+def count_classes(annotations, ids):
+    counts = {}
+    for cur_id in ids:
+        cur_class = annotations[cur_id][0]
+        counts[cur_class] = counts.get(cur_class, 0) + 1
+    return counts
@@ -0,0 +1,67 @@
+"""
+How SlotClassifier used to find the tokens of spans and the dependency paths between them, with networkx.
+DependencyTree and SpanTokenIndex replace this; it is kept as the reference they are tested against.
+"""
+import networkx as nx
+
+
+def find_node(doc, span):
+    tokens = []
+    for token in doc:
+        token_left = token.idx
+        token_right = token_left + len(token.text)
+        # if the token starts within the span
+        if span.left <= token_left < span.right:
+            tokens.append(token)
+        # if the token ends within the span
+        elif span.left < token_right <= span.right:
+            tokens.append(token)
+        # if the token starts before the span and ends after the span
+        elif token_left < span.left and token_right > span.right:
+            tokens.append(token)
+        # if the token starts after the end of the span, break
+        elif token_left > span.right:
+            break
+    return tokens
+
+
+def edge_distance(graph, tokens1, tokens2):
+    try:
+        return min(
+            nx.shortest_path_length(graph, token1.idx, token2.idx)
+            for token1 in tokens1
+            for token2 in tokens2
+        )
+    except nx.NetworkXNoPath:
+        return -1
+
+
+def edge_words_deps(graph, tokens1, tokens2, idx2word, edge2dep):
+    shortest = get_shortest_path(graph, tokens1, tokens2)
+    if shortest is None:
+        return ""
+    words_deps = [idx2word[shortest[0]]]
+    for left, right in zip(shortest, shortest[1:]):
+        words_deps.append(edge2dep[left, right])
+        words_deps.append(idx2word[right])
+    return " ".join(words_deps)
+
+
+def edge_words(graph, tokens1, tokens2, idx2word):
+    shortest = get_shortest_path(graph, tokens1, tokens2)
+    if shortest is None:
+        return []
+    return [idx2word[idx] for idx in shortest]
+
+
+def get_shortest_path(graph, tokens1, tokens2):
+    shortest = None
+    for token1 in tokens1:
+        for token2 in tokens2:
+            try:
+                this = nx.shortest_path(graph, token1.idx, token2.idx)
+                if shortest is None or len(this) < len(shortest):
+                    shortest = this
+            except nx.NetworkXNoPath:
+                continue
+    return shortest
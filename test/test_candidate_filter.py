@@ -0,0 +1,34 @@
+from dere.models._baseline.candidate_filter import CandidateFilter, token_distance
+from dere.models._baseline.dependency_tree import DependencyTree
+
+
+# two sentences: "a b c d ." and "e f", each token attached to the next, the last one being the root
+tree = DependencyTree([1, 2, 3, 4, 4, 6, 6], list("abcd.ef"), ["dep"] * 7)
+
+
+def test_token_distance():
+    assert token_distance(range(0, 2), range(1, 3)) == 0
+    assert token_distance(range(0, 2), range(2, 3)) == 1
+    assert token_distance(range(5, 6), range(0, 2)) == 4
+
+
+def test_inactive_filter_keeps_everything():
+    candidate_filter = CandidateFilter.from_config({})
+    assert not candidate_filter.active
+    assert candidate_filter.keep(tree, ["x"], [range(0, 1)], [range(6, 7)]) == [True]
+
+
+def test_filters():
+    anchors = ["x", "x", "x", "y"]
+    tokens1 = [range(0, 1)] * 3 + [range(3, 4)]
+    tokens2 = [range(1, 2), range(3, 4), range(6, 7), range(0, 1)]
+    assert CandidateFilter(max_token_distance=2).keep(tree, anchors, tokens1, tokens2) == [
+        True, False, False, False
+    ]
+    # the last pair spans two sentences, so there is no dependency path between them
+    assert CandidateFilter(max_dependency_distance=3).keep(tree, anchors, tokens1, tokens2) == [
+        True, True, False, True
+    ]
+    assert CandidateFilter(max_fillers_per_anchor=2).keep(tree, anchors, tokens1, tokens2) == [
+        True, True, False, True
+    ]
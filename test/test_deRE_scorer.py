@@ -0,0 +1,223 @@
+import os
+import random
+import sys
+
+import pytest
+from click.testing import CliRunner
+
+from deRE_reference import QuadraticMatcher, expand_span
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "dere", "evaluation"))
+import deRE_scorer  # noqa: E402
+import deRE_evaluation  # noqa: E402
+import deRE_evaluation_usage  # noqa: E402
+from deRE_evaluation import BIONLP_ST  # noqa: E402
+from deRE_evaluation_usage import USAGE  # noqa: E402
+
+SCORER_DATA = os.path.join(os.path.dirname(__file__), "data", "scorer")
+
+WORDS = ["IL-2", "p65", "binds", "the", "promoter", "and", "expression", "of", "NF-kappaB", "is", "induced"]
+EVENT_CLASSES = {
+    "Theme": ["Gene_expression", "Transcription", "Binding", "Positive_regulation", "Negative_regulation"],
+    "target": ["positive", "negative", "neutral"],
+}
+
+
+def random_text(rng, n_words):
+    text = ""
+    for _ in range(n_words):
+        text += rng.choice(WORDS) + rng.choice([" ", " ", " ", ", ", ". ", "-"])
+    return text
+
+
+def random_span(rng, text, max_len=12):
+    beg = rng.randrange(len(text) - 1)
+    return beg, min(len(text), beg + rng.randint(1, max_len))
+
+
+def jitter(rng, beg, end, text_len):
+    beg = min(max(0, beg + rng.randint(-2, 2)), text_len - 1)
+    return beg, min(max(beg + 1, end + rng.randint(-2, 2)), text_len)
+
+
+def random_document(rng, task):
+    """
+    A text with given entities, gold spans and events, and answers that are perturbed copies of the gold ones,
+    as read by read_a1_file and read_a2_file. Events only refer to events before them, so none are circular.
+    """
+    role = task.primary_role
+    classes = EVENT_CLASSES[role]
+    text = random_text(rng, 30)
+    a1 = {}
+    if role == "Theme":
+        for i in range(1, 5):
+            a1["T%d" % i] = ("Protein", *random_span(rng, text))
+    golds_span = {}
+    golds_frame = {}
+    for i in range(1, rng.randint(2, 9)):
+        cl = rng.choice(classes)
+        trigger = "T%d" % (10 + i)
+        golds_span[trigger] = (cl, *random_span(rng, text))
+        if a1:
+            theme = rng.choice(list(a1))
+        else:
+            theme = "T%d" % (50 + i)
+            golds_span[theme] = ("aspect", *random_span(rng, text))
+        if i > 1 and rng.random() < 0.4:
+            theme = "E%d" % rng.randrange(1, i)
+        args = [role + ":" + theme]
+        if rng.random() < 0.3 and (a1 or i > 1):
+            args.append("Cause:" + (rng.choice(list(a1)) if a1 else "E%d" % rng.randrange(1, i)))
+        if rng.random() < 0.2 and role == "Theme":
+            args.insert(1, role + ":" + rng.choice(list(a1)))
+        golds_frame["E%d" % i] = (cl, trigger, args)
+    for i, eid in enumerate(rng.sample(list(golds_frame), min(2, len(golds_frame)))):
+        golds_frame["M%d" % (i + 1)] = (rng.choice(["Negation", "Speculation"]), " ", [role + ":" + eid])
+
+    answers_span = {}
+    answers_frame = {}
+    for gid, (cl, trigger, args) in golds_frame.items():
+        if rng.random() < 0.15:
+            continue
+        args = list(args)
+        if gid.startswith("E"):
+            tcl, beg, end = golds_span[trigger]
+            if rng.random() < 0.3:
+                beg, end = jitter(rng, beg, end, len(text))
+            if rng.random() < 0.15:
+                tcl = cl = rng.choice(classes)
+            trigger = "T%d" % (100 + int(gid[1:]))
+            answers_span[trigger] = (tcl, beg, end)
+            for j, arg in enumerate(args):
+                arg_role, arg_id = arg.split(":")
+                if arg_id in golds_span:
+                    acl, beg, end = golds_span[arg_id]
+                    if rng.random() < 0.3:
+                        beg, end = jitter(rng, beg, end, len(text))
+                    arg_id = "T%d" % (200 + int(arg_id[1:]))
+                    answers_span[arg_id] = (acl, beg, end)
+                    args[j] = arg_role + ":" + arg_id
+            if len(args) > 1 and rng.random() < 0.2:
+                args.pop()
+        answers_frame[gid] = (cl, trigger, args)
+    for i in range(rng.randint(0, 3)):
+        trigger = "T%d" % (300 + i)
+        cl = rng.choice(classes)
+        answers_span[trigger] = (cl, *random_span(rng, text))
+        theme = rng.choice(list(a1)) if a1 else rng.choice(list(answers_span))
+        answers_frame["E%d" % (30 + i)] = (cl, trigger, [role + ":" + theme])
+    return text, a1, answers_span, answers_frame, golds_span, golds_frame
+
+
+def mark_document(text, a1, golds_span):
+    events_in_text = bytearray(len(text))
+    for _, beg, end in list(a1.values()) + list(golds_span.values()):
+        deRE_scorer.mark_span(events_in_text, beg, end)
+    return events_in_text
+
+
+FLAGS = [
+    dict(
+        do_soft_class=soft_class, do_soft_args=soft_args, do_soft_span=soft_span, do_soft_overlap_span=overlap
+    )
+    for soft_class in [False, True]
+    for soft_args in [False, True]
+    for soft_span, overlap in [(False, False), (True, False), (False, True), (True, True)]
+]
+
+
+@pytest.mark.parametrize("task", [BIONLP_ST, USAGE], ids=["bionlp", "usage"])
+@pytest.mark.parametrize("flags", FLAGS)
+def test_document_matcher_matches_quadratic_scan(task, flags):
+    rng = random.Random(7)
+    for _ in range(30):
+        text, a1, answers_span, answers_frame, golds_span, golds_frame = random_document(rng, task)
+        events_in_text = mark_document(text, a1, golds_span)
+        matcher = deRE_scorer.DocumentMatcher(
+            a1, answers_span, answers_frame, golds_span, golds_frame,
+            deRE_scorer.WordBoundaries(text, events_in_text), task, **flags
+        )
+        reference = QuadraticMatcher(
+            a1, answers_span, answers_frame, golds_span, golds_frame, text,
+            {i: "E" for i, marked in enumerate(events_in_text) if marked},
+            primary_role=task.primary_role, match_span_arguments=task.match_span_arguments, **flags
+        )
+        assert matcher.count_match() == reference.count_match()
+        assert matcher.count_match_span() == reference.count_match_span()
+
+
+@pytest.mark.parametrize("do_soft_span, do_soft_overlap", [(False, False), (True, False), (False, True)])
+def test_span_index_matches_scan(do_soft_span, do_soft_overlap):
+    rng = random.Random(3)
+    spans = []
+    for i in range(40):
+        beg = rng.randrange(100)
+        spans.append(("T%d" % i, beg, beg + rng.randint(0, 15)))
+    index = deRE_scorer.SpanIndex(spans, do_soft_span, do_soft_overlap)
+    for abeg in range(0, 120, 3):
+        for aend in range(abeg, abeg + 20, 2):
+            if do_soft_overlap:
+                expected = [i for i, gbeg, gend in spans if (abeg <= gbeg <= aend) or (gbeg <= abeg <= gend)]
+            elif do_soft_span:
+                expected = [i for i, gbeg, gend in spans if abeg >= gbeg and aend <= gend]
+            else:
+                expected = [i for i, gbeg, gend in spans if (abeg, aend) == (gbeg, gend)]
+            assert sorted(index.matches(abeg, aend)) == sorted(expected)
+
+
+def test_mark_span_matches_character_dict():
+    rng = random.Random(5)
+    events_in_text = bytearray(50)
+    marked = {}
+    for _ in range(20):
+        beg = rng.randrange(60)
+        end = beg + rng.randint(0, 10)
+        deRE_scorer.mark_span(events_in_text, beg, end)
+        for i in range(beg, end):
+            marked[i] = "E"
+        assert {i for i, c in enumerate(events_in_text) if c} == set(marked)
+    assert len(events_in_text) == max(50, max(marked) + 1)
+
+
+def test_read_a1_file_marks_entities(tmp_path):
+    path = tmp_path / "doc.a1"
+    path.write_text("T1\tProtein 0 4\tIL-2\nT2\tProtein 10 13\tp65\n")
+    events_in_text = bytearray(20)
+    annotations, marked = deRE_scorer.read_a1_file(str(path), events_in_text)
+    assert marked is events_in_text
+    assert annotations == {"T1": ("Protein", 0, 4), "T2": ("Protein", 10, 13)}
+    assert [i for i, c in enumerate(events_in_text) if c] == [0, 1, 2, 3, 10, 11, 12]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_expand_span_matches_character_scan(seed):
+    rng = random.Random(seed)
+    text = random_text(rng, 8)
+    events_in_text = bytearray(len(text))
+    for _ in range(3):
+        deRE_scorer.mark_span(events_in_text, *random_span(rng, text, max_len=5))
+    boundaries = deRE_scorer.WordBoundaries(text, events_in_text)
+    marked = {i: "E" for i, c in enumerate(events_in_text) if c}
+    for beg in range(len(text)):
+        for end in range(beg + 1, len(text) + 1):
+            expected = expand_span(beg, end, text, marked, len(text))
+            assert deRE_scorer.expand_span(beg, end, boundaries) == expected
+
+
+@pytest.mark.parametrize("task, command", [
+    ("bionlp", deRE_evaluation.deRE_evaluation),
+    ("usage", deRE_evaluation_usage.deRE_evaluation),
+])
+@pytest.mark.parametrize("mode", ["exact", "soft-span", "soft-overlap-span"])
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_scoring_command_output(task, command, mode, n_jobs):
+    # the expected reports are those of the scripts before they shared deRE_scorer
+    data = os.path.join(SCORER_DATA, task)
+    args = ["--hypo", os.path.join(data, "hypo"), "--gold", os.path.join(data, "gold")]
+    args += ["--n-jobs", str(n_jobs)]
+    if mode != "exact":
+        args.append("--" + mode)
+    result = CliRunner().invoke(command, args)
+    assert result.exit_code == 0, result.output
+    with open(os.path.join(data, "expected", mode + ".txt")) as f:
+        assert result.output == f.read()
@@ -0,0 +1,60 @@
+import random
+
+import networkx as nx
+import pytest
+
+from dere.models._baseline.dependency_tree import DependencyTree
+
+from networkx_paths import edge_distance, edge_words, edge_words_deps
+
+
+class MockToken:
+    def __init__(self, idx):
+        self.idx = idx
+
+
+def random_forest(n, rng):
+    # each sentence is a tree whose tokens only point to tokens of the same sentence
+    heads = []
+    start = 0
+    while start < n:
+        end = min(n, start + rng.randint(1, 6))
+        root = rng.randrange(start, end)
+        order = list(range(start, end))
+        rng.shuffle(order)
+        order.remove(root)
+        attached = [root]
+        sentence_heads = {root: root}
+        for token in order:
+            sentence_heads[token] = rng.choice(attached)
+            attached.append(token)
+        heads.extend(sentence_heads[i] for i in range(start, end))
+        start = end
+    return heads
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_path_features_match_networkx(seed):
+    rng = random.Random(seed)
+    n = rng.randint(1, 15)
+    heads = random_forest(n, rng)
+    words = ["w%d" % i for i in range(n)]
+    deps = ["d%d" % i for i in range(n)]
+    tree = DependencyTree(heads, words, deps)
+
+    graph = nx.Graph([(i, head) for i, head in enumerate(heads)])
+    idx2word = dict(enumerate(words))
+    edge2dep = {}
+    for i, head in enumerate(heads):
+        edge2dep[i, head] = edge2dep[head, i] = deps[i]
+
+    for _ in range(10):
+        tokens1 = rng.sample(range(n), rng.randint(1, min(3, n)))
+        tokens2 = rng.sample(range(n), rng.randint(1, min(3, n)))
+        mock1 = [MockToken(i) for i in tokens1]
+        mock2 = [MockToken(i) for i in tokens2]
+        assert tree.path_features(tokens1, tokens2) == (
+            edge_distance(graph, mock1, mock2),
+            " ".join(edge_words(graph, mock1, mock2, idx2word)),
+            edge_words_deps(graph, mock1, mock2, idx2word, edge2dep),
+        )
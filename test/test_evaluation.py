@@ -0,0 +1,324 @@
+import random
+
+import networkx as nx
+import pytest
+
+from dere.corpus import Corpus, Span
+from dere.corpus_io import BRATCorpusIO, CorpusIO, UniversalCorpusIO
+from dere.evaluation import evaluate, evaluate_documents, DocumentPairs, Evaluator, Result
+from dere.taskspec import FrameType, SlotType, SpanType, TaskSpecification
+
+
+SPAN_TYPES = (SpanType("Protein", True), SpanType("Trigger", True), SpanType("Entity", False))
+BINDING = FrameType("Binding", (
+    SlotType("Trigger", (SPAN_TYPES[1],), 1, 1),
+    SlotType("Theme", (SPAN_TYPES[0],), 1, None),
+))
+REGULATION = FrameType("Regulation", (
+    SlotType("Trigger", (SPAN_TYPES[1],), 1, 1),
+    SlotType("Theme", (SPAN_TYPES[0], BINDING), 1, 1),
+    SlotType("Cause", (SPAN_TYPES[0], BINDING), 0, 1),
+))
+FRAME_TYPES = (BINDING, REGULATION)
+TASK_SPEC = TaskSpecification(SPAN_TYPES, FRAME_TYPES)
+
+
+def random_corpora(seed, n_docs=5):
+    rng = random.Random(seed)
+    hypo = Corpus()
+    gold = Corpus()
+    for d in range(n_docs):
+        doc_id = "doc%d" % d
+        text = "x" * 50
+        # several instances per document, so that spans with equal offsets in different instances match
+        for _ in range(rng.randint(0, 3)):
+            gold_instance = gold.new_instance(text, doc_id)
+            hypo_instance = hypo.new_instance(text, doc_id)
+            for _ in range(rng.randint(0, 15)):
+                span_type = rng.choice(SPAN_TYPES)
+                left = rng.randint(0, 10)
+                right = left + rng.randint(0, 3)
+                source = rng.choice(["gold", "gold", "given"])
+                gold_instance.new_span(span_type, left, right, source)
+                if source == "given":
+                    hypo_instance.new_span(span_type, left, right, source)
+            for _ in range(rng.randint(0, 15)):
+                left = rng.randint(0, 10)
+                hypo_instance.new_span(rng.choice(SPAN_TYPES), left, left + rng.randint(0, 3))
+    return hypo, gold
+
+
+def reference_span_counts(hypo, gold):
+    # the quadratic matching that evaluate() used to do
+    tp = {}
+    fp = {}
+    fn = {}
+    for doc_id in {i.document_id for i in hypo.instances} | {i.document_id for i in gold.instances}:
+        hypo_spans = [
+            s for i in hypo.instances if i.document_id == doc_id for s in i.spans if s.source != "given"
+        ]
+        gold_spans = [
+            s for i in gold.instances if i.document_id == doc_id for s in i.spans if s.source != "given"
+        ]
+        for hspan in hypo_spans:
+            counts = tp if any(hspan.matches(gspan) for gspan in gold_spans) else fp
+            counts[hspan.span_type] = counts.get(hspan.span_type, 0) + 1
+        for gspan in gold_spans:
+            if not any(hspan.matches(gspan) for hspan in hypo_spans):
+                fn[gspan.span_type] = fn.get(gspan.span_type, 0) + 1
+    return tp, fp, fn
+
+
+def test_span_counts_match_pairwise_matching():
+    for seed in range(20):
+        hypo, gold = random_corpora(seed)
+        result = evaluate(hypo, gold, TASK_SPEC)
+        tp, fp, fn = reference_span_counts(hypo, gold)
+        for span_type in result.span_types:
+            assert result.true_positives[span_type] == tp.get(span_type, 0)
+            assert result.false_positives[span_type] == fp.get(span_type, 0)
+            assert result.false_negatives[span_type] == fn.get(span_type, 0)
+
+
+def test_span_key():
+    c = Corpus()
+    i1 = c.new_instance("some text", "doc")
+    i2 = c.new_instance("some other text", "doc")
+    s1 = i1.new_span(SPAN_TYPES[0], 0, 4)
+    s2 = i2.new_span(SPAN_TYPES[0], 0, 4)
+    s3 = i2.new_span(SPAN_TYPES[1], 0, 4)
+    assert s1.key == s2.key and s1.matches(s2)
+    assert s1.key != s3.key and not s1.matches(s3)
+
+
+def random_frame_corpora(seed, n_docs=5):
+    rng = random.Random(seed)
+    gold = Corpus()
+    for d in range(n_docs):
+        for _ in range(rng.randint(1, 2)):
+            instance = gold.new_instance("x" * 50, "doc%d" % d)
+            spans = [
+                instance.new_span(rng.choice(SPAN_TYPES[:2]), left, left + rng.randint(1, 2), "gold")
+                for left in rng.sample(range(10), rng.randint(1, 6))
+            ]
+            frames = [
+                instance.new_frame(rng.choice(FRAME_TYPES), rng.choice(["gold", "gold", "given"]))
+                for _ in range(rng.randint(0, 6))
+            ]
+            for frame in frames:
+                for slot in frame.slots.values():
+                    # frame fillers (possibly cyclic), and span fillers without duplicates
+                    fillers = rng.sample(spans, rng.randint(0, min(2, len(spans))))
+                    fillers += rng.sample(frames, rng.randint(0, 1))
+                    for filler in fillers:
+                        slot.add(filler)
+    hypo = gold.clone()
+    for instance in hypo.instances:
+        for frame in list(instance.frames):
+            action = rng.random()
+            if action < 0.2:
+                frame.remove()
+            elif action < 0.4:
+                for slot in frame.slots.values():
+                    if slot.fillers:
+                        slot.remove(rng.choice(slot.fillers))
+            elif action < 0.5:
+                copy = instance.new_frame(frame.frame_type, frame.source)
+                for slot_type, slot in frame.slots.items():
+                    for filler in slot.fillers:
+                        copy.slots[slot_type].add(filler)
+        for span in instance.spans:
+            span.source = "predicted"
+    return hypo, gold
+
+
+def reference_frame_counts(hypo, gold):
+    # the pairwise isomorphism tests that evaluate() used to do
+    def node_match(n1, n2):
+        f1 = n1["frame"]
+        f2 = n2["frame"]
+        if f1.frame_type != f2.frame_type:
+            return False
+        for slot_type in f1.slots:
+            if len(f1.slots[slot_type].fillers) != len(f2.slots[slot_type].fillers):
+                return False
+            for filler1 in f1.slots[slot_type].fillers:
+                if isinstance(filler1, Span):
+                    if not any(filler1.matches(filler2) for filler2 in f2.slots[slot_type].fillers):
+                        return False
+        return True
+
+    def edge_match(e1, e2):
+        return e1["slot"].slot_type == e2["slot"].slot_type
+
+    def components(corpus, doc_id):
+        return [
+            g.subgraph(c)
+            for g in (i.frame_graph() for i in corpus.instances if i.document_id == doc_id)
+            for c in nx.connected_components(nx.Graph(g))
+        ]
+
+    counts = {"tp": {}, "fp": {}, "fn": {}}
+
+    def add(kind, component):
+        for frame in component.nodes():
+            if frame.source != "given":
+                counts[kind][frame.frame_type] = counts[kind].get(frame.frame_type, 0) + 1
+
+    for doc_id in {i.document_id for i in gold.instances}:
+        hccs = components(hypo, doc_id)
+        for gcc in components(gold, doc_id):
+            for i, hcc in enumerate(hccs):
+                if nx.is_isomorphic(gcc, hcc, node_match=node_match, edge_match=edge_match):
+                    add("tp", gcc)
+                    del hccs[i]
+                    break
+            else:
+                add("fn", gcc)
+        for hcc in hccs:
+            add("fp", hcc)
+    return counts["tp"], counts["fp"], counts["fn"]
+
+
+def test_frame_counts_match_pairwise_isomorphism():
+    for seed in range(30):
+        hypo, gold = random_frame_corpora(seed)
+        result = evaluate(hypo, gold, TASK_SPEC)
+        tp, fp, fn = reference_frame_counts(hypo, gold)
+        for frame_type in FRAME_TYPES:
+            assert result.true_positives[frame_type] == tp.get(frame_type, 0)
+            assert result.false_positives[frame_type] == fp.get(frame_type, 0)
+            assert result.false_negatives[frame_type] == fn.get(frame_type, 0)
+
+
+def test_span_fillers_match_as_multisets():
+    # a slot's span fillers have to be the same multiset of keys. The pairwise matching only checked that
+    # each gold filler has a match, so gold fillers A, A used to match hypothesis fillers A, B
+    def corpus(theme_offsets):
+        corpus = Corpus()
+        instance = corpus.new_instance("x" * 50, "doc")
+        frame = instance.new_frame(BINDING, "gold")
+        frame.slot_lookup("Trigger").add(instance.new_span(SPAN_TYPES[1], 0, 1, "given"))
+        for left in theme_offsets:
+            frame.slot_lookup("Theme").add(instance.new_span(SPAN_TYPES[0], left, left + 1, "given"))
+        return corpus
+
+    for gold, hypo, match in [([2, 2], [2, 2], True), ([2, 2], [2, 4], False), ([2, 4], [2, 2], False)]:
+        result = evaluate(corpus(hypo), corpus(gold), TASK_SPEC)
+        assert result.true_positives[BINDING] == int(match)
+        assert result.false_negatives[BINDING] == int(not match)
+
+
+def test_parallel_evaluation_matches_sequential():
+    hypo, gold = random_frame_corpora(0, n_docs=20)
+    sequential = evaluate(hypo, gold, TASK_SPEC)
+    parallel = evaluate(hypo, gold, TASK_SPEC, n_jobs=3, chunk_size=2)
+    assert (parallel.counts() == sequential.counts()).all()
+    assert parallel.counts().sum() > 0
+    assert (parallel.document_counts == sequential.document_counts).all()
+    assert (sequential.document_counts.sum(axis=0) == sequential.counts()).all()
+    assert sequential.document_ids == sorted({instance.document_id for instance in gold.instances})
+
+
+def test_evaluator_reuses_gold_index():
+    hypo, gold = random_frame_corpora(2, n_docs=10)
+    other_hypo, _ = random_corpora(2, n_docs=12)
+    evaluator = Evaluator(gold, TASK_SPEC)
+    for corpus in [hypo, other_hypo, hypo]:
+        expected = evaluate(corpus, gold, TASK_SPEC)
+        result = evaluator.evaluate(corpus)
+        assert (result.counts() == expected.counts()).all()
+        assert (result.document_counts == expected.document_counts).all()
+        assert result.document_ids == expected.document_ids
+    parallel = evaluator.evaluate(hypo, n_jobs=3, chunk_size=2)
+    assert (parallel.counts() == evaluate(hypo, gold, TASK_SPEC).counts()).all()
+
+
+def test_result_in_place_union():
+    hypo, gold = random_frame_corpora(1)
+    result = evaluate(hypo, gold, TASK_SPEC)
+    total = result | result
+    same = result
+    result |= result
+    assert result is same
+    assert (result.counts() == total.counts()).all()
+
+
+BRAT_TASK_SPEC = TaskSpecification(SPAN_TYPES, (
+    FrameType("Binding", (
+        SlotType("Binding", (SPAN_TYPES[1],), 1, 1),
+        SlotType("Theme", (SPAN_TYPES[0],), 1, None),
+    )),
+))
+
+
+def write_brat(directory, documents):
+    directory.mkdir()
+    for doc_id, (text, a1, a2) in documents.items():
+        (directory / (doc_id + ".txt")).write_text(text)
+        (directory / (doc_id + ".a1")).write_text(a1)
+        (directory / (doc_id + ".a2")).write_text(a2)
+
+
+def test_streaming_evaluation_matches_full_evaluation(tmp_path):
+    text = "A binds B.\nC binds D and E.\n"
+    a1 = "T1\tProtein 0 1\tA\nT2\tProtein 8 9\tB\nT3\tProtein 11 12\tC\nT4\tProtein 19 20\tD\n"
+    gold_a2 = "T5\tTrigger 2 7\tbinds\nT6\tTrigger 13 18\tbinds\n" \
+        "E1\tBinding:T5 Theme:T1 Theme:T2\nE2\tBinding:T6 Theme:T3\n"
+    hypo_a2 = "T5\tTrigger 2 7\tbinds\nT6\tTrigger 12 18\t binds\n" \
+        "E1\tBinding:T5 Theme:T1 Theme:T2\nE2\tBinding:T6 Theme:T4\n"
+    write_brat(tmp_path / "gold", {"doc1": (text, a1, gold_a2), "doc2": (text, a1, gold_a2)})
+    write_brat(tmp_path / "hypo", {"doc1": (text, a1, hypo_a2), "doc3": (text, a1, hypo_a2)})
+
+    corpus_io = BRATCorpusIO(BRAT_TASK_SPEC)
+    doc_pairs = DocumentPairs(corpus_io, str(tmp_path / "hypo"), str(tmp_path / "gold"))
+    assert doc_pairs.doc_ids == ["doc1", "doc2", "doc3"]
+    assert len(doc_pairs[2][1]) == 0
+    streamed = evaluate_documents(doc_pairs, BRAT_TASK_SPEC)
+    full = evaluate(
+        corpus_io.load(str(tmp_path / "hypo")), corpus_io.load(str(tmp_path / "gold")), BRAT_TASK_SPEC
+    )
+    assert (streamed.counts() == full.counts()).all()
+    binding = BRAT_TASK_SPEC.frame_types[0]
+    assert (streamed.tp(binding), streamed.fp(binding), streamed.fn(binding)) == (1, 3, 3)
+
+
+def test_universal_document_ids(tmp_path):
+    write_brat(tmp_path / "docs", {"doc1": ("A.\n", "", ""), "doc2": ("B.\n", "", "")})
+    corpus_io = UniversalCorpusIO(BRAT_TASK_SPEC)
+    assert corpus_io.document_ids(str(tmp_path / "docs")) == ["doc1", "doc2"]
+    # no format can list the documents of a missing directory
+    with pytest.raises(NotImplementedError):
+        corpus_io.document_ids(str(tmp_path / "missing"))
+
+    class BrokenCorpusIO(CorpusIO):
+        def document_ids(self, path):
+            raise ValueError("bug")
+
+    # errors other than a format not fitting aren't swallowed
+    with pytest.raises(ValueError):
+        UniversalCorpusIO(BRAT_TASK_SPEC, [BrokenCorpusIO, BRATCorpusIO]).document_ids(str(tmp_path / "docs"))
+
+
+def test_result_counts():
+    protein, trigger, entity = SPAN_TYPES
+    result = Result(TASK_SPEC)
+    result.true_positives[protein] += 3
+    result.false_positives[protein] += 1
+    assert result.fscore(result.span_types) == pytest.approx(6 / 7)
+    # the cached totals are updated along with the counts
+    result.false_negatives[trigger] += 2
+    result.true_positives[trigger] += 2
+    span_types = result.span_types
+    assert (result.tp(span_types), result.fp(span_types), result.fn(span_types)) == (5, 1, 2)
+    assert result.macro_fscore(span_types) == pytest.approx((6 / 7 + 2 / 3) / 2)
+    # types that aren't evaluated are still counted on the side
+    result.true_positives[entity] += 1
+    assert result.tp(entity) == 1 and result.tp([protein, entity]) == 4
+    assert result.tp(result.sf_types) == 5
+    assert dict(result.true_positives)[protein] == 3
+
+    other = Result(TASK_SPEC)
+    other.true_positives[BINDING] += 1
+    assert other > result and result < other and result != other
+    assert (result | other).tp(result.sf_types) == 6
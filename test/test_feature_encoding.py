@@ -0,0 +1,41 @@
+import pickle
+
+from dere.models._baseline.feature_encoding import FeatureEncoder
+
+
+def test_encode():
+    encoder = FeatureEncoder()
+    X = [[{"word": "foo", "upper": False, "BOS": True}, {"word": "bar", "upper": True}]]
+    encoded = encoder.encode(X, grow=True)
+    assert sorted(encoder.vocabulary) == ["BOS", "upper", "word:bar", "word:foo"]
+    assert [seq.items() for seq in encoded] == [[
+        {str(encoder.vocabulary["word:foo"]): 1.0, str(encoder.vocabulary["BOS"]): 1.0},
+        {str(encoder.vocabulary["word:bar"]): 1.0, str(encoder.vocabulary["upper"]): 1.0},
+    ]]
+    # unseen attributes are dropped unless the vocabulary may grow
+    assert encoder.encode([[{"word": "baz"}]]).ids[0].tolist() == []
+    assert len(encoder.vocabulary) == 4
+
+
+def test_merge():
+    encoder = FeatureEncoder()
+    X1 = [[{"a": True, "b": True}, {}, {"c": True}], [{"d": True}]]
+    X2 = [[{"x": True}, {"y": True, "z": True}, {}], [{}]]
+    merged = encoder.encode(X1, grow=True).merge(encoder.encode(X2, grow=True))
+    expected = encoder.encode([
+        [dict(f1, **f2) for f1, f2 in zip(seq1, seq2)] for seq1, seq2 in zip(X1, X2)
+    ])
+    assert [ids.tolist() for ids in merged.ids] == [ids.tolist() for ids in expected.ids]
+    assert [offsets.tolist() for offsets in merged.offsets] == [
+        offsets.tolist() for offsets in expected.offsets
+    ]
+
+
+def test_subsets_and_pickling():
+    encoder = FeatureEncoder()
+    encoded = encoder.encode([[{"w": str(i)}] for i in range(5)], grow=True)
+    assert [seq.items() for seq in encoded[[3, 1]]] == [[{"3": 1.0}], [{"1": 1.0}]]
+    assert len(encoded[:2]) == 2
+    assert [seq.items() for seq in encoded[:2] + encoded[4:]] == [[{"0": 1.0}], [{"1": 1.0}], [{"4": 1.0}]]
+    unpickled = pickle.loads(pickle.dumps(encoded))
+    assert [seq.items() for seq in unpickled] == [seq.items() for seq in encoded]
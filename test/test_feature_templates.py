@@ -0,0 +1,51 @@
+import pickle
+
+import pytest
+
+from dere.models._baseline.feature_templates import FeatureExtractor
+
+
+class MockInstance:
+    def __init__(self, text):
+        self.text = text
+        self.spans = []
+
+
+def test_default_window():
+    instance = MockInstance("Foo bar 42")
+    extractor = FeatureExtractor([], word=["lower", "isdigit"])
+    features = extractor.extract(instance, [(0, 3), (4, 7), (8, 10)])
+    assert features[0] == {
+        "word.lower": "foo", "word.isdigit": False, "BOS": True,
+        "+1:word.lower": "bar", "+1:word.isdigit": False,
+    }
+    assert features[2] == {
+        "word.lower": "42", "word.isdigit": True,
+        "-1:word.lower": "bar", "-1:word.isdigit": False, "EOS": True,
+    }
+
+
+def test_wide_window():
+    instance = MockInstance("a b c d")
+    extractor = FeatureExtractor([], window=[0, -2, -1, 1, 2], word=["lower"])
+    features = extractor.extract(instance, [(0, 1), (2, 3), (4, 5), (6, 7)])
+    # only the first and the last token are marked, however far the window reaches past the edges
+    assert features[0] == {"word.lower": "a", "+1:word.lower": "b", "+2:word.lower": "c", "BOS": True}
+    assert features[1] == {
+        "word.lower": "b", "-1:word.lower": "a", "+1:word.lower": "c", "+2:word.lower": "d"
+    }
+    assert features[2] == {
+        "word.lower": "c", "-2:word.lower": "a", "-1:word.lower": "b", "+1:word.lower": "d"
+    }
+    assert features[3] == {"word.lower": "d", "-2:word.lower": "b", "-1:word.lower": "c", "EOS": True}
+    # a single token is both
+    assert extractor.extract(instance, [(0, 1)]) == [{"word.lower": "a", "BOS": True, "EOS": True}]
+    # the word cache and feature functions are rebuilt after unpickling
+    assert pickle.loads(pickle.dumps(extractor)).extract(instance, [(2, 3)]) == [
+        {"word.lower": "b", "BOS": True, "EOS": True}
+    ]
+
+
+def test_unknown_word_feature():
+    with pytest.raises(ValueError):
+        FeatureExtractor([], word=["nonsense"])
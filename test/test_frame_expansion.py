@@ -0,0 +1,27 @@
+from itertools import combinations, product
+
+import pytest
+
+from dere.models._baseline.frame_expansion import best_products, best_subsets, n_combinations
+
+
+scores = [3.0, 2.5, 2.5, 1.0, -0.5, -2.0]
+
+
+@pytest.mark.parametrize("size", range(len(scores) + 2))
+def test_best_subsets(size):
+    found = list(best_subsets(scores, size))
+    assert len(found) == n_combinations(len(scores), size)
+    assert sorted(indices for _, indices in found) == list(combinations(range(len(scores)), size))
+    assert [score for score, _ in found] == pytest.approx(sorted((s for s, _ in found), reverse=True))
+    for score, indices in found:
+        assert score == pytest.approx(sum(scores[i] for i in indices))
+
+
+def test_best_products():
+    lists = [[2.0, 1.0, 0.0], [5.0], [1.0, -1.0]]
+    found = list(best_products(lists))
+    assert sorted(choice for _, choice in found) == list(product(range(3), range(1), range(2)))
+    totals = [score for score, _ in found]
+    assert totals == pytest.approx(sorted(totals, reverse=True))
+    assert list(best_products([[1.0], []])) == []
@@ -0,0 +1,111 @@
+import pytest
+
+from dere.models._baseline.hyperparameter_search import (
+    GridSearch, SuccessiveHalving, make_search_strategy
+)
+
+
+def fixed_score_trial(setup, budget):
+    # the "model" records what it was trained with
+    return (setup["x"], budget), setup["x"] / 10
+
+
+class RecordingTrial:
+    def __init__(self, scores=None):
+        self.scores = scores or {}
+        self.calls = []
+
+    def __call__(self, setup, budget):
+        self.calls.append((setup["x"], budget))
+        score = self.scores.get((setup["x"], budget), setup["x"] / 10)
+        return (setup["x"], budget), score
+
+
+def setups(*xs):
+    return [{"x": x} for x in xs]
+
+
+def test_grid_search_tries_all_setups():
+    trial = RecordingTrial()
+    result = GridSearch().search(setups(3, 7, 5), trial)
+    assert trial.calls == [(3, 1.0), (7, 1.0), (5, 1.0)]
+    assert result.best_setup == {"x": 7}
+    assert result.best_model == (7, 1.0)
+    assert result.best_score == pytest.approx(0.7)
+    assert [entry.setup["x"] for entry in result.trace] == [3, 7, 5]
+
+
+def test_grid_search_stops_at_stop_score():
+    trial = RecordingTrial()
+    result = GridSearch(stop_score=0.5).search(setups(2, 6, 9), trial)
+    assert trial.calls == [(2, 1.0), (6, 1.0)]
+    assert result.best_setup == {"x": 6}
+    result = GridSearch(stop_score=None).search(setups(10, 9), RecordingTrial())
+    assert len(result.trace) == 2
+
+
+def test_grid_search_batches():
+    # the whole batch that reached the stop score is run, but no further batch
+    result = GridSearch(n_jobs=2, stop_score=0.5).search(setups(1, 6, 2, 3, 4), fixed_score_trial)
+    assert [entry.setup["x"] for entry in result.trace] == [1, 6]
+    result = GridSearch(n_jobs=2).search(setups(1, 6, 2, 3, 4), fixed_score_trial)
+    assert [entry.setup["x"] for entry in result.trace] == [1, 6, 2, 3, 4]
+    assert result.best_setup == {"x": 6}
+
+
+@pytest.mark.parametrize("n_setups, eta, min_budget, budgets", [
+    (9, 3, 0.1, [1 / 9, 1 / 3, 1]),
+    (27, 3, 0.1, [1 / 9, 1 / 3, 1]),
+    (27, 3, 0.01, [1 / 27, 1 / 9, 1 / 3, 1]),
+    (8, 2, 0.1, [1 / 8, 1 / 4, 1 / 2, 1]),
+    (9, 3, 0.5, [1]),
+    (1, 3, 0.1, [1]),
+])
+def test_successive_halving_budgets(n_setups, eta, min_budget, budgets):
+    strategy = SuccessiveHalving(eta=eta, min_budget=min_budget)
+    assert strategy.budgets(n_setups) == pytest.approx(budgets)
+
+
+def test_successive_halving_rungs():
+    trial = RecordingTrial()
+    result = SuccessiveHalving(eta=3, prune_ratio=0).search(setups(*range(1, 10)), trial)
+    rungs = [[x for x, b in trial.calls if b == pytest.approx(budget)] for budget in [1 / 9, 1 / 3, 1]]
+    # the best third advances, in grid order
+    assert rungs == [list(range(1, 10)), [7, 8, 9], [9]]
+    assert result.best_setup == {"x": 9}
+    assert result.best_model == (9, 1)
+    assert [entry.pruned for entry in result.trace[:9]] == [True] * 6 + [False] * 3
+
+
+def test_successive_halving_prune_ratio():
+    # x=8 is within the best third, but scores below 0.9 times the best score of the rung
+    trial = RecordingTrial()
+    result = SuccessiveHalving(eta=3, prune_ratio=0.9).search(setups(*range(1, 10)), trial)
+    assert [x for x, b in trial.calls if b == pytest.approx(1 / 3)] == [9]
+    assert result.best_setup == {"x": 9}
+
+
+def test_successive_halving_ranks_by_rung_score():
+    # on little data, x=2 looks best, so it is the one trained on all of the data
+    trial = RecordingTrial({(2, 1 / 3): 0.95})
+    result = SuccessiveHalving(eta=3, min_budget=0.3, prune_ratio=0).search(setups(2, 5, 8), trial)
+    assert [x for x, b in trial.calls if b == 1] == [2]
+    assert result.best_setup == {"x": 2} and result.best_score == pytest.approx(0.2)
+
+
+def test_successive_halving_stops_at_stop_score():
+    trial = RecordingTrial({(4, 1 / 9): 1.0})
+    result = SuccessiveHalving(eta=3).search(setups(*range(1, 10)), trial)
+    assert len(trial.calls) == 9
+    assert result.best_setup == {"x": 4}
+    assert result.best_score == 1.0
+
+
+def test_make_search_strategy():
+    strategy = make_search_strategy({"strategy": "halving", "eta": 2, "n_jobs": 3})
+    assert isinstance(strategy, SuccessiveHalving) and strategy.eta == 2 and strategy.n_jobs == 3
+    assert isinstance(make_search_strategy(), GridSearch)
+    with pytest.raises(ValueError):
+        make_search_strategy({"strategy": "random"})
+    with pytest.raises(ValueError):
+        SuccessiveHalving(eta=1)
@@ -0,0 +1,28 @@
+import subprocess
+import sys
+
+import pytest
+
+import dere.models
+
+
+def test_models_are_imported_lazily():
+    # a fresh interpreter, so that the modules other tests have imported don't count
+    script = "\n".join([
+        "import sys",
+        "import dere.models",
+        "assert 'dere.models._baseline' not in sys.modules",
+        "assert 'dere.models._nop_model' not in sys.modules",
+        "model_class = dere.models.NOPModel",
+        "assert 'dere.models._nop_model' in sys.modules",
+        "assert 'dere.models._baseline' not in sys.modules",
+        "assert issubclass(model_class, dere.models.Model)",
+        "assert vars(dere.models)['NOPModel'] is model_class",
+    ])
+    subprocess.run([sys.executable, "-c", script], check=True)
+
+
+def test_unknown_model():
+    with pytest.raises(AttributeError):
+        dere.models.NoSuchModel
+    assert dere.models.BaselineModel.__name__ == "BaselineModel"
@@ -0,0 +1,31 @@
+import spacy
+
+from dere.models._baseline.parse_cache import ParseCache
+
+
+nlp = spacy.blank("en")
+
+
+def parse_all(texts):
+    parse_all.calls.append(list(texts))
+    return [nlp(text) for text in texts]
+
+
+def test_parse_cache(tmp_path):
+    parse_all.calls = []
+    cache = ParseCache("en_test", str(tmp_path), max_size=1)
+    docs = cache.parse(["a b", "c", "a b"], nlp.vocab, parse_all)
+    assert [doc.text for doc in docs] == ["a b", "c", "a b"]
+    # duplicate texts are only parsed once
+    assert parse_all.calls == [["a b", "c"]]
+    # "a b" has been evicted from memory, but is still on disk
+    docs = cache.parse(["a b"], nlp.vocab, parse_all)
+    assert [token.text for token in docs[0]] == ["a", "b"]
+    assert len(parse_all.calls) == 1
+    assert (cache.hits, cache.misses) == (1, 3)
+
+
+def test_make_model_key():
+    cache1 = ParseCache(ParseCache.make_model_key(nlp, ["ner"]))
+    cache2 = ParseCache(ParseCache.make_model_key(nlp, []))
+    assert cache1.key("text") != cache2.key("text")
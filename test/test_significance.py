@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from dere.evaluation import Result
+from dere.significance import bootstrap_interval, paired_bootstrap, randomization_test
+from dere.taskspec import FrameType, SpanType, TaskSpecification
+
+
+TASK_SPEC = TaskSpecification((SpanType("Protein", True),), (FrameType("Binding"),))
+
+
+def make_result(document_counts):
+    result = Result(TASK_SPEC)
+    document_counts = np.asarray(document_counts, dtype=np.int64)
+    result.add_counts(document_counts.sum(axis=0))
+    result.document_counts = document_counts
+    result.document_ids = ["doc%d" % i for i in range(len(document_counts))]
+    return result
+
+
+def random_counts(seed, n_documents, tp_rate):
+    rng = np.random.RandomState(seed)
+    gold = rng.randint(1, 10, size=(n_documents, 2))
+    tp = rng.binomial(gold, tp_rate)
+    fp = rng.randint(0, 3, size=(n_documents, 2))
+    return np.stack([tp, fp, gold - tp], axis=1)
+
+
+def test_bootstrap_interval():
+    result = make_result(random_counts(0, 200, 0.6))
+    cls = result.sf_types
+    low, high = bootstrap_interval(result, cls, n_resamples=2000, seed=0)
+    assert low < result.fscore(cls) < high
+    assert high - low < 0.1
+    # the same counts in every document leave nothing to resample
+    constant = make_result([[[3, 1], [1, 0], [1, 2]]] * 20)
+    low, high = bootstrap_interval(constant, constant.span_types, n_resamples=100, seed=0)
+    assert low == pytest.approx(constant.fscore(constant.span_types))
+    assert high == pytest.approx(constant.fscore(constant.span_types))
+
+
+def test_identical_systems():
+    result = make_result(random_counts(1, 50, 0.5))
+    delta, low, high = paired_bootstrap(result, result, result.sf_types, n_resamples=500, seed=0)
+    assert delta == low == high == 0
+    assert randomization_test(result, result, result.sf_types, n_resamples=500, seed=0) == 1
+
+
+def test_different_systems():
+    better = make_result(random_counts(2, 100, 0.8))
+    worse = make_result(random_counts(2, 100, 0.3))
+    cls = better.frame_types
+    delta, low, high = paired_bootstrap(better, worse, cls, n_resamples=1000, seed=0)
+    assert delta == pytest.approx(better.fscore(cls) - worse.fscore(cls))
+    assert 0 < low < delta < high
+    assert randomization_test(better, worse, cls, n_resamples=1000, seed=0) < 0.01
+
+
+def test_mismatched_documents():
+    a = make_result(random_counts(3, 10, 0.5))
+    b = make_result(random_counts(3, 11, 0.5))
+    with pytest.raises(ValueError):
+        randomization_test(a, b, a.sf_types)
+    with pytest.raises(ValueError):
+        bootstrap_interval(Result(TASK_SPEC), TASK_SPEC.frame_types)
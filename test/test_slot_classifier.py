@@ -1,11 +1,17 @@
+import random
+
+import numpy as np
 import pytest
 import networkx as nx
-from dere.models._baseline.slot_classifier import SlotClassifier
-
+import spacy
+from scipy.sparse import csr_matrix
+from sklearn.svm import LinearSVC
+from dere import resources
+from dere.corpus import Corpus
+from dere.models._baseline.slot_classifier import SlotClassifier, SpanTokenIndex
+from dere.taskspec import FrameType, SlotType, SpanType, TaskSpecification
 
-class MockTaskSpec:
-    def __init__(self):
-        self.frame_types = []
+from networkx_paths import edge_words, edge_words_deps, find_node, get_shortest_path
 
 
 class MockToken:
@@ -69,11 +75,10 @@ for edge in [(0, 2), (1, 2), (2, 3), (3, 4), (4, 7), (5, 7), (6, 7)]:
     ],
 )
 def test_get_shortest_path(graph, tokens1, tokens2, result):
-    sc = SlotClassifier(MockTaskSpec(), {})
     if isinstance(result, int):
-        assert len(sc.get_shortest_path(graph, tokens1, tokens2)) == result
+        assert len(get_shortest_path(graph, tokens1, tokens2)) == result
     else:
-        assert sc.get_shortest_path(graph, tokens1, tokens2) == result
+        assert get_shortest_path(graph, tokens1, tokens2) == result
 
 
 @pytest.mark.parametrize(
@@ -112,8 +117,7 @@ def test_get_shortest_path(graph, tokens1, tokens2, result):
     ],
 )
 def test_edge_words(graph, tokens1, tokens2, idx2word, result):
-    sc = SlotClassifier(MockTaskSpec(), {})
-    assert sc.edge_words(graph, tokens1, tokens2, idx2word) == result
+    assert edge_words(graph, tokens1, tokens2, idx2word) == result
 
 
 @pytest.mark.parametrize(
@@ -180,7 +184,144 @@ def test_edge_words(graph, tokens1, tokens2, idx2word, result):
     ],
 )
 def test_edge_words_deps(graph, tokens1, tokens2, idx2word, edge2dep, result):
-    sc = SlotClassifier(MockTaskSpec(), {})
-    assert sc.edge_words_deps(graph, tokens1, tokens2, idx2word, edge2dep) == result
+    assert edge_words_deps(graph, tokens1, tokens2, idx2word, edge2dep) == result
+
+
+class MockSpan:
+    def __init__(self, left, right):
+        self.left = left
+        self.right = right
+
+
+def test_span_token_index():
+    doc = spacy.blank("en")("CTLA-4-Mediated inhibition of  T cells.")
+    index = SpanTokenIndex(doc)
+    for left in range(len(doc.text) + 1):
+        for right in range(left, len(doc.text) + 1):
+            span = MockSpan(left, right)
+            assert list(index.token_range(span)) == [token.i for token in find_node(doc, span)]
+
+
+PROTEIN = SpanType("Protein", False)
+TRIGGER = SpanType("Trigger", False)
+BINDING = FrameType("Binding", (
+    SlotType("Trigger", (TRIGGER,), 1, 1),
+    SlotType("Theme", (PROTEIN,), 1, None),
+))
+TASK_SPEC = TaskSpecification((PROTEIN, TRIGGER), (BINDING,))
+
+
+def binding_corpus(seed, n_docs, with_frames=True):
+    rng = random.Random(seed)
+    corpus = Corpus()
+    for d in range(n_docs):
+        for _ in range(rng.randint(1, 3)):
+            protein1, protein2 = rng.sample(["p53", "MDM2", "actin", "IL-2", "Cdk4"], 2)
+            verb = rng.choice(["binds", "likes", "binds to"])
+            text = "%s is said to quite often %s the small %s protein ." % (protein1, verb, protein2)
+            instance = corpus.new_instance(text, "doc%d" % d)
+            theme1 = instance.new_span(PROTEIN, 0, len(protein1), "given")
+            left = text.index(verb)
+            trigger = instance.new_span(TRIGGER, left, left + len(verb), "given")
+            left = text.index(protein2, left)
+            theme2 = instance.new_span(PROTEIN, left, left + len(protein2), "given")
+            if with_frames and verb != "likes":
+                frame = instance.new_frame(BINDING, "gold")
+                frame.slot_lookup("Trigger").add(trigger)
+                frame.slot_lookup("Theme").add(theme1)
+                if rng.random() < 0.7:
+                    frame.slot_lookup("Theme").add(theme2)
+    return corpus
+
+
+def frames(corpus):
+    return [
+        [
+            [[filler.key for filler in slot.fillers] for slot in frame.slots.values()]
+            for frame in instance.frames
+        ]
+        for instance in corpus.instances
+    ]
+
+
+def make_slot_classifier(**kwargs):
+    # a parser-less pipeline, so that no spaCy model is needed. Hashed features don't need vocabularies
+    # of dependency paths, which it can't produce
+    resources.get(("spacy", "blank:en"), lambda: spacy.blank("en"))
+    classifier = SlotClassifier(TASK_SPEC, {}, spacy_model="blank:en", feature_hashing=4096, **kwargs)
+    classifier.initialize()
+    return classifier
+
+
+@pytest.fixture(scope="module")
+def slot_classifier():
+    classifier = make_slot_classifier()
+    classifier.train(binding_corpus(0, 10))
+    return classifier
+
+
+def test_grouped_predict_matches_scan(slot_classifier):
+    # what predict did before it grouped relations by instance index: scan the groups for the one whose
+    # first relation has the same instance
+    expected = binding_corpus(1, 8, with_frames=False)
+    x, _, span_pairs, _ = slot_classifier.get_features_and_labels(expected)
+    y_pred = slot_classifier.cls.predict(x)
+    scores = slot_classifier.cls.decision_function(x)
+    if scores.ndim == 1:
+        y_margins = abs(scores)
+    else:
+        y_margins = scores[np.arange(len(y_pred)), np.searchsorted(slot_classifier.cls.classes_, y_pred)]
+    margins = dict(zip(span_pairs, y_margins.tolist()))
+    results_by_instance = []
+    for span_pair, label in zip(span_pairs, [slot_classifier.labels[i] for i in y_pred]):
+        for instance_results in results_by_instance:
+            if instance_results[0][0][0].instance == span_pair[0].instance:
+                instance_results.append((span_pair, label))
+                break
+        else:
+            results_by_instance.append([(span_pair, label)])
+    for instance_results in results_by_instance:
+        slot_classifier.generate_frames(slot_classifier.filter_results(instance_results), margins)
+
+    corpus = binding_corpus(1, 8, with_frames=False)
+    slot_classifier.predict(corpus)
+    assert any(frames(expected))
+    assert frames(corpus) == frames(expected)
+
+
+@pytest.mark.parametrize("n_classes", [2, 3])
+def test_decide_matches_predict(n_classes):
+    classifier = make_slot_classifier()
+    rng = np.random.RandomState(0)
+    x = csr_matrix(rng.rand(60, 5))
+    y = np.arange(60) % n_classes
+    classifier.cls = LinearSVC(max_iter=10000).fit(x, y)
+    y_pred, margins = classifier.decide(x)
+    assert (y_pred == classifier.cls.predict(x)).all()
+    scores = classifier.cls.decision_function(x)
+    expected = abs(scores) if n_classes == 2 else scores.max(axis=1)
+    assert np.allclose(margins, expected)
+
+
+def test_c_search(monkeypatch):
+    classifier = make_slot_classifier(
+        c_grid=[0.1, 1.0, 10.0], search={"strategy": "halving", "eta": 3, "min_budget": 0.3}
+    )
+    searched = []
+    search = classifier.search_strategy.search
 
+    def recording_search(setups, trial):
+        searched.append(setups)
+        return search(setups, trial)
 
+    monkeypatch.setattr(classifier.search_strategy, "search", recording_search)
+    classifier.train(binding_corpus(0, 10), binding_corpus(2, 4))
+    assert searched == [[{"C": 0.1}, {"C": 1.0}, {"C": 10.0}]]
+    # every C on a third of the data, then the best one on all of it
+    trace = classifier.search_trace
+    assert [(entry.setup["C"], entry.budget) for entry in trace[:3]] == [
+        (0.1, pytest.approx(1 / 3)), (1.0, pytest.approx(1 / 3)), (10.0, pytest.approx(1 / 3))
+    ]
+    assert len(trace) == 4 and trace[3].budget == 1.0
+    # the final classifier is trained with the best C on train+dev
+    assert classifier.cls.C == trace[3].setup["C"]
@@ -0,0 +1,114 @@
+import random
+
+import pytest
+from sklearn_crfsuite import CRF
+
+from dere.corpus import Corpus
+from dere.models._baseline.span_classifier import SpanClassifier, word_tokenizer
+from dere.taskspec import SpanType, TaskSpecification
+
+
+PROTEIN = SpanType("Protein", True)
+TRIGGER = SpanType("Trigger", True)
+TASK_SPEC = TaskSpecification((PROTEIN,), ())
+
+
+def protein_corpus(seed, n_instances, with_triggers=False):
+    rng = random.Random(seed)
+    corpus = Corpus()
+    for i in range(n_instances):
+        name = rng.choice(["p53", "MDM2", "IL-2 receptor", "actin", "\"NF-kB\""])
+        verb = rng.choice(["binds", "activates", "is near"])
+        text = "The %s protein %s %s here ." % (name, verb, rng.choice("ab"))
+        instance = corpus.new_instance(text, "doc%d" % (i // 3))
+        instance.new_span(PROTEIN, 4, 4 + len(name), "gold")
+        if with_triggers and verb != "is near":
+            left = text.index(verb)
+            instance.new_span(TRIGGER, left, left + len(verb), "gold")
+    return corpus
+
+
+def reference_predict(classifier, corpus):
+    # what predict did before it tagged the corpus in batches: predict every span type for the whole
+    # corpus at once, then decode the labels type by type
+    X = classifier.encode(classifier.get_features(corpus))
+    predictions = {}
+    for t in classifier.target_span_types:
+        X_type = classifier.encode(classifier.get_span_type_specific_features(corpus, t))
+        X_merged = classifier.merge_features(X, X_type)
+        predictions[t.name] = classifier.target2classifier[t.name].predict(X_merged)
+    for i, instance in enumerate(corpus.instances):
+        tokens = list(word_tokenizer.span_tokenize(instance.text))
+        for t in classifier.target_span_types:
+            left = None
+            right = 0
+            for token, label in zip(tokens, predictions[t.name][i]):
+                if left is not None and label in "BO":
+                    instance.new_span(t, left, right)
+                    left = None
+                if label == "B":
+                    left = token[0]
+                if label in "BI":
+                    right = token[1]
+            if left is not None:
+                instance.new_span(t, left, right)
+
+
+@pytest.fixture
+def fit_sizes(monkeypatch):
+    sizes = []
+    fit = CRF.fit
+
+    def recording_fit(self, X, y, *args, **kwargs):
+        sizes.append(len(X))
+        return fit(self, X, y, *args, **kwargs)
+
+    monkeypatch.setattr(CRF, "fit", recording_fit)
+    return sizes
+
+
+def test_no_refit_keeps_best_model(fit_sizes, monkeypatch):
+    classifier = SpanClassifier(TASK_SPEC, {}, refit=False)
+    results = []
+    search = classifier.search_strategy.search
+
+    def recording_search(*args):
+        results.append(search(*args))
+        return results[-1]
+
+    monkeypatch.setattr(classifier.search_strategy, "search", recording_search)
+    classifier.train(protein_corpus(0, 12), protein_corpus(1, 4))
+    assert classifier.target2classifier["Protein"] is results[0].best_model
+    # only the trials were trained, all of them on the training data
+    assert fit_sizes == [12] * len(results[0].trace)
+
+
+@pytest.mark.parametrize("encode_features", [False, True])
+def test_refit_trains_on_train_and_dev(fit_sizes, encode_features):
+    classifier = SpanClassifier(TASK_SPEC, {}, refit=True, encode_features=encode_features)
+    classifier.train(protein_corpus(0, 12), protein_corpus(1, 4))
+    trials = classifier.search_traces["Protein"]
+    assert fit_sizes[:len(trials)] == [12] * len(trials)
+    assert fit_sizes[len(trials):] == [12 + 4]
+
+
+@pytest.mark.parametrize("encode_features", [False, True])
+def test_batched_predict_matches_corpus_predict(encode_features):
+    task_spec = TaskSpecification((PROTEIN, TRIGGER), ())
+    classifier = SpanClassifier(task_spec, {}, encode_features=encode_features)
+    # little training data, so that some predictions are wrong and labels are mixed
+    classifier.train(protein_corpus(0, 6, with_triggers=True))
+    expected = protein_corpus(1, 20)
+    reference_predict(classifier, expected)
+    expected_spans = [
+        [(s.span_type.name, s.left, s.right) for s in instance.spans] for instance in expected.instances
+    ]
+    assert any(s[0] == "Trigger" for spans in expected_spans for s in spans)
+    for batch_size in [1, 3, 100]:
+        classifier.batch_size = batch_size
+        corpus = protein_corpus(1, 20)
+        classifier.predict(corpus)
+        spans = [
+            [(s.span_type.name, s.left, s.right) for s in instance.spans] for instance in corpus.instances
+        ]
+        assert spans == expected_spans
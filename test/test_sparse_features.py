@@ -0,0 +1,42 @@
+from collections import Counter
+
+import numpy as np
+from scipy.sparse import csr_matrix, hstack
+from sklearn.feature_extraction import FeatureHasher
+from sklearn.feature_extraction.text import CountVectorizer
+
+from dere.models._baseline.sparse_features import NumericBlock, SparseFeatureBuilder, TextBlock
+
+
+texts = ["the cat sat on the mat", "a dog", ""]
+words = CountVectorizer().fit(texts)
+bigrams = CountVectorizer(ngram_range=(2, 2)).fit(texts)
+
+
+def test_same_as_stacked_transforms():
+    distances = [0.0, 2.0, -1.0]
+    blocks = [
+        TextBlock("words", texts, words),
+        NumericBlock("distance", distances),
+        TextBlock("bigrams", ["the mat", "unseen words", "cat sat"], bigrams),
+    ]
+    stacked = hstack([
+        words.transform(texts),
+        csr_matrix(np.array(distances).reshape(-1, 1)),
+        bigrams.transform(["the mat", "unseen words", "cat sat"]),
+    ]).toarray()
+    built = SparseFeatureBuilder().build(blocks, 3)
+    assert built.shape == stacked.shape
+    assert np.array_equal(built.toarray(), stacked)
+
+
+def test_hashing():
+    distances = [0.0, 2.0, -1.0]
+    blocks = [TextBlock("words", texts, CountVectorizer()), NumericBlock("distance", distances)]
+    built = SparseFeatureBuilder(n_hash_features=16).build(blocks, 3)
+    analyze = CountVectorizer().build_analyzer()
+    expected = FeatureHasher(n_features=16).transform([
+        dict(Counter("words=" + term for term in analyze(text)), distance=distance)
+        for text, distance in zip(texts, distances)
+    ])
+    assert np.array_equal(built.toarray(), expected.toarray())